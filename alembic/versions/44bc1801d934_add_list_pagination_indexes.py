@@ -0,0 +1,40 @@
+"""Add list pagination indexes
+
+Revision ID: 44bc1801d934
+Revises: c795ee38dcaa
+Create Date: 2026-10-18 18:08:10.789615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '44bc1801d934'
+down_revision = 'c795ee38dcaa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table_name in ('charityproject', 'donation'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.create_index(
+                f'ix_{table_name}_create_date_id',
+                ['create_date', 'id'],
+                unique=False,
+            )
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_donation_user_id_create_date_id',
+            ['user_id', 'create_date', 'id'],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_user_id_create_date_id')
+        batch_op.drop_index('ix_donation_create_date_id')
+    with op.batch_alter_table('charityproject', schema=None) as batch_op:
+        batch_op.drop_index('ix_charityproject_create_date_id')
@@ -0,0 +1,51 @@
+"""Add indexes for investment queries
+
+Revision ID: b7e4c1d9a2f3
+Revises: 542d7fe8cd90
+Create Date: 2026-10-18 10:12:31.512043
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4c1d9a2f3'
+down_revision = '542d7fe8cd90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    is_open = sa.column('fully_invested') == sa.false()
+    is_closed = sa.column('fully_invested') == sa.true()
+    for table_name in ('charityproject', 'donation'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.create_index(
+                f'ix_{table_name}_open_create_date_id',
+                ['create_date', 'id'],
+                unique=False,
+                postgresql_where=is_open,
+                sqlite_where=is_open,
+            )
+    with op.batch_alter_table('charityproject', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_charityproject_closed_close_date',
+            ['close_date'],
+            unique=False,
+            postgresql_where=is_closed,
+            sqlite_where=is_closed,
+        )
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f('ix_donation_user_id'), ['user_id'], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_donation_user_id'))
+        batch_op.drop_index('ix_donation_open_create_date_id')
+    with op.batch_alter_table('charityproject', schema=None) as batch_op:
+        batch_op.drop_index('ix_charityproject_closed_close_date')
+        batch_op.drop_index('ix_charityproject_open_create_date_id')
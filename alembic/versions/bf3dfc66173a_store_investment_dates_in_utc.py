@@ -0,0 +1,132 @@
+"""Store investment dates in UTC
+
+Revision ID: bf3dfc66173a
+Revises: 96181eb08c83
+Create Date: 2026-10-18 20:12:41.207113
+
+`create_date` проектов и пожертвований и `created_at` распределений
+записывались по местному времени сервера, а `close_date` - по UTC.
+Ревизия переводит даты создания в UTC и пересчитывает по ним время
+сбора закрытых объектов.
+
+Даты переводятся в Python по правилам часового пояса сервера,
+выполняющего миграцию, для каждой даты отдельно: смещение учитывает
+переход на летнее время, действовавший в момент создания объекта.
+"""
+from datetime import datetime, timezone
+from typing import Callable
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bf3dfc66173a'
+down_revision = '96181eb08c83'
+branch_labels = None
+depends_on = None
+
+
+def local_to_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def utc_to_local(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc).astimezone().replace(
+        tzinfo=None
+    )
+
+
+def seconds_between(end: datetime, start: datetime) -> int:
+    """Разность двух дат в целых секундах, как в app.core.db."""
+    return int((
+        end.replace(microsecond=0) - start.replace(microsecond=0)
+    ).total_seconds())
+
+
+def convert_investment_dates(
+    table_name: str,
+    convert: Callable[[datetime], datetime],
+    recount_durations: bool,
+) -> None:
+    """Переводит `create_date` объектов инвестирования.
+
+    С `recount_durations` пересчитывается и время сбора закрытых
+    объектов: после перевода в UTC `create_date` записана по тем же
+    часам, что и `close_date`.
+    """
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        sa.column('create_date', sa.DateTime),
+        sa.column('close_date', sa.DateTime),
+        sa.column('close_duration_seconds', sa.Integer),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(table.c.id, table.c.create_date, table.c.close_date).where(
+            table.c.create_date.isnot(None)
+        )
+    ).fetchall()
+    if not rows:
+        return
+    updates = []
+    for row in rows:
+        create_date = convert(row.create_date)
+        values = {'obj_id': row.id, 'create_date': create_date}
+        if recount_durations:
+            values['close_duration_seconds'] = (
+                None if row.close_date is None
+                else seconds_between(row.close_date, create_date)
+            )
+        updates.append(values)
+    values = {'create_date': sa.bindparam('create_date')}
+    if recount_durations:
+        values['close_duration_seconds'] = sa.bindparam(
+            'close_duration_seconds'
+        )
+    connection.execute(
+        table.update().where(
+            table.c.id == sa.bindparam('obj_id')
+        ).values(**values),
+        updates,
+    )
+
+
+def convert_allocation_dates(convert: Callable[[datetime], datetime]) -> None:
+    table = sa.table(
+        'investment_allocation',
+        sa.column('id', sa.Integer),
+        sa.column('created_at', sa.DateTime),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(table.c.id, table.c.created_at).where(
+            table.c.created_at.isnot(None)
+        )
+    ).fetchall()
+    if not rows:
+        return
+    connection.execute(
+        table.update().where(
+            table.c.id == sa.bindparam('row_id')
+        ).values(created_at=sa.bindparam('created_at')),
+        [
+            {'row_id': row.id, 'created_at': convert(row.created_at)}
+            for row in rows
+        ],
+    )
+
+
+def upgrade():
+    for table_name in ('charityproject', 'donation'):
+        convert_investment_dates(table_name, local_to_utc, True)
+    convert_allocation_dates(local_to_utc)
+
+
+def downgrade():
+    # Время сбора не зависит от часов, по которым записаны даты,
+    # и остаётся пересчитанным.
+    for table_name in ('charityproject', 'donation'):
+        convert_investment_dates(table_name, utc_to_local, False)
+    convert_allocation_dates(utc_to_local)
@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional, Tuple, Type
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.pagination import NDJSON_MEDIA_TYPE
+from app.core.db import Base, get_read_session
+from app.core.versions import get_version_stamps
+
+
+class NotModified(Exception):
+    """Представление у клиента не устарело: ответ 304 без тела.
+
+    Attributes:
+        headers: Заголовки ответа (`ETag`, `Last-Modified`,
+            `Cache-Control`, `Vary`).
+    """
+
+    def __init__(self, headers: Dict[str, str]):
+        super().__init__()
+        self.headers = headers
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Проверяет `If-None-Match` слабым сравнением ETag.
+
+    `If-Modified-Since` не проверяется: `Last-Modified` передаётся
+    с точностью до секунды, и запись в ту же секунду, что и чтение
+    клиента, дала бы ему ложный ответ 304. Без `If-None-Match` ответ
+    возвращается целиком.
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in (tag.removeprefix('W/') for tag in tags)
+
+
+class ConditionalGet:
+    """Зависимость списка объектов, отвечающая 304 на условный запрос.
+
+    ETag и `Last-Modified` строятся по версиям таблиц (`TableVersion`),
+    которые увеличиваются в каждой транзакции записи в них. Поэтому
+    проверка `If-None-Match` стоит одного запроса к таблице версий
+    и выполняется до чтения строк: если представление у клиента
+    не устарело, вызывается `NotModified`.
+
+    Зависимость возвращает заголовки, которые эндпоинт добавляет
+    к ответу.
+
+    Args:
+        *models: Модели, от данных которых зависит ответ.
+        cache_control: Значение заголовка `Cache-Control`.
+        vary: Значение заголовка `Vary`.
+    """
+
+    def __init__(
+        self,
+        *models: Type[Base],
+        cache_control: str,
+        vary: str = 'Accept',
+    ):
+        self.models = models
+        self.cache_control = cache_control
+        self.vary = vary
+
+    def make_etag(
+        self,
+        request: Request,
+        stamps: Dict[str, Tuple[int, Optional[datetime]]],
+    ) -> str:
+        tag = '-'.join(
+            f'{name}.{version}' for name, (version, _) in stamps.items()
+        )
+        # Поток NDJSON по тому же URL - другое представление.
+        if NDJSON_MEDIA_TYPE in request.headers.get('accept', ''):
+            tag += '-ndjson'
+        return f'"{tag}"'
+
+    async def etag(self, request: Request, session: AsyncSession) -> str:
+        """Перечитывает версии таблиц и возвращает текущий ETag."""
+        return self.make_etag(
+            request, await get_version_stamps(session, self.models)
+        )
+
+    async def __call__(
+        self,
+        request: Request,
+        session: AsyncSession = Depends(get_read_session),
+    ) -> Dict[str, str]:
+        stamps = await get_version_stamps(session, self.models)
+        headers = {
+            'ETag': self.make_etag(request, stamps),
+            'Cache-Control': self.cache_control,
+            'Vary': self.vary,
+        }
+        updates = [
+            updated_at for _, updated_at in stamps.values()
+            if updated_at is not None
+        ]
+        if updates:
+            # Last-Modified передаётся с точностью до секунды.
+            headers['Last-Modified'] = format_datetime(
+                max(updates).replace(microsecond=0, tzinfo=timezone.utc),
+                usegmt=True,
+            )
+        if is_not_modified(request, headers['ETag']):
+            raise NotModified(headers)
+        return headers
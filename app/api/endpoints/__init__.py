@@ -2,6 +2,7 @@ from .google_api import router as google_api_router
 from .user import router as user_router
 from .charity_project import router as charity_project_router
 from .donation import router as donation_router
+from .stats import router as stats_router
 
 
 __all__ = [
@@ -9,4 +10,5 @@ __all__ = [
     'user_router',
     'charity_project_router',
     'donation_router',
+    'stats_router',
 ]
@@ -1,36 +1,84 @@
-from fastapi import APIRouter, Depends
+from typing import Dict, Optional, Union
+
+from fastapi import APIRouter, Body, Depends, Query, Request
+from pydantic import PositiveInt, conlist
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.api.conditional import ConditionalGet
+from app.api.pagination import NDJSON_RESPONSES, PageParams, paginate
+from app.api.response_cache import get_response_cache
+from app.core.config import settings
+from app.core.constants import MAX_BATCH_SIZE
+from app.core.db import get_async_session, get_read_session
 from app.core.user import current_superuser
+from app.models import CharityProject
 from app.repositories.charity_project import charity_project_crud
 from app.repositories.donation import donation_crud
 from app.schemas.charity_project import (
+    CharityProjectBatchUpdate,
     CharityProjectCreate,
     CharityProjectDB,
     CharityProjectUpdate,
 )
-from app.repositories.donation import donation_crud
+from app.schemas.investment_allocation import InvestmentAllocationDB
+from app.schemas.page import Page
+from app.repositories.investment_allocation import (
+    investment_allocation_crud
+)
 from app.api.validators import (
-    check_charity_project_name_duplicate,
-    check_charity_project_before_delete,
-    check_charity_project_before_update,
+    check_charity_project_exists,
+    check_charity_project_name_unique,
+    check_and_delete_charity_project,
+    check_and_delete_charity_projects,
+    check_and_update_charity_project,
+    check_and_update_charity_projects,
 )
 
 router = APIRouter()
 
+charity_project_list_validators = ConditionalGet(
+    CharityProject, cache_control=settings.charity_project_cache_control
+)
+
 
 @router.get(
     '/',
-    response_model=list[CharityProjectDB],
+    response_model=Union[Page[CharityProjectDB], list[CharityProjectDB]],
     response_model_exclude_none=True,
+    responses=NDJSON_RESPONSES,
     summary='Получить все проекты'
 )
 async def get_all_charity_projects(
-    session: AsyncSession = Depends(get_async_session),
+    request: Request,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+    headers: Dict[str, str] = Depends(charity_project_list_validators),
 ):
-    """Возвращает список всех проектов."""
-    return await charity_project_crud.get_multi(session)
+    """Возвращает проекты в порядке создания.
+
+    С `limit` или `after` возвращается страница с курсором
+    `next_cursor` следующей страницы, с `Accept: application/x-ndjson` -
+    поток всех проектов. Ответ содержит `ETag` и `Last-Modified`
+    по версии таблицы проектов; на условный запрос с актуальными
+    значениями возвращается 304 без чтения проектов.
+
+    Ответы JSON берутся из кэша ответов, пока не изменилась версия
+    таблицы проектов; ответ, во время построения которого таблица
+    изменилась, в кэш не попадает.
+    """
+    cache = get_response_cache('charity_project_list')
+    if cache is None or page.is_stream:
+        return await paginate(
+            charity_project_crud, session, page, CharityProjectDB, headers
+        )
+    return await cache.respond(
+        request,
+        headers,
+        lambda: paginate(
+            charity_project_crud, session, page, CharityProjectDB, headers
+        ),
+        lambda: charity_project_list_validators.etag(request, session),
+    )
 
 
 @router.post(
@@ -48,13 +96,81 @@ async def create_charity_project(
 
     Создает благотворительный проект.
     """
-    await check_charity_project_name_duplicate(project.name, session)
-    new_project = await charity_project_crud.create_and_invest(
-        session=session,
-        obj_in=project,
-        opposite_crud=donation_crud,
-    )
-    return new_project
+    with check_charity_project_name_unique():
+        return await charity_project_crud.create_and_invest(
+            session=session,
+            obj_in=project,
+            opposite_crud=donation_crud,
+        )
+
+
+@router.post(
+    '/batch',
+    response_model=list[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+    summary='Создать несколько проектов'
+)
+async def create_charity_projects(
+    projects: conlist(
+        CharityProjectCreate, min_items=1, max_items=MAX_BATCH_SIZE
+    ),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Только для суперюзеров.
+
+    Создает проекты одной транзакцией; средства открытых пожертвований
+    распределяются по ним за один проход в порядке запроса.
+    """
+    with check_charity_project_name_unique():
+        return await charity_project_crud.create_many(
+            session=session,
+            objs_in=projects,
+            opposite_crud=donation_crud,
+        )
+
+
+@router.patch(
+    '/batch',
+    response_model=list[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+    summary='Обновить несколько проектов'
+)
+async def update_charity_projects(
+    objs_in: conlist(
+        CharityProjectBatchUpdate, min_items=1, max_items=MAX_BATCH_SIZE
+    ),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Только для суперюзеров.
+
+    Обновляет проекты одной транзакцией по тем же правилам, что
+    и обновление одного проекта; при ошибке не обновляется ни один.
+    """
+    with check_charity_project_name_unique():
+        return await check_and_update_charity_projects(objs_in, session)
+
+
+@router.delete(
+    '/batch',
+    response_model=list[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+    summary='Удалить несколько проектов'
+)
+async def delete_charity_projects(
+    project_ids: conlist(
+        PositiveInt, min_items=1, max_items=MAX_BATCH_SIZE
+    ) = Body(..., description='Идентификаторы проектов'),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Только для суперюзеров.
+
+    Удаляет проекты одной транзакцией; при ошибке не удаляется ни один.
+    Нельзя удалить проект, в который уже были инвестированы средства.
+    """
+    return await check_and_delete_charity_projects(project_ids, session)
 
 
 @router.delete(
@@ -72,8 +188,7 @@ async def delete_charity_project(
     Удаляет проект. Нельзя удалить проект, в который уже были
     инвестированы средства, его можно только закрыть.
     """
-    project = await check_charity_project_before_delete(project_id, session)
-    return await charity_project_crud.remove(project, session)
+    return await check_and_delete_charity_project(project_id, session)
 
 
 @router.patch(
@@ -92,11 +207,29 @@ async def update_charity_project(
     Закрытый проект нельзя редактировать, также нельзя установить
     требуемую сумму меньше уже вложенной.
     """
-    project = await check_charity_project_before_update(
-        project_id, session, obj_in.full_amount
-    )
+    with check_charity_project_name_unique():
+        return await check_and_update_charity_project(
+            project_id, obj_in, session
+        )
 
-    if obj_in.name is not None:
-        await check_charity_project_name_duplicate(obj_in.name, session)
 
-    return await charity_project_crud.update(project, obj_in, session)
+@router.get(
+    '/{project_id}/allocations',
+    response_model=list[InvestmentAllocationDB],
+    dependencies=[Depends(current_superuser)],
+    summary='Получить пожертвования, профинансировавшие проект'
+)
+async def get_charity_project_allocations(
+    project_id: int,
+    after: Optional[int] = Query(None, description='ID последней записи'),
+    limit: int = Query(100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Только для суперюзеров.
+
+    Возвращает пожертвования, из которых профинансирован проект.
+    """
+    await check_charity_project_exists(project_id, session)
+    return await investment_allocation_crud.get_by_project(
+        session, project_id, after=after, limit=limit
+    )
@@ -1,19 +1,41 @@
-from fastapi import APIRouter, Depends
+from typing import Dict, Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.api.conditional import ConditionalGet
+from app.api.pagination import NDJSON_RESPONSES, PageParams, paginate
+from app.api.validators import check_donation_access
+from app.core.config import settings
+from app.core.db import get_async_session, get_read_session
 from app.core.user import current_user, current_superuser
-from app.models import User
+from app.models import Donation, User
 from app.repositories.charity_project import charity_project_crud
 from app.repositories.donation import donation_crud
+from app.repositories.investment_allocation import (
+    investment_allocation_crud
+)
 from app.schemas.donation import (
     DonationCreate,
     DonationDBUser,
     DonationDBSuperuser,
+    DonationImportSummary,
+)
+from app.schemas.investment_allocation import InvestmentAllocationDB
+from app.schemas.page import Page
+from app.services.donation_batcher import donation_batcher
+from app.services.donation_import import (
+    IMPORT_FORMAT_EXAMPLES, IMPORT_FORMATS, import_donations
 )
 
 router = APIRouter()
 
+donation_list_validators = ConditionalGet(
+    Donation,
+    cache_control=settings.donation_cache_control,
+    vary='Accept, Authorization',
+)
+
 
 @router.post(
     '/',
@@ -27,6 +49,8 @@ async def create_donation(
     user: User = Depends(current_user),
 ):
     """Создать пожертвование."""
+    if settings.donation_batching:
+        return await donation_batcher.submit(donation, user)
     new_donation = await donation_crud.create_and_invest(
         session=session,
         obj_in=donation,
@@ -36,29 +60,111 @@ async def create_donation(
     return new_donation
 
 
+@router.post(
+    '/import',
+    response_model=DonationImportSummary,
+    summary='Импортировать пожертвования',
+    openapi_extra={'requestBody': {'content': {
+        content_type: {'example': example}
+        for content_type, example in IMPORT_FORMAT_EXAMPLES.items()
+    }}},
+)
+async def import_donations_stream(
+    request: Request,
+    chunk_size: Optional[int] = Query(None, ge=1, le=10000),
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_superuser),
+):
+    """Только для суперюзеров.
+
+    Импортирует пожертвования из тела запроса в формате CSV
+    (`text/csv`) или NDJSON (`application/x-ndjson`). Тело читается
+    потоком, пожертвования создаются и инвестируются пачками.
+    Строки без `user_id` записываются на текущего пользователя.
+    """
+    content_type = request.headers.get('content-type', '')
+    import_format = IMPORT_FORMATS.get(content_type.split(';')[0].strip())
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail='Поддерживаются форматы: ' + ', '.join(IMPORT_FORMATS),
+        )
+    return await import_donations(
+        session, request.stream(), import_format, user.id, chunk_size
+    )
+
+
 @router.get(
     '/my',
-    response_model=list[DonationDBUser],
+    response_model=Union[Page[DonationDBUser], list[DonationDBUser]],
     response_model_exclude_none=True,
+    responses=NDJSON_RESPONSES,
     summary='Получить мои пожертвования'
 )
 async def get_my_donations(
-    session: AsyncSession = Depends(get_async_session),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
     user: User = Depends(current_user),
+    headers: Dict[str, str] = Depends(donation_list_validators),
 ):
-    """Получить список моих пожертвований."""
-    return await donation_crud.get_by_user(session, user)
+    """Получить список моих пожертвований.
+
+    С `limit` или `after` возвращается страница с курсором
+    `next_cursor` следующей страницы, с `Accept: application/x-ndjson` -
+    поток всех моих пожертвований. Ответ содержит `ETag`
+    и `Last-Modified`; на условный запрос с актуальными значениями
+    возвращается 304.
+    """
+    return await paginate(
+        donation_crud, session, page, DonationDBUser, headers,
+        user_id=user.id,
+    )
 
 
 @router.get(
     '/',
-    response_model=list[DonationDBSuperuser],
+    response_model=Union[
+        Page[DonationDBSuperuser], list[DonationDBSuperuser]
+    ],
     response_model_exclude_none=True,
+    responses=NDJSON_RESPONSES,
     dependencies=[Depends(current_superuser)],
     summary='Получить все пожертвования'
 )
 async def get_all_donations(
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+    headers: Dict[str, str] = Depends(donation_list_validators),
+):
+    """Получить все пожертвования (только для суперпользователя).
+
+    С `limit` или `after` возвращается страница с курсором
+    `next_cursor` следующей страницы, с `Accept: application/x-ndjson` -
+    поток всех пожертвований. На условный запрос с актуальными `ETag`
+    или `Last-Modified` возвращается 304.
+    """
+    return await paginate(
+        donation_crud, session, page, DonationDBSuperuser, headers
+    )
+
+
+@router.get(
+    '/{donation_id}/allocations',
+    response_model=list[InvestmentAllocationDB],
+    summary='Получить распределение пожертвования по проектам'
+)
+async def get_donation_allocations(
+    donation_id: int,
+    after: Optional[int] = Query(None, description='ID последней записи'),
+    limit: int = Query(100, ge=1, le=1000),
     session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
 ):
-    """Получить все пожертвования (только для суперпользователя)."""
-    return await donation_crud.get_multi(session)
+    """Получить проекты, в которые распределено пожертвование.
+
+    Доступно владельцу пожертвования и суперпользователю.
+    """
+    await check_donation_access(donation_id, user, session)
+    return await investment_allocation_crud.get_by_donation(
+        session, donation_id, after=after, limit=limit
+    )
@@ -1,8 +1,11 @@
+from typing import Optional
+
 from aiogoogle import Aiogoogle
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from pydantic import PositiveInt
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.core.db import get_read_session
 from app.core.google_client import get_service
 from app.core.user import current_superuser
 from app.repositories.charity_project import charity_project_crud
@@ -18,12 +21,15 @@ router = APIRouter()
     dependencies=[Depends(current_superuser)],
 )
 async def get_report(
-    session: AsyncSession = Depends(get_async_session),
+    limit: Optional[PositiveInt] = Query(
+        None, description='Сколько самых быстро собранных проектов вывести'
+    ),
+    session: AsyncSession = Depends(get_read_session),
     wrapper_services: Aiogoogle = Depends(get_service),
     summary='Создать отчёт в Google Таблицах'
 ):
     projects = await charity_project_crud.get_projects_by_completion_rate(
-        session
+        session, limit
     )
     spreadsheetid = await create_spreadsheets(wrapper_services)
     await set_user_permissions(spreadsheetid, wrapper_services)
@@ -0,0 +1,75 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.response_cache import response_cache_stats
+from app.core.counters import get_counters
+from app.core.db import engine, get_async_session, pool_stats
+from app.core.object_cache import cache_stats
+from app.core.single_flight import query_flights
+from app.core.user import current_superuser
+from app.schemas.stats import (
+    CacheStats, FundStats, PoolStats, QueryFlightStats
+)
+
+router = APIRouter()
+
+
+@router.get(
+    '/',
+    response_model=FundStats,
+    summary='Получить показатели фонда'
+)
+async def get_fund_stats(
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Возвращает показатели фонда из агрегированных счётчиков."""
+    return await get_counters(session)
+
+
+@router.get(
+    '/pool',
+    response_model=PoolStats,
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+    summary='Получить использование пула соединений'
+)
+async def get_pool_stats():
+    """Только для суперюзеров.
+
+    Возвращает размер пула соединений с базой данных, свободные
+    и выданные соединения.
+    """
+    return pool_stats(engine)
+
+
+@router.get(
+    '/cache',
+    response_model=CacheStats,
+    dependencies=[Depends(current_superuser)],
+    summary='Получить использование кэшей'
+)
+async def get_cache_stats():
+    """Только для суперюзеров.
+
+    Возвращает размер, попадания и промахи кэшей ответов и кэшей
+    объектов процесса.
+    """
+    return {'responses': response_cache_stats(), 'objects': cache_stats()}
+
+
+@router.get(
+    '/queries',
+    response_model=Dict[str, QueryFlightStats],
+    dependencies=[Depends(current_superuser)],
+    summary='Получить объединение одинаковых запросов чтения'
+)
+async def get_query_flight_stats():
+    """Только для суперюзеров.
+
+    Возвращает по запросам страниц списков количество вызовов,
+    выполненных запросов и вызовов, объединённых с одновременным
+    одинаковым запросом.
+    """
+    return query_flights.stats()
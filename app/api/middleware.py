@@ -0,0 +1,39 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.constants import READ_YOUR_WRITES_COOKIE
+
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+class ReadYourWritesMiddleware:
+    """Отмечает cookie клиента, который только что записал данные.
+
+    После успешного запроса с изменяющим методом клиент в течение
+    `read_your_writes_seconds` читает через `get_read_session`
+    с основной базы данных, а не с реплики.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.cookie = (
+            f'{READ_YOUR_WRITES_COOKIE}=1; '
+            f'Max-Age={settings.read_your_writes_seconds}; '
+            'Path=/; HttpOnly; SameSite=lax'
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope['method'] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if (message['type'] == 'http.response.start' and
+                    message['status'] < 400):
+                MutableHeaders(scope=message).append(
+                    'set-cookie', self.cookie
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,168 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Type
+
+import orjson
+from fastapi import HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.constants import MAX_PAGE_SIZE
+from app.core.pagination import InvalidCursorError, decode_cursor
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+# Описание потокового ответа для OpenAPI списков объектов.
+NDJSON_RESPONSES = {200: {'content': {NDJSON_MEDIA_TYPE: {}}}}
+
+
+class PageParams:
+    """Параметры keyset-пагинации списка объектов.
+
+    Без `limit` и `after` при включённом `legacy_list_responses`
+    список возвращается целиком, как до появления пагинации.
+    С заголовком `Accept: application/x-ndjson` объекты отдаются потоком
+    NDJSON целиком, начиная после `after`; `limit` не учитывается.
+    `fields` ограничивает поля объектов в ответе.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        limit: Optional[int] = Query(
+            None, ge=1, le=MAX_PAGE_SIZE, description='Размер страницы'
+        ),
+        after: Optional[str] = Query(
+            None, description='Курсор `next_cursor` предыдущей страницы'
+        ),
+        fields: Optional[str] = Query(
+            None, description='Поля объектов через запятую'
+        ),
+    ):
+        self.limit = limit or settings.default_page_size
+        self.is_stream = NDJSON_MEDIA_TYPE in request.headers.get(
+            'accept', ''
+        )
+        self.is_legacy = (
+            settings.legacy_list_responses and limit is None and
+            after is None
+        )
+        self.fields = None if fields is None else [
+            field.strip() for field in fields.split(',') if field.strip()
+        ]
+        try:
+            self.after = None if after is None else decode_cursor(after)
+        except InvalidCursorError as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+
+    def columns(self, schema: Type[BaseModel]) -> List[str]:
+        """Возвращает колонки, которые нужно прочитать для ответа.
+
+        Args:
+            schema: Схема объекта в ответе.
+
+        Returns:
+            List[str]: Запрошенные поля или все поля схемы.
+
+        Raises:
+            HTTPException: Если запрошено поле, которого нет в схеме.
+        """
+        if self.fields is None:
+            return list(schema.__fields__)
+        unknown_fields = set(self.fields) - set(schema.__fields__)
+        if unknown_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Неизвестные поля: ' + ', '.join(
+                    sorted(unknown_fields)
+                ),
+            )
+        return list(dict.fromkeys(self.fields))
+
+
+def render_row(row, columns: List[str]) -> Dict[str, Any]:
+    """Строит объект ответа из строки без проверки схемой.
+
+    Строки читаются из колонок моделей, значения которых уже
+    соответствуют схеме, поэтому повторная проверка не нужна.
+    Пустые поля опускаются, как при `response_model_exclude_none`.
+    """
+    return {
+        column: row[column] for column in columns
+        if row[column] is not None
+    }
+
+
+async def iter_ndjson(
+    crud,
+    session: AsyncSession,
+    params: PageParams,
+    columns: List[str],
+    **filters: Any,
+) -> AsyncIterator[bytes]:
+    """Сериализует поток строк в NDJSON по частям чтения."""
+    async for partition in crud.stream(
+        session,
+        after=params.after,
+        partition_size=settings.list_stream_partition_size,
+        columns=columns,
+        **filters,
+    ):
+        yield b''.join(
+            orjson.dumps(render_row(row, columns)) + b'\n'
+            for row in partition
+        )
+
+
+async def paginate(
+    crud,
+    session: AsyncSession,
+    params: PageParams,
+    schema: Type[BaseModel],
+    headers: Optional[Dict[str, str]] = None,
+    **filters: Any,
+):
+    """Возвращает страницу объектов, поток NDJSON или весь список.
+
+    Читаются только колонки полей схемы как строки Core, без построения
+    ORM-объектов; одновременные одинаковые чтения страницы при одном
+    ETag из `headers` объединяются в один запрос. Ответ сериализуется
+    orjson в обход `response_model`, которая остаётся описанием ответа
+    в OpenAPI.
+
+    Args:
+        crud: CRUD-объект модели.
+        session: Асинхронная сессия для работы с базой данных.
+        params: Параметры пагинации запроса.
+        schema: Схема объекта в ответе.
+        headers: Дополнительные заголовки ответа; `ETag` из них -
+            версия данных для объединения чтений.
+        **filters: Параметры фильтрации (поле=значение).
+
+    Returns:
+        Потоковый ответ NDJSON либо ответ со списком объектов
+        или страницей (схема `Page`).
+    """
+    columns = params.columns(schema)
+    if params.is_stream:
+        return StreamingResponse(
+            iter_ndjson(crud, session, params, columns, **filters),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers,
+        )
+    rows, next_cursor = await crud.get_page(
+        session,
+        after=params.after,
+        limit=None if params.is_legacy else params.limit,
+        columns=columns,
+        coalesce_version=None if headers is None else headers.get('ETag'),
+        **filters,
+    )
+    items = [render_row(row, columns) for row in rows]
+    if params.is_legacy:
+        return ORJSONResponse(items, headers=headers)
+    page = {'items': items}
+    if next_cursor is not None:
+        page['next_cursor'] = next_cursor
+    return ORJSONResponse(page, headers=headers)
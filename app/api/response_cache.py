@@ -0,0 +1,166 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+
+JSON_MEDIA_TYPE = 'application/json'
+
+
+class ResponseCache:
+    """Кэш сериализованных ответов списка в памяти процесса.
+
+    Хранит байты тела ответа по пути и параметрам запроса. Записи
+    действительны для ETag, при котором построены: ETag строится
+    по версии таблицы (`TableVersion`), которую увеличивает каждая
+    запись в таблицу, поэтому изменение данных любым процессом
+    приложения сбрасывает кэш без обмена сообщениями между ними.
+
+    Размер ограничен `max_entries` записями и `max_bytes` байтами тел
+    (вытесняются давно не читавшиеся). Одновременные промахи по одному
+    ключу строят ответ один раз: остальные запросы ждут его результата.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.etag: Optional[str] = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.builds = SingleFlight()
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def coalesced(self) -> int:
+        return self.builds.totals['coalesced']
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def lookup(self, key: str, etag: str) -> Optional[bytes]:
+        if etag != self.etag:
+            self.clear()
+            self.etag = etag
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def store(self, key: str, etag: str, body: bytes) -> None:
+        """Запоминает тело ответа, если ETag не изменился за построение."""
+        if etag != self.etag or len(body) > self.max_bytes:
+            return
+        self.size += len(body) - len(self._entries.get(key, b''))
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while (len(self._entries) > self.max_entries or
+               self.size > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    async def get_or_build(
+        self,
+        key: str,
+        etag: str,
+        build: Callable[[], Awaitable[bytes]],
+        current_etag: Optional[Callable[[], Awaitable[str]]] = None,
+    ) -> bytes:
+        """Возвращает тело ответа из кэша или строит его.
+
+        Тело запоминается, только если после построения ETag данных
+        не изменился: иначе неизвестно, к какой версии относятся
+        прочитанные строки.
+
+        Args:
+            key: Ключ ответа (путь и параметры запроса).
+            etag: ETag версии данных, прочитанной до построения.
+            build: Функция, строящая тело ответа.
+            current_etag: Функция, перечитывающая ETag после построения
+                (опционально).
+
+        Returns:
+            bytes: Тело ответа.
+        """
+        body = self.lookup(key, etag)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        async def build_and_store() -> bytes:
+            self.misses += 1
+            body = await build()
+            if current_etag is None or await current_etag() == etag:
+                self.store(key, etag, body)
+            return body
+
+        return await self.builds.run((etag, key), build_and_store, key)
+
+    async def respond(
+        self,
+        request: Request,
+        headers: Dict[str, str],
+        build: Callable[[], Awaitable[Response]],
+        current_etag: Optional[Callable[[], Awaitable[str]]] = None,
+    ) -> Response:
+        """Возвращает ответ JSON из кэша или строит его.
+
+        Args:
+            request: Запрос; ключ - его путь и параметры.
+            headers: Заголовки ответа с ETag текущей версии данных.
+            build: Функция, строящая ответ JSON.
+            current_etag: Функция, перечитывающая ETag после построения
+                (опционально).
+
+        Returns:
+            Response: Ответ с телом из кэша.
+        """
+        key = request.url.path + '?' + urlencode(
+            sorted(request.query_params.multi_items())
+        )
+
+        async def build_body() -> bytes:
+            return (await build()).body
+
+        body = await self.get_or_build(
+            key, headers['ETag'], build_body, current_etag
+        )
+        return Response(body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+        }
+
+
+response_caches: Dict[str, ResponseCache] = {}
+
+
+def get_response_cache(name: str) -> Optional[ResponseCache]:
+    """Возвращает кэш ответов по имени или None, если кэш выключен."""
+    if settings.response_cache_size <= 0:
+        return None
+    if name not in response_caches:
+        response_caches[name] = ResponseCache(
+            settings.response_cache_size, settings.response_cache_max_bytes
+        )
+    return response_caches[name]
+
+
+def response_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Возвращает размер, попадания и промахи кэшей ответов по именам."""
+    return {name: cache.stats() for name, cache in response_caches.items()}
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
 from app.api.endpoints import (
-    google_api_router, charity_project_router, donation_router, user_router
+    google_api_router, charity_project_router, donation_router,
+    stats_router, user_router
 )
 
 
@@ -21,6 +22,12 @@ main_router.include_router(
     tags=['Charity Projects']
 )
 
+main_router.include_router(
+    stats_router,
+    prefix='/stats',
+    tags=['Stats']
+)
+
 main_router.include_router(
     google_api_router, prefix='/google', tags=['Google']
 )
\ No newline at end of file
@@ -1,21 +1,39 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, List, Optional, TypeVar
+
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import PositiveInt
 
-from app.models.charity_project import CharityProject
+from app.core.config import settings
+from app.core.constants import CHARITY_PROJECT_NAME_CONSTRAINTS
+from app.core.investing import retry_delay
+from app.models import CharityProject, Donation, User
+from app.schemas.charity_project import (
+    CharityProjectBatchUpdate, CharityProjectUpdate
+)
 
+ProjectsType = TypeVar('ProjectsType')
 
-async def check_charity_project_name_duplicate(
-    project_name: str,
-    session: AsyncSession,
-) -> None:
-    """Название проекта уникально."""
-    from app.repositories.charity_project import charity_project_crud
 
-    project_id = await charity_project_crud.get_project_id_by_name(
-        project_name, session
-    )
-    if project_id is not None:
+@contextmanager
+def check_charity_project_name_unique() -> Iterator[None]:
+    """Название проекта уникально.
+
+    Уникальность обеспечивает индекс базы данных, поэтому название
+    не проверяется заранее: запись выполняется сразу, а нарушение
+    индекса превращается в ответ 400.
+    """
+    try:
+        yield
+    except IntegrityError as error:
+        if not any(
+            constraint in str(error.orig)
+            for constraint in CHARITY_PROJECT_NAME_CONSTRAINTS
+        ):
+            raise
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Проект с таким именем уже существует!',
@@ -25,11 +43,14 @@ async def check_charity_project_name_duplicate(
 async def check_charity_project_exists(
     project_id: int,
     session: AsyncSession,
+    use_cache: bool = True,
 ) -> CharityProject:
     """Существование проекта."""
     from app.repositories.charity_project import charity_project_crud
 
-    project = await charity_project_crud.get(project_id, session)
+    project = await charity_project_crud.get(
+        project_id, session, use_cache=use_cache
+    )
     if project is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -38,46 +59,213 @@ async def check_charity_project_exists(
     return project
 
 
-async def check_charity_project_before_delete(
-    project_id: int,
-    session: AsyncSession,
-) -> CharityProject:
+def check_charity_project_can_be_deleted(project: CharityProject) -> None:
+    """Нельзя удалить проект, в который уже внесены средства."""
+    if project.invested_amount > 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='В проект были внесены средства, нельзя удалять!'
+        )
+
+
+def check_charity_project_can_be_updated(
+    project: CharityProject,
+    full_amount: Optional[PositiveInt],
+) -> None:
     """
-    Возможность удаления проекта.
-    Нельзя удалить если уже внесены средства.
+    Нельзя обновлять закрытые проекты и устанавливать сумму меньше внесенной.
     """
-    project = await check_charity_project_exists(project_id, session)
+    if project.fully_invested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Закрытый проект нельзя редактировать!'
+        )
 
-    if project.invested_amount > 0:
+    if full_amount is not None and full_amount < project.invested_amount:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail='В проект были внесены средства, нельзя удалять!'
+            detail='Нельзя установить требуемую сумму меньше уже внесенной!'
         )
 
-    return project
 
+async def check_and_write(
+    projects: ProjectsType,
+    check: Callable[[ProjectsType], None],
+    write: Callable[[ProjectsType], Awaitable[bool]],
+    reread: Callable[[], Awaitable[ProjectsType]],
+) -> ProjectsType:
+    """Проверяет проекты и записывает их условным запросом.
+
+    Условие проверяется самим запросом записи; если строки под него
+    не подошли, проекты изменились после чтения: они перечитываются
+    из базы данных (мимо кэша объектов), и ошибка определяется по их
+    текущему состоянию. Попыток не больше `investing_retry_attempts`,
+    между ними - та же задержка, что и при конфликте инвестирования.
 
-async def check_charity_project_before_update(
+    Args:
+        projects: Проекты из базы данных.
+        check: Проверка проектов, вызывающая HTTPException.
+        write: Условная запись; False, если строки не подошли
+            под условие.
+        reread: Повторное чтение проектов.
+
+    Returns:
+        Записанные проекты.
+
+    Raises:
+        HTTPException: 409, если попытки кончились.
+    """
+    for attempt in range(settings.investing_retry_attempts):
+        if attempt:
+            await asyncio.sleep(retry_delay(attempt - 1))
+            projects = await reread()
+        check(projects)
+        if await write(projects):
+            return projects
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail='Проект одновременно изменяется другим запросом, '
+               'повторите запрос позже!'
+    )
+
+
+async def check_and_delete_charity_project(
     project_id: int,
     session: AsyncSession,
-    full_amount: PositiveInt
+) -> CharityProject:
+    """
+    Удаление проекта.
+    Нельзя удалить если уже внесены средства.
+
+    Условие проверяется самим запросом DELETE (см. `check_and_write`).
+    """
+    from app.repositories.charity_project import charity_project_crud
+
+    return await check_and_write(
+        await check_charity_project_exists(project_id, session),
+        check_charity_project_can_be_deleted,
+        lambda project: charity_project_crud.remove_uninvested(
+            [project], session
+        ),
+        lambda: check_charity_project_exists(
+            project_id, session, use_cache=False
+        ),
+    )
+
+
+async def check_and_update_charity_project(
+    project_id: int,
+    obj_in: CharityProjectUpdate,
+    session: AsyncSession,
 ) -> CharityProject:
     """
     Обновление проекта.
     Нельзя обновлять закрытые проекты и устанавливать сумму меньше внесенной.
+
+    Условие проверяется самим запросом UPDATE (см. `check_and_write`).
     """
-    project = await check_charity_project_exists(project_id, session)
+    from app.repositories.charity_project import charity_project_crud
 
-    if project.fully_invested:
+    return await check_and_write(
+        await check_charity_project_exists(project_id, session),
+        lambda project: check_charity_project_can_be_updated(
+            project, obj_in.full_amount
+        ),
+        lambda project: charity_project_crud.update_open(
+            project, obj_in, session
+        ),
+        lambda: check_charity_project_exists(
+            project_id, session, use_cache=False
+        ),
+    )
+
+
+async def check_charity_projects_exist(
+    project_ids: List[int],
+    session: AsyncSession,
+) -> List[CharityProject]:
+    """Существование всех проектов пакета."""
+    from app.repositories.charity_project import charity_project_crud
+
+    if len(set(project_ids)) < len(project_ids):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail='Закрытый проект нельзя редактировать!'
+            detail='Проекты в запросе повторяются!'
         )
-
-    if full_amount is not None and full_amount < project.invested_amount:
+    projects = await charity_project_crud.get_by_ids(session, project_ids)
+    if len(projects) < len(project_ids):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail='Нельзя установить требуемую сумму меньше уже внесенной!'
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Проект не найден!'
         )
+    return projects
 
-    return project
+
+async def check_and_delete_charity_projects(
+    project_ids: List[int],
+    session: AsyncSession,
+) -> List[CharityProject]:
+    """Удаление всех проектов пакета по тем же правилам, что и одного."""
+    from app.repositories.charity_project import charity_project_crud
+
+    def check(projects: List[CharityProject]) -> None:
+        for project in projects:
+            check_charity_project_can_be_deleted(project)
+
+    return await check_and_write(
+        await check_charity_projects_exist(project_ids, session),
+        check,
+        lambda projects: charity_project_crud.remove_uninvested(
+            projects, session
+        ),
+        lambda: check_charity_projects_exist(project_ids, session),
+    )
+
+
+async def check_and_update_charity_projects(
+    objs_in: List[CharityProjectBatchUpdate],
+    session: AsyncSession,
+) -> List[CharityProject]:
+    """Обновление всех проектов пакета по тем же правилам, что и одного.
+
+    Условия проверяются самими запросами UPDATE (см. `check_and_write`);
+    если хотя бы одна строка под них не подошла, транзакция
+    откатывается, и не обновляется ни один проект.
+    """
+    from app.repositories.charity_project import charity_project_crud
+
+    def check(projects: List[CharityProject]) -> None:
+        for project, obj_in in zip(projects, objs_in):
+            check_charity_project_can_be_updated(project, obj_in.full_amount)
+
+    project_ids = [obj_in.id for obj_in in objs_in]
+    return await check_and_write(
+        await check_charity_projects_exist(project_ids, session),
+        check,
+        lambda projects: charity_project_crud.update_open_many(
+            list(zip(projects, objs_in)), session
+        ),
+        lambda: check_charity_projects_exist(project_ids, session),
+    )
+
+
+async def check_donation_access(
+    donation_id: int,
+    user: User,
+    session: AsyncSession,
+) -> Donation:
+    """
+    Доступ к пожертвованию.
+    Пользователь видит только свои пожертвования, суперюзер - любые.
+    """
+    from app.repositories.donation import donation_crud
+
+    donation = await donation_crud.get(donation_id, session)
+    if donation is None or (
+        not user.is_superuser and donation.user_id != user.id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Пожертвование не найдено!'
+        )
+    return donation
@@ -3,10 +3,16 @@ from app.core.db import Base
 from app.models.user import User
 from app.models.charity_project import CharityProject
 from app.models.donation import Donation
+from app.models.investment_allocation import InvestmentAllocation
+from app.models.fund_counter import FundCounter
+from app.models.table_version import TableVersion
 
 __all__ = [
     'Base',
     'User',
     'CharityProject',
     'Donation',
+    'InvestmentAllocation',
+    'FundCounter',
+    'TableVersion',
 ]
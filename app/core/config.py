@@ -1,5 +1,5 @@
 from pydantic import BaseSettings, EmailStr
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -7,6 +7,38 @@ class Settings(BaseSettings):
     app_description: str = 'Сервис для поддержки котиков!'
     database_url: str = 'sqlite+aiosqlite:///./fastapi.db'
     secret: str = 'SECRET'
+    investing_engine: Literal['orm', 'sql'] = 'orm'
+    open_objects_page_size: int = 50
+    investment_ledger: bool = False
+    investing_retry_attempts: int = 5
+    investing_retry_delay: float = 0.05
+    sqlite_busy_timeout: float = 5.0
+    engine_profile: Literal['default', 'tuned'] = 'tuned'
+    engine_pool_size: int = 5
+    engine_max_overflow: int = 5
+    engine_pool_timeout: float = 30.0
+    engine_pool_recycle: int = 1800
+    sqlite_journal_mode: Optional[str] = 'wal'
+    sqlite_synchronous: Optional[str] = 'normal'
+    sqlite_cache_size: Optional[int] = -65536
+    sqlite_mmap_size: Optional[int] = 268435456
+    asyncpg_statement_cache_size: int = 100
+    replica_url: Optional[str] = None
+    read_your_writes_seconds: int = 5
+    donation_batching: bool = False
+    donation_batch_size: int = 100
+    donation_batch_delay_ms: int = 10
+    donation_import_chunk_size: int = 1000
+    legacy_list_responses: bool = True
+    default_page_size: int = 100
+    list_stream_partition_size: int = 500
+    object_cache_size: int = 0
+    object_cache_ttl: float = 60.0
+    charity_project_cache_control: str = 'public, no-cache'
+    donation_cache_control: str = 'private, no-cache'
+    response_cache_size: int = 256
+    response_cache_max_bytes: int = 32 * 1024 * 1024
+    read_coalescing: bool = True
 
     first_superuser_email: Optional[EmailStr] = None
     first_superuser_password: Optional[str] = None
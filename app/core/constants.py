@@ -1,4 +1,21 @@
 JWT_LIFETIME_SECONDS = 3600
 
-DAYS_IN_YEAR = 365
-DAYS_IN_MONTH = 30
\ No newline at end of file
+# Ключ advisory-блокировки PostgreSQL для критической секции инвестирования.
+INVESTMENT_LOCK_KEY = 420_310_517
+# Коды ошибок PostgreSQL, после которых инвестирование можно повторить:
+# serialization_failure, deadlock_detected, lock_not_available.
+RETRYABLE_POSTGRESQL_ERRORS = frozenset(('40001', '40P01', '55P03'))
+SQLITE_BUSY_MESSAGE = 'database is locked'
+# Уникальный индекс названий проектов в сообщениях SQLite и PostgreSQL.
+CHARITY_PROJECT_NAME_CONSTRAINTS = (
+    'charityproject.name', 'charityproject_name_key'
+)
+
+# Наибольший размер страницы списков объектов.
+MAX_PAGE_SIZE = 1000
+
+# Наибольшее количество объектов в пакетном запросе.
+MAX_BATCH_SIZE = 1000
+
+# Cookie, по которой недавно писавший клиент читает с основной базы данных.
+READ_YOUR_WRITES_COOKIE = 'read_primary'
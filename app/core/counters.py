@@ -0,0 +1,189 @@
+"""Агрегированные показатели фонда, обновляемые приращениями.
+
+Пересчёт показателей по всем строкам (после ручных правок в базе)::
+
+    python -m app.core.counters
+"""
+import asyncio
+from collections import Counter
+from typing import Dict, Optional, Type
+
+from sqlalchemy import case, false, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionLocal
+from app.core.versions import DIALECT_INSERTS
+from app.models import CharityProject, Donation, FundCounter
+from app.models.base import InvestmentBase
+
+OPEN_PROJECTS = 'open_projects'
+CLOSED_PROJECTS = 'closed_projects'
+OPEN_CAPACITY = 'open_capacity'
+TOTAL_RAISED = 'total_raised'
+UNALLOCATED_DONATIONS = 'unallocated_donations'
+COUNTER_NAMES = (
+    OPEN_PROJECTS,
+    CLOSED_PROJECTS,
+    OPEN_CAPACITY,
+    TOTAL_RAISED,
+    UNALLOCATED_DONATIONS,
+)
+
+
+def contribution(obj) -> Counter:
+    """Возвращает вклад объекта в показатели фонда.
+
+    Args:
+        obj: Проект, пожертвование или объект другой модели.
+
+    Returns:
+        Counter: Значения показателей, которые даёт объект.
+    """
+    if not isinstance(obj, InvestmentBase):
+        return Counter()
+    is_closed = bool(obj.fully_invested)
+    remaining = 0 if is_closed else (
+        obj.full_amount - (obj.invested_amount or 0)
+    )
+    if isinstance(obj, CharityProject):
+        return Counter({
+            OPEN_PROJECTS: int(not is_closed),
+            CLOSED_PROJECTS: int(is_closed),
+            OPEN_CAPACITY: remaining,
+        })
+    return Counter({
+        TOTAL_RAISED: obj.full_amount,
+        UNALLOCATED_DONATIONS: remaining,
+    })
+
+
+def investment_deltas(
+    model: Type[InvestmentBase],
+    invested_amount: int,
+    closed_count: int,
+) -> Counter:
+    """Возвращает изменение показателей от инвестирования в открытые объекты.
+
+    Args:
+        model: Модель объектов, в которые распределены средства.
+        invested_amount: Распределённая в них сумма.
+        closed_count: Количество закрытых при этом объектов.
+
+    Returns:
+        Counter: Приращения показателей.
+    """
+    if model is CharityProject:
+        return Counter({
+            OPEN_PROJECTS: -closed_count,
+            CLOSED_PROJECTS: closed_count,
+            OPEN_CAPACITY: -invested_amount,
+        })
+    return Counter({UNALLOCATED_DONATIONS: -invested_amount})
+
+
+async def change_counters(session: AsyncSession, deltas: Counter) -> None:
+    """Прибавляет приращения к показателям в текущей транзакции.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        deltas: Приращения показателей; нулевые пропускаются.
+    """
+    rows = [
+        {'name': name, 'value': value}
+        for name, value in sorted(deltas.items()) if value
+    ]
+    if not rows:
+        return
+    statement = DIALECT_INSERTS[session.bind.dialect.name](FundCounter)
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[FundCounter.name],
+            set_={'value': FundCounter.value + statement.excluded.value},
+        ),
+        rows,
+    )
+
+
+async def get_counters(session: AsyncSession) -> Dict[str, int]:
+    """Возвращает записанные показатели фонда.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+
+    Returns:
+        Dict[str, int]: Показатели по названиям; показателей, которые
+        ещё ни разу не менялись, в словаре нет.
+    """
+    counters = await session.execute(
+        select(FundCounter.name, FundCounter.value)
+    )
+    return dict(counters.all())
+
+
+async def get_counter(
+    session: AsyncSession, name: str
+) -> Optional[int]:
+    """Возвращает показатель фонда или None, если он не записан."""
+    return await session.scalar(
+        select(FundCounter.value).where(FundCounter.name == name)
+    )
+
+
+async def count_counters(session: AsyncSession) -> Dict[str, int]:
+    """Считает показатели фонда заново по всем строкам."""
+    is_open = CharityProject.fully_invested == false()
+    projects = (await session.execute(select(
+        func.count(case((is_open, 1))),
+        func.count(case((~is_open, 1))),
+        func.coalesce(func.sum(case((
+            is_open,
+            CharityProject.full_amount - CharityProject.invested_amount,
+        ), else_=0)), 0),
+    ))).one()
+    donations = (await session.execute(select(
+        func.coalesce(func.sum(Donation.full_amount), 0),
+        func.coalesce(func.sum(case((
+            Donation.fully_invested == false(),
+            Donation.full_amount - Donation.invested_amount,
+        ), else_=0)), 0),
+    ))).one()
+    return dict(zip(COUNTER_NAMES, (*projects, *donations)))
+
+
+async def rebuild_counters(session: AsyncSession) -> Dict[str, int]:
+    """Пересчитывает показатели фонда и записывает их в текущей транзакции.
+
+    Пересчёт нужно выполнять под блокировкой инвестирования
+    (`lock_investments`), чтобы параллельные приращения не потерялись.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+
+    Returns:
+        Dict[str, int]: Пересчитанные показатели.
+    """
+    counters = await count_counters(session)
+    statement = DIALECT_INSERTS[session.bind.dialect.name](FundCounter)
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[FundCounter.name],
+            set_={'value': statement.excluded.value},
+        ),
+        [{'name': name, 'value': value} for name, value in counters.items()],
+    )
+    return counters
+
+
+async def run() -> Dict[str, int]:
+    from app.core.investing import lock_investments
+
+    async with AsyncSessionLocal() as session:
+        await lock_investments(session)
+        counters = await rebuild_counters(session)
+        await session.commit()
+    return counters
+
+
+if __name__ == '__main__':
+    for name, value in asyncio.run(run()).items():
+        print(f'{name}: {value}')
@@ -1,10 +1,23 @@
-from typing import AsyncGenerator
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, AsyncGenerator, Callable, Dict, Iterator
 
-from sqlalchemy import Column, Integer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
+from fastapi import Request
+from sqlalchemy import Column, Integer, event, inspect
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine, AsyncSession, create_async_engine
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import (
+    Session, declarative_base, declared_attr, sessionmaker
+)
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.sql.functions import FunctionElement
 
 from app.core.config import settings
+from app.core.constants import READ_YOUR_WRITES_COOKIE
 
 
 class PreBase:
@@ -17,9 +30,253 @@ class PreBase:
 
 Base = declarative_base(cls=PreBase)
 
-engine = create_async_engine(settings.database_url)
+# PRAGMA SQLite профиля `tuned`, значения берутся из настроек `sqlite_*`.
+SQLITE_PRAGMAS = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size')
+
+
+def engine_options(url: URL) -> Dict[str, Any]:
+    """Возвращает параметры `create_async_engine` для профиля базы данных.
+
+    Профиль `default` оставляет параметры SQLAlchemy по умолчанию.
+    Профиль `tuned` ограничивает пул соединений настройками
+    `engine_pool_*`, на PostgreSQL проверяет соединения перед выдачей
+    и включает кэш подготовленных запросов asyncpg, а файловую базу
+    SQLite держит в пуле открытых соединений: по умолчанию SQLAlchemy 1.4
+    открывает её заново для каждой сессии.
+
+    Args:
+        url: Адрес базы данных.
+
+    Returns:
+        Dict[str, Any]: Именованные аргументы `create_async_engine`.
+    """
+    backend = url.get_backend_name()
+    connect_args: Dict[str, Any] = {}
+    options: Dict[str, Any] = {'connect_args': connect_args}
+    if backend == 'sqlite':
+        connect_args['timeout'] = settings.sqlite_busy_timeout
+    if settings.engine_profile == 'default':
+        return options
+    pool_options = {
+        'pool_size': settings.engine_pool_size,
+        'max_overflow': settings.engine_max_overflow,
+        'pool_timeout': settings.engine_pool_timeout,
+    }
+    if backend == 'postgresql':
+        options.update(
+            pool_options,
+            pool_recycle=settings.engine_pool_recycle,
+            pool_pre_ping=True,
+        )
+        if url.get_driver_name() == 'asyncpg':
+            connect_args.update(
+                prepared_statement_cache_size=(
+                    settings.asyncpg_statement_cache_size
+                ),
+                statement_cache_size=settings.asyncpg_statement_cache_size,
+            )
+    elif backend == 'sqlite' and url.database not in (None, '', ':memory:'):
+        options.update(pool_options, poolclass=AsyncAdaptedQueuePool)
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Выполняет PRAGMA профиля `tuned` на новом соединении SQLite.
+
+    PRAGMA с пустым значением в настройках пропускается.
+    """
+    cursor = dbapi_connection.cursor()
+    for name in SQLITE_PRAGMAS:
+        value = getattr(settings, f'sqlite_{name}')
+        if value is not None:
+            cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+
+def create_database_engine(database_url: str) -> AsyncEngine:
+    """Создаёт движок базы данных с параметрами `engine_profile`.
+
+    Args:
+        database_url: Адрес базы данных.
+
+    Returns:
+        AsyncEngine: Асинхронный движок SQLAlchemy.
+    """
+    url = make_url(database_url)
+    database_engine = create_async_engine(url, **engine_options(url))
+    if (url.get_backend_name() == 'sqlite' and
+            settings.engine_profile == 'tuned'):
+        event.listen(
+            database_engine.sync_engine, 'connect', set_sqlite_pragmas
+        )
+    return database_engine
+
+
+def pool_stats(database_engine: AsyncEngine) -> Dict[str, Any]:
+    """Возвращает использование пула соединений движка.
+
+    Args:
+        database_engine: Асинхронный движок SQLAlchemy.
+
+    Returns:
+        Dict[str, Any]: Класс пула, а для пула с очередью - его размер,
+        свободные и выданные соединения и соединения сверх размера.
+    """
+    pool = database_engine.sync_engine.pool
+    stats: Dict[str, Any] = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    return stats
+
+
+def set_query_only(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA query_only = ON')
+    cursor.close()
+
+
+def create_read_engine(primary_engine: AsyncEngine) -> AsyncEngine:
+    """Создаёт движок для чтения списков и отчётов.
+
+    Если задан `replica_url`, чтение идёт с реплики. Файловая SQLite
+    в режиме WAL читается отдельным пулом соединений к тому же файлу,
+    открытых только для чтения: читатели WAL не ждут запись и не мешают
+    ей. В остальных случаях используется основной движок.
+
+    Args:
+        primary_engine: Движок основной базы данных.
+
+    Returns:
+        AsyncEngine: Движок чтения.
+    """
+    if settings.replica_url is not None:
+        return create_database_engine(settings.replica_url)
+    url = primary_engine.url
+    if (url.get_backend_name() == 'sqlite' and
+            url.database not in (None, '', ':memory:') and
+            settings.engine_profile == 'tuned' and
+            (settings.sqlite_journal_mode or '').lower() == 'wal'):
+        read_engine = create_database_engine(str(url))
+        event.listen(read_engine.sync_engine, 'connect', set_query_only)
+        return read_engine
+    return primary_engine
+
+
+engine = create_database_engine(settings.database_url)
+read_engine = create_read_engine(engine)
 
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
+AsyncReadSessionLocal = sessionmaker(read_engine, class_=AsyncSession)
+
+AFTER_COMMIT_CALLBACKS = 'after_commit_callbacks'
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Регистрирует функцию, которая выполнится после коммита транзакции.
+
+    При откате транзакции зарегистрированные функции отбрасываются.
+
+    Args:
+        session: Асинхронная сессия с текущей транзакцией.
+        callback: Функция без аргументов.
+    """
+    session.sync_session.info.setdefault(
+        AFTER_COMMIT_CALLBACKS, []
+    ).append(callback)
+
+
+@contextmanager
+def keep_loaded_on_commit(session: AsyncSession) -> Iterator[None]:
+    """Временно отключает истечение атрибутов объектов при коммите.
+
+    Значения, записанные в транзакции, уже есть в объектах сессии,
+    поэтому после коммита их не нужно перечитывать из базы данных.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+    """
+    sync_session = session.sync_session
+    expire_on_commit = sync_session.expire_on_commit
+    sync_session.expire_on_commit = False
+    try:
+        yield
+    finally:
+        sync_session.expire_on_commit = expire_on_commit
+
+
+def load_inserted_nulls(obj) -> None:
+    """Отмечает колонки, не переданные в INSERT, как загруженные NULL.
+
+    После INSERT такие колонки остаются незагруженными, и обращение
+    к ним выполнило бы отдельный SELECT. Колонки с серверным значением
+    по умолчанию пропускаются: их значение известно только базе данных.
+
+    Args:
+        obj: Объект сразу после INSERT.
+    """
+    state = inspect(obj)
+    for column_attr in state.mapper.column_attrs:
+        if (column_attr.key in state.unloaded and
+                column_attr.columns[0].server_default is None):
+            set_committed_value(obj, column_attr.key, None)
+
+
+class SecondsBetween(FunctionElement):
+    """Разность двух дат в целых секундах; доли секунды отбрасываются.
+
+    Совпадает с `seconds_between` в Python.
+    """
+
+    type = Integer()
+    name = 'seconds_between'
+    inherit_cache = True
+
+
+@compiles(SecondsBetween, 'sqlite')
+def compile_seconds_between_sqlite(element, compiler, **kw):
+    end, start = (
+        compiler.process(clause, **kw) for clause in element.clauses
+    )
+    # strftime округляет доли секунды до миллисекунд, поэтому они
+    # отрезаются от строки даты заранее.
+    return (
+        f"(strftime('%s', substr({end}, 1, 19)) - "
+        f"strftime('%s', substr({start}, 1, 19)))"
+    )
+
+
+@compiles(SecondsBetween, 'postgresql')
+def compile_seconds_between_postgresql(element, compiler, **kw):
+    end, start = (
+        compiler.process(clause, **kw) for clause in element.clauses
+    )
+    return (
+        "CAST(EXTRACT(EPOCH FROM date_trunc('second', "
+        f"{end}) - date_trunc('second', {start})) AS INTEGER)"
+    )
+
+
+def seconds_between(end: datetime, start: datetime) -> int:
+    """Разность двух дат в целых секундах, как в `SecondsBetween`."""
+    return int((
+        end.replace(microsecond=0) - start.replace(microsecond=0)
+    ).total_seconds())
+
+
+@event.listens_for(Session, 'after_commit')
+def run_after_commit_callbacks(session: Session) -> None:
+    for callback in session.info.pop(AFTER_COMMIT_CALLBACKS, []):
+        callback()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_after_commit_callbacks(session: Session, previous_transaction):
+    session.info.pop(AFTER_COMMIT_CALLBACKS, None)
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
@@ -30,3 +287,28 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """
     async with AsyncSessionLocal() as async_session:
         yield async_session
+
+
+async def get_read_session(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
+    """Генератор сессий чтения для Dependency Injection.
+
+    Сессия привязана к движку чтения (`read_engine`). Клиент, который
+    недавно писал в базу данных (cookie `READ_YOUR_WRITES_COOKIE`),
+    читает с основной базы данных и видит свои изменения, даже если
+    реплика от неё отстаёт.
+
+    Args:
+        request: Текущий запрос.
+
+    Yields:
+        AsyncSession: Асинхронная сессия для чтения.
+    """
+    session_factory = (
+        AsyncSessionLocal
+        if READ_YOUR_WRITES_COOKIE in request.cookies
+        else AsyncReadSessionLocal
+    )
+    async with session_factory() as async_session:
+        yield async_session
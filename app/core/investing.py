@@ -1,27 +1,80 @@
+import asyncio
+import random
 from datetime import datetime
-from typing import List
+from typing import Awaitable, Callable, List, Tuple, Type, TypeVar
 
+from sqlalchemy import (
+    DateTime, Integer, and_, case, false, func, insert, literal, or_, select,
+    text, update
+)
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.constants import (
+    INVESTMENT_LOCK_KEY, RETRYABLE_POSTGRESQL_ERRORS, SQLITE_BUSY_MESSAGE
+)
+from app.core.counters import (
+    change_counters, contribution, investment_deltas
+)
+from app.core.db import (
+    SecondsBetween, keep_loaded_on_commit, seconds_between
+)
+from app.core.ledger import get_planned_objects, track_investment
+from app.core.object_cache import invalidate_objects
+from app.core.versions import bump_versions, get_versions
 from app.models.base import InvestmentBase
+from app.models.donation import Donation
+from app.models.investment_allocation import InvestmentAllocation
+
+ResultType = TypeVar('ResultType')
+# Новый объект, затронутый им открытый объект и внесённая сумма.
+Allocation = Tuple[InvestmentBase, InvestmentBase, int]
+
+
+class InvestmentConflictError(Exception):
+    """Критическая секция инвестирования занята дольше допустимого."""
+
+
+def close(obj: InvestmentBase) -> None:
+    """Закрывает полностью проинвестированный объект.
+
+    Новый объект ещё не получил `create_date`: он закрывается в момент
+    создания, и время его сбора равно нулю.
+    """
+    obj.fully_invested = True
+    obj.close_date = datetime.utcnow()
+    obj.close_duration_seconds = (
+        0 if obj.create_date is None
+        else seconds_between(obj.close_date, obj.create_date)
+    )
 
 
 async def distribute_funds(
     session: AsyncSession,
     new_obj: InvestmentBase,
     open_objects: List[InvestmentBase],
-) -> None:
+) -> Tuple[List[Tuple[InvestmentBase, int]], List[InvestmentBase]]:
     """Распределяет средства между объектами инвестирования.
 
-    Автоматически закрывает объекты (устанавливает флаг `fully_invested`
-    и `close_date`), когда они полностью проинвестированы.
+    Автоматически закрывает объекты (устанавливает флаг `fully_invested`,
+    `close_date` и `close_duration_seconds`), когда они полностью
+    проинвестированы. Открытый объект, которому уже ничего не нужно
+    (например, после уменьшения `full_amount` до внесённой суммы),
+    закрывается без распределения средств.
 
     Args:
         session: Асинхронная сессия для работы с базой данных.
         new_obj: Новый объект для инвестирования.
         open_objects: Список открытых объектов (проектов или пожертвований).
+
+    Returns:
+        Пары (открытый объект, внесённая в него сумма) по порядку
+        и все закрытые открытые объекты.
     """
     required_amount = new_obj.full_amount - new_obj.invested_amount
+    allocations = []
+    closed_objects = []
 
     for obj in open_objects:
         if required_amount <= 0:
@@ -32,13 +85,461 @@ async def distribute_funds(
 
         obj.invested_amount += investment_amount
         new_obj.invested_amount += investment_amount
+        if investment_amount > 0:
+            allocations.append((obj, investment_amount))
 
         if obj.invested_amount == obj.full_amount:
-            obj.fully_invested = True
-            obj.close_date = datetime.utcnow()
+            close(obj)
+            closed_objects.append(obj)
 
         required_amount -= investment_amount
 
     if new_obj.invested_amount == new_obj.full_amount:
-        new_obj.fully_invested = True
-        new_obj.close_date = datetime.utcnow()
+        close(new_obj)
+
+    return allocations, closed_objects
+
+
+async def distribute_funds_sql(
+    session: AsyncSession,
+    new_obj: InvestmentBase,
+    model: Type[InvestmentBase],
+) -> int:
+    """Распределяет средства набором SQL-запросов, не загружая объекты.
+
+    Нарастающий итог остатков открытых объектов считается оконной
+    функцией в порядке `create_date`, `id`. По нему находится последний
+    затрагиваемый объект, после чего все объекты перед ним закрываются
+    одним UPDATE, а сам он пополняется вторым. Распределения по
+    затронутым объектам записываются заранее одним INSERT ... SELECT
+    из того же нарастающего итога. Результат совпадает
+    с `distribute_funds`.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        new_obj: Новый объект для инвестирования.
+        model: Модель противоположных объектов (проектов или пожертвований).
+
+    Returns:
+        int: Количество закрытых противоположных объектов.
+    """
+    required_amount = new_obj.full_amount - new_obj.invested_amount
+    closed_count = 0
+
+    if required_amount > 0:
+        remaining = model.full_amount - model.invested_amount
+        open_pool = select(
+            model.id,
+            model.create_date,
+            remaining.label('remaining'),
+            func.sum(remaining).over(
+                order_by=(model.create_date, model.id)
+            ).label('running_total'),
+            func.row_number().over(
+                order_by=(model.create_date, model.id)
+            ).label('position'),
+        ).where(
+            model.fully_invested == false()
+        ).subquery()
+        last_touched = (await session.execute(
+            select(open_pool).where(
+                open_pool.c.running_total - open_pool.c.remaining <
+                required_amount
+            ).order_by(
+                open_pool.c.create_date.desc(), open_pool.c.id.desc()
+            ).limit(1)
+        )).first()
+
+        if last_touched is not None:
+            await record_allocations_sql(
+                session, new_obj, open_pool, required_amount
+            )
+            close_date = datetime.utcnow()
+            close_duration = SecondsBetween(
+                literal(close_date, DateTime), model.create_date
+            )
+            filled_before = last_touched.running_total - last_touched.remaining
+            investment_amount = min(
+                last_touched.remaining, required_amount - filled_before
+            )
+            await session.execute(
+                update(model).where(
+                    model.fully_invested == false(),
+                    or_(
+                        model.create_date < last_touched.create_date,
+                        and_(
+                            model.create_date == last_touched.create_date,
+                            model.id < last_touched.id,
+                        ),
+                    ),
+                ).values(
+                    invested_amount=model.full_amount,
+                    fully_invested=True,
+                    close_date=close_date,
+                    close_duration_seconds=close_duration,
+                ).execution_options(synchronize_session=False)
+            )
+            boundary_values = {
+                'invested_amount': model.invested_amount + investment_amount
+            }
+            closed_count = last_touched.position - 1
+            if investment_amount == last_touched.remaining:
+                boundary_values.update(
+                    fully_invested=True,
+                    close_date=close_date,
+                    close_duration_seconds=close_duration,
+                )
+                closed_count += 1
+            await session.execute(
+                update(model).where(
+                    model.id == last_touched.id
+                ).values(
+                    **boundary_values
+                ).execution_options(synchronize_session=False)
+            )
+            new_obj.invested_amount += filled_before + investment_amount
+
+    if new_obj.invested_amount == new_obj.full_amount:
+        close(new_obj)
+
+    return closed_count
+
+
+async def record_allocations_sql(
+    session: AsyncSession,
+    new_obj: InvestmentBase,
+    open_pool,
+    required_amount: int,
+) -> None:
+    """Записывает распределения средств нового объекта одним запросом.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        new_obj: Новый объект для инвестирования.
+        open_pool: Подзапрос открытых объектов с нарастающим итогом.
+        required_amount: Сумма, которую нужно распределить.
+    """
+    await session.flush()
+    filled_before = open_pool.c.running_total - open_pool.c.remaining
+    new_obj_id = literal(new_obj.id, Integer)
+    if isinstance(new_obj, Donation):
+        donation_id, project_id = new_obj_id, open_pool.c.id
+    else:
+        donation_id, project_id = open_pool.c.id, new_obj_id
+    await session.execute(
+        insert(InvestmentAllocation).from_select(
+            ['donation_id', 'project_id', 'amount', 'created_at'],
+            select(
+                donation_id,
+                project_id,
+                case(
+                    (
+                        open_pool.c.running_total <= required_amount,
+                        open_pool.c.remaining,
+                    ),
+                    else_=required_amount - filled_before,
+                ),
+                literal(datetime.utcnow(), DateTime),
+            ).where(
+                filled_before < required_amount, open_pool.c.remaining > 0
+            )
+        )
+    )
+
+
+async def record_allocations(
+    session: AsyncSession,
+    allocations: List[Allocation],
+) -> None:
+    """Записывает распределения средств одной пакетной вставкой.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        allocations: Распределения в порядке инвестирования.
+    """
+    if not allocations:
+        return
+    await session.flush()
+    created_at = datetime.utcnow()
+    rows = []
+    for new_obj, obj, amount in allocations:
+        donation, project = (
+            (new_obj, obj) if isinstance(new_obj, Donation)
+            else (obj, new_obj)
+        )
+        rows.append({
+            'donation_id': donation.id,
+            'project_id': project.id,
+            'amount': amount,
+            'created_at': created_at,
+        })
+    await session.execute(insert(InvestmentAllocation), rows)
+
+
+async def invest_many(
+    session: AsyncSession,
+    new_objs: List[InvestmentBase],
+    opposite_crud,
+) -> None:
+    """Инвестирует новые объекты в открытые объекты противоположной модели.
+
+    Новые объекты обрабатываются по очереди в переданном порядке
+    и используют общий поток открытых объектов, поэтому пачка объектов
+    распределяется так же, как если бы они создавались по одному.
+
+    Движок распределения выбирается настройкой `investing_engine`:
+    `orm` распределяет средства в `distribute_funds`, `sql` выполняет
+    распределение в базе данных через `distribute_funds_sql`. Движок
+    `orm` читает открытые объекты страницами по `open_objects_page_size`,
+    а при включённой настройке `investment_ledger` загружает только
+    затрагиваемые объекты, выбранные по очереди в памяти процесса.
+
+    В той же транзакции увеличиваются версии таблиц обеих моделей,
+    записываются распределения средств (`InvestmentAllocation`) -
+    движок `orm` вставляет их одним пакетом на весь вызов - и меняются
+    показатели фонда (`FundCounter`) с учётом новых объектов.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        new_objs: Новые объекты для инвестирования.
+        opposite_crud: CRUD-объект противоположной модели.
+    """
+    if not new_objs:
+        return
+    models = (type(new_objs[0]), opposite_crud.model)
+    opposite_table = opposite_crud.model.__tablename__
+    invested_before = sum(new_obj.invested_amount for new_obj in new_objs)
+    use_ledger = (
+        settings.investment_ledger and settings.investing_engine == 'orm'
+    )
+    if use_ledger:
+        versions_before = await get_versions(session, models)
+
+    allocations = []
+    closed_objects = []
+    closed_count = 0
+    if settings.investing_engine == 'sql':
+        for new_obj in new_objs:
+            closed_count += await distribute_funds_sql(
+                session, new_obj, opposite_crud.model
+            )
+    else:
+        open_objects = None
+        if use_ledger:
+            open_objects = await get_planned_objects(
+                session,
+                opposite_crud,
+                sum(
+                    new_obj.full_amount - new_obj.invested_amount
+                    for new_obj in new_objs
+                ),
+                versions_before[opposite_table],
+            )
+        if open_objects is not None:
+            for new_obj in new_objs:
+                obj_allocations, obj_closed = await distribute_funds(
+                    session, new_obj, open_objects
+                )
+                allocations.extend(
+                    (new_obj, obj, amount) for obj, amount in obj_allocations
+                )
+                closed_objects.extend(obj_closed)
+                open_objects = [
+                    obj for obj in open_objects if not obj.fully_invested
+                ]
+        else:
+            allocations, closed_objects = await distribute_funds_by_pages(
+                session, new_objs, opposite_crud
+            )
+        # Объект с нулевым остатком закрывается без распределения
+        # средств, поэтому закрытые считаются отдельно от распределений.
+        closed_count = len(closed_objects)
+    await record_allocations(session, allocations)
+    invested_amount = sum(
+        new_obj.invested_amount for new_obj in new_objs
+    ) - invested_before
+    deltas = investment_deltas(
+        opposite_crud.model, invested_amount, closed_count
+    )
+    for new_obj in new_objs:
+        deltas.update(contribution(new_obj))
+    await change_counters(session, deltas)
+
+    versions_after = await bump_versions(session, models)
+    invalidate_objects(
+        session, models[0], versions_after[models[0].__tablename__], ()
+    )
+    invalidate_objects(
+        session,
+        opposite_crud.model,
+        versions_after[opposite_table],
+        # Движок `sql` не сообщает, какие открытые объекты изменились.
+        # Закрытые без распределения средств объекты тоже изменены.
+        None if settings.investing_engine == 'sql' else {
+            obj.id for _, obj, _ in allocations
+        } | {obj.id for obj in closed_objects},
+    )
+    if use_ledger:
+        await session.flush()
+        track_investment(
+            session,
+            new_objs,
+            opposite_crud.model,
+            invested_amount,
+            versions_before,
+            versions_after,
+        )
+
+
+async def distribute_funds_by_pages(
+    session: AsyncSession,
+    new_objs: List[InvestmentBase],
+    opposite_crud,
+) -> Tuple[List[Allocation], List[InvestmentBase]]:
+    """Распределяет средства, читая открытые объекты keyset-страницами.
+
+    Чтение прекращается, как только новые объекты полностью
+    проинвестированы.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        new_objs: Новые объекты для инвестирования.
+        opposite_crud: CRUD-объект противоположной модели.
+
+    Returns:
+        Распределения средств в порядке инвестирования и закрытые
+        открытые объекты.
+    """
+    page_size = settings.open_objects_page_size
+    allocations = []
+    closed_objects = []
+    open_objects = []
+    last_obj = None
+    has_more = True
+    for new_obj in new_objs:
+        while new_obj.invested_amount < new_obj.full_amount:
+            if not open_objects:
+                if not has_more:
+                    break
+                open_objects = await opposite_crud.get_open_objects(
+                    session, after=last_obj, limit=page_size
+                )
+                has_more = len(open_objects) == page_size
+                if not open_objects:
+                    break
+                last_obj = open_objects[-1]
+            obj_allocations, obj_closed = await distribute_funds(
+                session, new_obj, open_objects
+            )
+            allocations.extend(
+                (new_obj, obj, amount) for obj, amount in obj_allocations
+            )
+            closed_objects.extend(obj_closed)
+            open_objects = [
+                obj for obj in open_objects if not obj.fully_invested
+            ]
+    return allocations, closed_objects
+
+
+async def invest(
+    session: AsyncSession,
+    new_obj: InvestmentBase,
+    opposite_crud,
+) -> None:
+    """Инвестирует новый объект в открытые объекты противоположной модели.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        new_obj: Новый объект для инвестирования.
+        opposite_crud: CRUD-объект противоположной модели.
+    """
+    await invest_many(session, [new_obj], opposite_crud)
+
+
+async def lock_investments(session: AsyncSession) -> None:
+    """Захватывает блокировку критической секции инвестирования.
+
+    В PostgreSQL берётся транзакционная advisory-блокировка, в SQLite
+    транзакция начинается с `BEGIN IMMEDIATE`, то есть сразу с блокировкой
+    на запись. Блокировка снимается при завершении транзакции, поэтому
+    её нужно брать до первой записи в транзакции.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+    """
+    dialect_name = session.bind.dialect.name
+    if dialect_name == 'postgresql':
+        await session.execute(
+            select(func.pg_advisory_xact_lock(INVESTMENT_LOCK_KEY))
+        )
+    elif dialect_name == 'sqlite':
+        await session.execute(text('BEGIN IMMEDIATE'))
+
+
+def is_lock_conflict(error: DBAPIError) -> bool:
+    """Проверяет, что ошибка вызвана конкурентным доступом к данным.
+
+    Args:
+        error: Ошибка драйвера базы данных.
+
+    Returns:
+        bool: True, если операцию имеет смысл повторить.
+    """
+    code = getattr(error.orig, 'pgcode', None) or getattr(
+        error.orig, 'sqlstate', None
+    )
+    return (
+        code in RETRYABLE_POSTGRESQL_ERRORS or
+        SQLITE_BUSY_MESSAGE in str(error.orig)
+    )
+
+
+def retry_delay(attempt: int) -> float:
+    """Задержка перед повтором после попытки `attempt` (с нуля).
+
+    Экспоненциальная задержка от `investing_retry_delay` со случайным
+    разбросом, чтобы одновременные запросы не повторялись вместе.
+    """
+    return (
+        settings.investing_retry_delay * 2 ** attempt *
+        random.uniform(0.5, 1.5)
+    )
+
+
+async def run_investment(
+    session: AsyncSession,
+    operation: Callable[[], Awaitable[ResultType]],
+) -> ResultType:
+    """Выполняет операцию инвестирования в критической секции.
+
+    Операция выполняется под `lock_investments` и фиксируется одним
+    коммитом. При конфликте блокировок транзакция откатывается,
+    и операция повторяется с экспоненциальной задержкой, но не более
+    `investing_retry_attempts` раз.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        operation: Корутина-функция, создающая и инвестирующая объекты.
+
+    Returns:
+        Результат операции.
+
+    Raises:
+        InvestmentConflictError: Если блокировку так и не удалось получить.
+    """
+    for attempt in range(settings.investing_retry_attempts):
+        try:
+            await lock_investments(session)
+            result = await operation()
+            with keep_loaded_on_commit(session):
+                await session.commit()
+            return result
+        except DBAPIError as error:
+            await session.rollback()
+            if not is_lock_conflict(error):
+                raise
+        await asyncio.sleep(retry_delay(attempt))
+    raise InvestmentConflictError(
+        'Не удалось распределить средства: слишком много '
+        'одновременных операций инвестирования.'
+    )
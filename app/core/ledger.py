@@ -0,0 +1,215 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from sqlalchemy import false, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import on_commit
+from app.models.base import InvestmentBase
+
+LEDGER_LOAD_CHUNK_SIZE = 10000
+# Голова очереди сдвигается без копирования; массивы сжимаются, когда
+# закрытых элементов в начале накапливается больше этого числа.
+LEDGER_COMPACT_THRESHOLD = 4096
+
+
+class OpenPoolLedger:
+    """Очередь открытых объектов одной модели в памяти процесса.
+
+    Хранит идентификаторы и остатки (`full_amount - invested_amount`)
+    открытых объектов в порядке `create_date`, `id` в двух массивах
+    `array('q')`, а не ORM-объекты. Версия очереди совпадает с версией
+    таблицы (`TableVersion`), из которой она загружена; при расхождении
+    очередь загружается заново.
+    """
+
+    def __init__(self, model: Type[InvestmentBase]):
+        self.model = model
+        self.version: Optional[int] = None
+        self._ids = array('q')
+        self._remaining = array('q')
+        self._head = 0
+
+    def __len__(self) -> int:
+        return len(self._ids) - self._head
+
+    def entries(self) -> List[Tuple[int, int]]:
+        """Возвращает пары (id, остаток) открытых объектов по порядку."""
+        return list(zip(
+            self._ids[self._head:], self._remaining[self._head:]
+        ))
+
+    async def load(self, session: AsyncSession, version: int) -> None:
+        """Загружает открытые объекты модели из базы данных.
+
+        Args:
+            session: Асинхронная сессия для работы с базой данных.
+            version: Версия таблицы, прочитанная в той же транзакции.
+        """
+        ids, remaining = array('q'), array('q')
+        result = await session.stream(
+            select(
+                self.model.id,
+                self.model.full_amount - self.model.invested_amount,
+            ).where(
+                self.model.fully_invested == false()
+            ).order_by(
+                self.model.create_date, self.model.id
+            )
+        )
+        async for rows in result.partitions(LEDGER_LOAD_CHUNK_SIZE):
+            for obj_id, obj_remaining in rows:
+                ids.append(obj_id)
+                remaining.append(obj_remaining)
+        self._ids, self._remaining, self._head = ids, remaining, 0
+        self.version = version
+
+    def invalidate(self) -> None:
+        """Помечает очередь устаревшей; она загрузится при следующем вызове."""
+        self.version = None
+
+    def plan(self, amount: int) -> List[int]:
+        """Возвращает объекты, которые затронет инвестирование суммы.
+
+        Объекты перебираются с головы очереди, пока сумма не исчерпана,
+        так же как в `distribute_funds`.
+
+        Args:
+            amount: Сумма, которую нужно распределить.
+
+        Returns:
+            List[int]: Идентификаторы затрагиваемых объектов по порядку.
+        """
+        ids = []
+        for index in range(self._head, len(self._ids)):
+            if amount <= 0:
+                break
+            ids.append(self._ids[index])
+            amount -= min(self._remaining[index], amount)
+        return ids
+
+    def matches(self, objs: List[InvestmentBase]) -> bool:
+        """Проверяет, что загруженные объекты совпадают с головой очереди."""
+        head = self._head
+        return len(objs) <= len(self) and all(
+            not obj.fully_invested and
+            obj.id == self._ids[head + index] and
+            obj.full_amount - obj.invested_amount ==
+            self._remaining[head + index]
+            for index, obj in enumerate(objs)
+        )
+
+    def consume(self, amount: int) -> None:
+        """Списывает распределённую сумму с головы очереди.
+
+        Args:
+            amount: Сумма, распределённая в объекты очереди.
+        """
+        while amount > 0 and self._head < len(self._ids):
+            investment_amount = min(self._remaining[self._head], amount)
+            self._remaining[self._head] -= investment_amount
+            amount -= investment_amount
+            if self._remaining[self._head] == 0:
+                self._head += 1
+        if self._head > LEDGER_COMPACT_THRESHOLD:
+            del self._ids[:self._head]
+            del self._remaining[:self._head]
+            self._head = 0
+
+    def extend(self, entries: Iterable[Tuple[int, int]]) -> None:
+        """Добавляет новые открытые объекты в конец очереди."""
+        for obj_id, obj_remaining in entries:
+            self._ids.append(obj_id)
+            self._remaining.append(obj_remaining)
+
+
+ledgers: Dict[Type[InvestmentBase], OpenPoolLedger] = {}
+
+
+def get_ledger(model: Type[InvestmentBase]) -> OpenPoolLedger:
+    """Возвращает очередь открытых объектов модели, создавая её."""
+    if model not in ledgers:
+        ledgers[model] = OpenPoolLedger(model)
+    return ledgers[model]
+
+
+def invalidate_ledger(session: AsyncSession, model) -> None:
+    """Сбрасывает очередь модели после коммита текущей транзакции."""
+    if model in ledgers:
+        on_commit(session, ledgers[model].invalidate)
+
+
+async def get_planned_objects(
+    session: AsyncSession,
+    opposite_crud,
+    amount: int,
+    version: int,
+) -> Optional[List[InvestmentBase]]:
+    """Загружает только те открытые объекты, которые затронет инвестирование.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        opposite_crud: CRUD-объект противоположной модели.
+        amount: Сумма, которую нужно распределить.
+        version: Текущая версия таблицы противоположной модели.
+
+    Returns:
+        Затрагиваемые объекты в порядке очереди или None, если очередь
+        разошлась с базой данных и её нельзя использовать.
+    """
+    ledger = get_ledger(opposite_crud.model)
+    if ledger.version != version:
+        await ledger.load(session, version)
+    objs = await opposite_crud.get_by_ids(session, ledger.plan(amount))
+    if not ledger.matches(objs):
+        ledger.invalidate()
+        return None
+    return objs
+
+
+def track_investment(
+    session: AsyncSession,
+    new_objs: List[InvestmentBase],
+    opposite_model: Type[InvestmentBase],
+    invested_amount: int,
+    versions_before: Dict[str, int],
+    versions_after: Dict[str, int],
+) -> None:
+    """Обновляет очереди обеих моделей после коммита инвестирования.
+
+    Очередь противоположной модели списывает распределённую сумму,
+    а в очередь модели новых объектов добавляются оставшиеся открытыми
+    объекты. Если версия таблицы изменилась не только этой транзакцией,
+    очередь сбрасывается.
+
+    Args:
+        session: Асинхронная сессия с текущей транзакцией.
+        new_objs: Новые объекты (уже записанные в базу через flush).
+        opposite_model: Модель противоположных объектов.
+        invested_amount: Сумма, распределённая в противоположные объекты.
+        versions_before: Версии таблиц до инвестирования.
+        versions_after: Версии таблиц после инвестирования.
+    """
+    new_entries = [
+        (obj.id, obj.full_amount - obj.invested_amount)
+        for obj in new_objs if not obj.fully_invested
+    ]
+
+    def apply(ledger: OpenPoolLedger, change) -> None:
+        name = ledger.model.__tablename__
+        if (ledger.version == versions_before[name] and
+                versions_after[name] == versions_before[name] + 1):
+            change(ledger)
+            ledger.version = versions_after[name]
+        else:
+            ledger.invalidate()
+
+    def update_ledgers() -> None:
+        apply(get_ledger(opposite_model), lambda ledger: ledger.consume(
+            invested_amount
+        ))
+        apply(get_ledger(type(new_objs[0])), lambda ledger: ledger.extend(
+            new_entries
+        ))
+
+    on_commit(session, update_ledgers)
@@ -0,0 +1,192 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple, Type
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.core.db import Base, on_commit
+from app.core.versions import get_versions
+
+# Версии таблиц, прочитанные в текущей транзакции сессии.
+CACHE_VERSIONS = 'object_cache_versions'
+
+
+class ObjectCache:
+    """Кэш объектов одной модели по первичному ключу в памяти процесса.
+
+    Хранит значения колонок, а не ORM-объекты, поэтому объект из кэша
+    можно вернуть в любую сессию. Записи действительны для версии
+    таблицы (`TableVersion`), при которой они прочитаны: изменение
+    версии другим процессом сбрасывает кэш целиком, а изменения этого
+    процесса удаляют только затронутые объекты. Размер ограничен
+    `max_size` записями (вытесняются давно не читавшиеся), время жизни
+    записи - `ttl` секундами.
+    """
+
+    def __init__(self, model: Type[Base], max_size: int, ttl: float):
+        self.model = model
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[int, Tuple[float, Dict[str, Any]]]' = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def lookup(self, obj_id: int, version: int) -> Optional[Dict[str, Any]]:
+        """Возвращает значения колонок объекта или None при промахе.
+
+        Args:
+            obj_id: Идентификатор объекта.
+            version: Версия таблицы в текущей транзакции.
+        """
+        if self.version is None or version > self.version:
+            self.clear()
+            self.version = version
+        entry = self._entries.get(obj_id)
+        if (entry is None or version != self.version or
+                entry[0] < time.monotonic()):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(obj_id)
+        self.hits += 1
+        return entry[1]
+
+    def store(self, obj_id: int, values: Dict[str, Any], version: int):
+        """Запоминает значения колонок объекта, прочитанные при `version`."""
+        if version != self.version:
+            return
+        self._entries[obj_id] = (time.monotonic() + self.ttl, values)
+        self._entries.move_to_end(obj_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def advance(
+        self, version: int, obj_ids: Optional[Iterable[int]]
+    ) -> None:
+        """Учитывает зафиксированное изменение таблицы этим процессом.
+
+        Args:
+            version: Версия таблицы после изменения.
+            obj_ids: Изменённые объекты; None - неизвестно какие.
+        """
+        if obj_ids is None or self.version != version - 1:
+            self.clear()
+            self.version = None
+            return
+        for obj_id in obj_ids:
+            self._entries.pop(obj_id, None)
+        self.version = version
+
+
+object_caches: Dict[Type[Base], ObjectCache] = {}
+
+
+def get_object_cache(model: Type[Base]) -> Optional[ObjectCache]:
+    """Возвращает кэш объектов модели или None, если кэш выключен."""
+    if settings.object_cache_size <= 0:
+        return None
+    if model not in object_caches:
+        object_caches[model] = ObjectCache(
+            model, settings.object_cache_size, settings.object_cache_ttl
+        )
+    return object_caches[model]
+
+
+def invalidate_objects(
+    session: AsyncSession,
+    model: Type[Base],
+    version: int,
+    obj_ids: Optional[Iterable[int]] = None,
+) -> None:
+    """Удаляет изменённые объекты из кэша после коммита транзакции.
+
+    Args:
+        session: Асинхронная сессия с текущей транзакцией.
+        model: Изменённая модель.
+        version: Версия таблицы модели после изменения.
+        obj_ids: Изменённые объекты; None - сбросить кэш модели целиком.
+    """
+    if model in object_caches:
+        obj_ids = None if obj_ids is None else list(obj_ids)
+        on_commit(session, lambda: object_caches[model].advance(
+            version, obj_ids
+        ))
+
+
+async def get_cache_version(session: AsyncSession, model: Type[Base]) -> int:
+    """Возвращает версию таблицы модели, читая её раз за транзакцию."""
+    sync_session = session.sync_session
+    transaction, versions = sync_session.info.get(CACHE_VERSIONS, (None, {}))
+    if transaction is None or (
+        transaction is not sync_session.get_transaction()
+    ):
+        versions = {}
+    name = model.__tablename__
+    if name not in versions:
+        versions[name] = (await get_versions(session, [model]))[name]
+        sync_session.info[CACHE_VERSIONS] = (
+            sync_session.get_transaction(), versions
+        )
+    return versions[name]
+
+
+async def get_cached(
+    session: AsyncSession,
+    cache: ObjectCache,
+    obj_id: int,
+) -> Tuple[Optional[Base], int]:
+    """Возвращает объект из кэша, добавленный в сессию без SELECT.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        cache: Кэш объектов модели.
+        obj_id: Идентификатор объекта.
+
+    Returns:
+        Объект или None при промахе и версия таблицы, при которой
+        нужно запомнить прочитанный из базы данных объект.
+    """
+    version = await get_cache_version(session, cache.model)
+    sync_session = session.sync_session
+    obj = sync_session.identity_map.get(
+        sync_session.identity_key(cache.model, obj_id)
+    )
+    if obj is not None and not inspect(obj).expired_attributes:
+        # Объект уже в сессии: его состояние не старше кэша.
+        return obj, version
+    values = cache.lookup(obj_id, version)
+    if values is None:
+        return None, version
+    obj = cache.model(**values)
+    # Объект выглядит загруженным из базы данных: merge не выполняет
+    # SELECT и не отмечает его изменённым.
+    make_transient_to_detached(obj)
+    return await session.merge(obj, load=False), version
+
+
+def column_values(obj: Base) -> Dict[str, Any]:
+    return {
+        column_attr.key: getattr(obj, column_attr.key)
+        for column_attr in inspect(obj).mapper.column_attrs
+    }
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Возвращает размер, попадания и промахи кэшей по именам таблиц."""
+    return {
+        model.__tablename__: {
+            'size': len(cache), 'hits': cache.hits, 'misses': cache.misses,
+        }
+        for model, cache in object_caches.items()
+    }
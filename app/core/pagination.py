@@ -0,0 +1,48 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Tuple
+
+# Ключ keyset-пагинации: `create_date` и `id` последнего объекта страницы.
+CursorKey = Tuple[datetime, int]
+
+
+class InvalidCursorError(ValueError):
+    """Курсор страницы повреждён или создан не этим сервисом."""
+
+
+def encode_cursor(create_date: datetime, obj_id: int) -> str:
+    """Кодирует ключ последнего объекта страницы в непрозрачный курсор.
+
+    Args:
+        create_date: Дата создания объекта.
+        obj_id: Идентификатор объекта.
+
+    Returns:
+        str: Курсор в URL-безопасном base64.
+    """
+    payload = json.dumps([create_date.isoformat(), obj_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> CursorKey:
+    """Раскодирует курсор, полученный от `encode_cursor`.
+
+    Args:
+        cursor: Курсор из запроса.
+
+    Returns:
+        CursorKey: Дата создания и идентификатор объекта.
+
+    Raises:
+        InvalidCursorError: Если курсор нельзя раскодировать.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)
+        )
+        create_date, obj_id = json.loads(payload)
+        return datetime.fromisoformat(create_date), int(obj_id)
+    except (binascii.Error, TypeError, ValueError) as error:
+        raise InvalidCursorError('Некорректный курсор страницы.') from error
@@ -0,0 +1,102 @@
+import asyncio
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+ResultType = TypeVar('ResultType')
+
+# Сколько ключей хранится в статистике: давно не вызывавшиеся
+# вытесняются.
+SINGLE_FLIGHT_STATS_SIZE = 1000
+
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые вызовы в один.
+
+    Вызов с ключом, по которому уже выполняется другой вызов, не
+    выполняется, а ждёт и получает его результат (или исключение).
+    Завершённые вызовы не запоминаются, но присоединившийся вызов
+    получает результат вызова, начатого раньше него: если он мог
+    увидеть запись, сделанную после начала того вызова, в ключ нужно
+    включать версию данных, прочитанную вызывающим. Если первый вызов
+    отменён вместе с его запросом, ожидающие выполняют вызов заново.
+
+    Статистика ведётся по имени ключа и в сумме по всем ключам:
+    количество вызовов, выполненных и объединённых с другими.
+    """
+
+    def __init__(self, stats_size: int = SINGLE_FLIGHT_STATS_SIZE):
+        self.stats_size = stats_size
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._stats: 'OrderedDict[str, Counter]' = OrderedDict()
+        self.totals = Counter()
+
+    def count(self, name: str, event: str) -> None:
+        stats = self._stats.pop(name, None) or Counter()
+        stats[event] += 1
+        self._stats[name] = stats
+        while len(self._stats) > self.stats_size:
+            self._stats.popitem(last=False)
+        self.totals[event] += 1
+
+    async def run(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[ResultType]],
+        name: Optional[str] = None,
+    ) -> ResultType:
+        """Выполняет вызов или присоединяется к выполняющемуся.
+
+        Args:
+            key: Ключ вызова; вызовы с равными ключами взаимозаменяемы.
+            call: Функция, выполняющая вызов.
+            name: Имя ключа в статистике (по умолчанию - `str(key)`).
+
+        Returns:
+            Результат вызова.
+        """
+        name = str(key) if name is None else name
+        self.count(name, 'calls')
+        while True:
+            future = self._flights.get(key)
+            if future is None:
+                break
+            await asyncio.wait((future,))
+            if not future.cancelled():
+                self.count(name, 'coalesced')
+                return future.result()
+        self.count(name, 'executed')
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Ожидающих может не быть: исключение уже обработано здесь.
+            future.exception()
+            raise
+        finally:
+            del self._flights[key]
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Возвращает вызовы, выполненные и объединённые по именам ключей."""
+        return {
+            name: {
+                'calls': stats['calls'],
+                'executed': stats['executed'],
+                'coalesced': stats['coalesced'],
+            }
+            for name, stats in self._stats.items()
+        }
+
+    def clear(self) -> None:
+        self._stats.clear()
+        self.totals.clear()
+
+
+# Одновременные одинаковые запросы чтения списков объектов.
+query_flights = SingleFlight()
@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple, Type
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import Base
+from app.models.table_version import TableVersion
+
+DIALECT_INSERTS = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert,
+}
+
+
+def table_names(models: Iterable[Type[Base]]) -> list:
+    return sorted({model.__tablename__ for model in models})
+
+
+async def get_versions(
+    session: AsyncSession,
+    models: Iterable[Type[Base]],
+) -> Dict[str, int]:
+    """Возвращает текущие версии данных таблиц моделей.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        models: Модели, версии таблиц которых нужны.
+
+    Returns:
+        Dict[str, int]: Версии по именам таблиц; таблицы без записей
+        в базе имеют версию 0.
+    """
+    names = table_names(models)
+    rows = await session.execute(
+        select(TableVersion.name, TableVersion.version).where(
+            TableVersion.name.in_(names)
+        )
+    )
+    return {**dict.fromkeys(names, 0), **dict(rows.all())}
+
+
+async def get_version_stamps(
+    session: AsyncSession,
+    models: Iterable[Type[Base]],
+) -> Dict[str, Tuple[int, Optional[datetime]]]:
+    """Возвращает версии данных таблиц моделей и время их изменения.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        models: Модели, версии таблиц которых нужны.
+
+    Returns:
+        Dict[str, Tuple[int, Optional[datetime]]]: Версии и время
+        последнего изменения (UTC) по именам таблиц; таблицы без
+        записей в базе имеют версию 0 и время None.
+    """
+    names = table_names(models)
+    rows = await session.execute(
+        select(
+            TableVersion.name, TableVersion.version, TableVersion.updated_at
+        ).where(TableVersion.name.in_(names))
+    )
+    return {
+        **dict.fromkeys(names, (0, None)),
+        **{name: (version, updated_at) for name, version, updated_at in rows},
+    }
+
+
+async def bump_versions(
+    session: AsyncSession,
+    models: Iterable[Type[Base]],
+) -> Dict[str, int]:
+    """Увеличивает версии данных таблиц моделей в текущей транзакции.
+
+    Строка таблицы создаётся при первом изменении, время изменения
+    таблицы обновляется по UTC, как и даты объектов инвестирования.
+    До коммита строки версий заблокированы транзакцией, поэтому
+    возвращаемые версии совпадут с зафиксированными.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        models: Изменённые модели.
+
+    Returns:
+        Dict[str, int]: Новые версии по именам таблиц.
+    """
+    statement = DIALECT_INSERTS[session.bind.dialect.name](
+        TableVersion
+    ).values(version=1, updated_at=datetime.utcnow())
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[TableVersion.name],
+            set_={
+                'version': TableVersion.version + 1,
+                'updated_at': statement.excluded.updated_at,
+            },
+        ),
+        [{'name': name} for name in table_names(models)],
+    )
+    return await get_versions(session, models)
@@ -1,8 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, Response
 
+from app.api.conditional import NotModified
+from app.api.middleware import ReadYourWritesMiddleware
 from app.api.routers import main_router
 from app.core.config import settings
+from app.core.db import engine, read_engine
 from app.core.init_db import create_first_superuser
+from app.core.investing import InvestmentConflictError
+from app.services.donation_batcher import donation_batcher
 
 app = FastAPI(
     title=settings.app_title,
@@ -11,7 +17,36 @@ app = FastAPI(
 
 app.include_router(main_router)
 
+if read_engine is not engine:
+    app.add_middleware(ReadYourWritesMiddleware)
+
 
 @app.on_event('startup')
 async def startup():
     await create_first_superuser()
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    await donation_batcher.stop()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+@app.exception_handler(InvestmentConflictError)
+async def investment_conflict_handler(
+    request: Request, exc: InvestmentConflictError
+):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={'detail': str(exc)},
+        headers={'Retry-After': '1'},
+    )
+
+
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers=exc.headers
+    )
@@ -2,10 +2,16 @@ from .user import User
 from .charity_project import CharityProject
 from .donation import Donation
 from .base import InvestmentBase
+from .investment_allocation import InvestmentAllocation
+from .fund_counter import FundCounter
+from .table_version import TableVersion
 
 __all__ = [
     'User',
     'CharityProject',
     'Donation',
-    'InvestmentBase'
+    'InvestmentBase',
+    'InvestmentAllocation',
+    'FundCounter',
+    'TableVersion',
 ]
@@ -1,6 +1,9 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, CheckConstraint, DateTime, Integer
+from sqlalchemy import (
+    Boolean, Column, CheckConstraint, DateTime, Index, Integer, column, false
+)
+from sqlalchemy.orm import declared_attr
 
 from app.core.db import Base
 
@@ -12,15 +15,37 @@ class InvestmentBase(Base):
     full_amount = Column(Integer, nullable=False)
     invested_amount = Column(Integer, default=0)
     fully_invested = Column(Boolean, default=False)
-    create_date = Column(DateTime, default=datetime.now)
+    # Даты создания и закрытия хранятся по UTC.
+    create_date = Column(DateTime, default=datetime.utcnow)
     close_date = Column(DateTime)
+    # Секунды от создания до закрытия, записываются при закрытии.
+    close_duration_seconds = Column(Integer)
 
-    __table_args__ = (
-        CheckConstraint('full_amount > 0', name='check_full_amount_positive'),
-        CheckConstraint(
-            'invested_amount >= 0', name='check_invested_amount_non_negative'
-        ),
-        CheckConstraint(
-            'invested_amount <= full_amount', name='check_invested_le_full'
-        ),
-    )
+    @declared_attr
+    def __table_args__(cls):
+        # Условие частичного индекса совпадает с `fully_invested = false`
+        # в запросах: SQLite использует частичный индекс, только если
+        # его условие буквально есть в WHERE.
+        is_open = column('fully_invested') == false()
+        return (
+            CheckConstraint(
+                'full_amount > 0', name='check_full_amount_positive'
+            ),
+            CheckConstraint(
+                'invested_amount >= 0',
+                name='check_invested_amount_non_negative'
+            ),
+            CheckConstraint(
+                'invested_amount <= full_amount',
+                name='check_invested_le_full'
+            ),
+            Index(
+                f'ix_{cls.__tablename__}_open_create_date_id',
+                'create_date', 'id',
+                postgresql_where=is_open,
+                sqlite_where=is_open,
+            ),
+            Index(
+                f'ix_{cls.__tablename__}_create_date_id', 'create_date', 'id'
+            ),
+        )
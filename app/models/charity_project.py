@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text
+from sqlalchemy import Column, Index, String, Text, true
 
 from app.models.base import InvestmentBase
 
@@ -22,3 +22,11 @@ class CharityProject(InvestmentBase):
             f"full_amount={self.full_amount}, "
             f"invested_amount={self.invested_amount})"
         )
+
+
+Index(
+    'ix_charityproject_closed_close_duration',
+    CharityProject.close_duration_seconds,
+    postgresql_where=CharityProject.fully_invested == true(),
+    sqlite_where=CharityProject.fully_invested == true(),
+)
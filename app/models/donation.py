@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, Text
+from sqlalchemy import Column, ForeignKey, Index, Integer, Text
 from sqlalchemy.orm import relationship
 
 from app.models.base import InvestmentBase
@@ -15,7 +15,9 @@ class Donation(InvestmentBase):
 
     __tablename__ = 'donation'
 
-    user_id = Column(Integer, ForeignKey('user.id'), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey('user.id'), nullable=False, index=True
+    )
     comment = Column(Text)
     user = relationship('User', back_populates='donations')
 
@@ -25,3 +27,11 @@ class Donation(InvestmentBase):
             f"full_amount={self.full_amount}, "
             f"invested_amount={self.invested_amount})"
         )
+
+
+Index(
+    'ix_donation_user_id_create_date_id',
+    Donation.user_id,
+    Donation.create_date,
+    Donation.id,
+)
@@ -0,0 +1,22 @@
+from sqlalchemy import BigInteger, Column, String
+
+from app.core.db import Base
+
+
+class FundCounter(Base):
+    """Агрегированный показатель фонда.
+
+    Счётчики обновляются приращениями в тех же транзакциях, что
+    и проекты с пожертвованиями, поэтому итоги не нужно пересчитывать
+    по всем строкам.
+
+    Attributes:
+        name: Название показателя.
+        value: Значение показателя.
+    """
+
+    name = Column(String(64), unique=True, nullable=False)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"FundCounter(name='{self.name}', value={self.value})"
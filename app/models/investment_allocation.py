@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    CheckConstraint, Column, DateTime, ForeignKey, Index, Integer
+)
+
+from app.core.db import Base
+
+
+class InvestmentAllocation(Base):
+    """Модель распределения средств пожертвования в проект.
+
+    Записи только добавляются: каждая фиксирует сумму, которую
+    пожертвование внесло в проект при инвестировании.
+
+    Attributes:
+        donation_id: ID пожертвования.
+        project_id: ID проекта.
+        amount: Внесённая сумма.
+        created_at: Дата распределения (UTC).
+    """
+
+    __tablename__ = 'investment_allocation'
+
+    donation_id = Column(Integer, ForeignKey('donation.id'), nullable=False)
+    project_id = Column(
+        Integer, ForeignKey('charityproject.id'), nullable=False
+    )
+    amount = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        CheckConstraint('amount > 0', name='check_allocation_amount_positive'),
+        Index('ix_investment_allocation_donation_id_id', 'donation_id', 'id'),
+        Index('ix_investment_allocation_project_id_id', 'project_id', 'id'),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f'InvestmentAllocation(donation_id={self.donation_id}, '
+            f'project_id={self.project_id}, amount={self.amount})'
+        )
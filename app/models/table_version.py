@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.core.db import Base
+
+
+class TableVersion(Base):
+    """Версия данных таблицы.
+
+    Увеличивается в той же транзакции, что и каждая запись в таблицу,
+    поэтому по ней процессы приложения узнают, что их кэши устарели.
+
+    Attributes:
+        name: Имя таблицы (уникальное).
+        version: Номер версии данных таблицы.
+        updated_at: Время последнего изменения таблицы (UTC).
+    """
+
+    name = Column(String(64), unique=True, nullable=False)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+    def __repr__(self) -> str:
+        return f"TableVersion(name='{self.name}', version={self.version})"
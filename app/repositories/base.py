@@ -1,14 +1,32 @@
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import false, select
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from typing import Any, List, Optional, Type, TypeVar, Generic
+from collections import Counter
 
+from sqlalchemy import and_, delete, false, inspect, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from typing import (
+    Any, AsyncIterator, Dict, Generic, Iterable, List, Optional, Sequence,
+    Tuple, Type, TypeVar,
+)
+
+from app.core.config import settings
+from app.core.counters import change_counters, contribution
+from app.core.db import keep_loaded_on_commit, load_inserted_nulls
+from app.core.investing import invest_many, run_investment
+from app.core.ledger import invalidate_ledger
+from app.core.object_cache import (
+    column_values, get_cached, get_object_cache, invalidate_objects
+)
+from app.core.pagination import CursorKey, encode_cursor
+from app.core.single_flight import query_flights
+from app.core.versions import bump_versions
 from app.models import User
 
 
 ModelType = TypeVar('ModelType')
 
+IDS_CHUNK_SIZE = 500
+
 
 class CRUDBase(Generic[ModelType]):
     """Базовый CRUD-класс для работы с моделями SQLAlchemy."""
@@ -20,22 +38,67 @@ class CRUDBase(Generic[ModelType]):
         self,
         obj_id: int,
         session: AsyncSession,
+        use_cache: bool = True,
     ) -> Optional[ModelType]:
         """Получает объект по его ID.
 
+        При включённом кэше объектов (`object_cache_size`) повторные
+        чтения объекта не обращаются к его таблице, пока объект
+        не изменён.
+
         Args:
             obj_id: Идентификатор объекта.
             session: Асинхронная сессия для работы с базой данных.
+            use_cache: Читать ли объект из кэша объектов; False -
+                всегда читать строку из базы данных.
 
         Returns:
             Найденный объект или None, если не найден.
         """
+        cache = get_object_cache(self.model) if use_cache else None
+        if cache is not None:
+            db_obj, version = await get_cached(session, cache, obj_id)
+            if db_obj is not None:
+                return db_obj
         db_obj = await session.execute(
             select(self.model).where(
                 self.model.id == obj_id  # type: ignore
-            )
+            ).execution_options(populate_existing=not use_cache)
         )
-        return db_obj.scalars().first()
+        db_obj = db_obj.scalars().first()
+        if cache is not None and db_obj is not None:
+            cache.store(obj_id, column_values(db_obj), version)
+        return db_obj
+
+    async def get_by_ids(
+        self,
+        session: AsyncSession,
+        obj_ids: List[int],
+    ) -> List[ModelType]:
+        """Получает объекты по списку ID.
+
+        Args:
+            session: Асинхронная сессия для работы с базой данных.
+            obj_ids: Идентификаторы объектов.
+
+        Returns:
+            Найденные объекты в порядке `obj_ids`.
+        """
+        objs_by_id = {}
+        for start in range(0, len(obj_ids), IDS_CHUNK_SIZE):
+            db_objs = await session.execute(
+                select(self.model).where(
+                    self.model.id.in_(  # type: ignore
+                        obj_ids[start:start + IDS_CHUNK_SIZE]
+                    )
+                )
+            )
+            objs_by_id.update(
+                (db_obj.id, db_obj) for db_obj in db_objs.scalars()
+            )
+        return [
+            objs_by_id[obj_id] for obj_id in obj_ids if obj_id in objs_by_id
+        ]
 
     async def get_multi(
         self,
@@ -71,6 +134,9 @@ class CRUDBase(Generic[ModelType]):
 
         Returns:
             Созданный объект.
+
+        Без коммита объект не учитывается в показателях фонда: это
+        делает `invest_many`, когда распределит его средства.
         """
         obj_in_data = obj_in.dict()
         if user is not None:
@@ -84,10 +150,108 @@ class CRUDBase(Generic[ModelType]):
         db_obj = self.model(**obj_in_data)
         session.add(db_obj)
         if commit:
-            await session.commit()
-            await session.refresh(db_obj)
+            await change_counters(session, contribution(db_obj))
+            await self.mark_changed(session, obj_ids=())
+            await session.flush()
+            load_inserted_nulls(db_obj)
+            # Все значения объекта известны после INSERT: перечитывать
+            # его после коммита не нужно.
+            with keep_loaded_on_commit(session):
+                await session.commit()
         return db_obj
 
+    async def create_many(
+        self,
+        *,
+        session: AsyncSession,
+        objs_in: Sequence,
+        user_ids: Optional[List[Optional[int]]] = None,
+        opposite_crud=None,
+    ) -> List[ModelType]:
+        """Создаёт объекты одной транзакцией.
+
+        С `opposite_crud` объекты инвестируются одним проходом
+        по открытым объектам противоположной модели
+        (`create_and_invest_many`). Без него объекты только создаются:
+        так создаются объекты моделей, не участвующих в инвестировании.
+
+        Args:
+            session: Асинхронная сессия для работы с базой данных.
+            objs_in: Данные для создания объектов (Pydantic-модели).
+            user_ids: Идентификаторы пользователей для каждого объекта
+                (опционально).
+            opposite_crud: CRUD-объект противоположной модели
+                (опционально).
+
+        Returns:
+            Созданные объекты.
+        """
+        if opposite_crud is not None:
+            return await self.create_and_invest_many(
+                session=session,
+                objs_in=list(objs_in),
+                user_ids=user_ids,
+                opposite_crud=opposite_crud,
+            )
+        if user_ids is None:
+            user_ids = [None] * len(objs_in)
+        new_objs = []
+        deltas = Counter()
+        for obj_in, user_id in zip(objs_in, user_ids):
+            extra_fields = {} if user_id is None else {'user_id': user_id}
+            new_obj = await self.create(
+                obj_in=obj_in, session=session, commit=False, **extra_fields
+            )
+            deltas.update(contribution(new_obj))
+            new_objs.append(new_obj)
+        await change_counters(session, deltas)
+        await self.mark_changed(session, obj_ids=())
+        await session.flush()
+        for new_obj in new_objs:
+            load_inserted_nulls(new_obj)
+        with keep_loaded_on_commit(session):
+            await session.commit()
+        return new_objs
+
+    def get_changes(self, db_obj: ModelType, obj_in) -> Dict[str, Any]:
+        """Возвращает изменённые значения колонок модели.
+
+        Args:
+            db_obj: Объект из базы данных.
+            obj_in: Данные для обновления (Pydantic-модель).
+
+        Returns:
+            Dict[str, Any]: Новые значения колонок, которые отличаются
+            от значений объекта.
+        """
+        columns = inspect(self.model).column_attrs.keys()
+        return {
+            field: value
+            for field, value in obj_in.dict(exclude_unset=True).items()
+            if field in columns and getattr(db_obj, field) != value
+        }
+
+    def apply_changes(self, db_obj: ModelType, obj_in) -> Optional[Counter]:
+        """Записывает в объект изменённые значения колонок модели.
+
+        Args:
+            db_obj: Объект из базы данных.
+            obj_in: Данные для обновления (Pydantic-модель).
+
+        Returns:
+            Optional[Counter]: Изменение показателей фонда или None,
+            если объект не изменился.
+        """
+        changes = self.get_changes(db_obj, obj_in)
+        if not changes:
+            return None
+        contribution_before = contribution(db_obj)
+        for field, value in changes.items():
+            setattr(db_obj, field, value)
+        deltas = contribution(db_obj)
+        deltas.subtract(contribution_before)
+        return deltas
+
     async def update(
         self,
         db_obj: ModelType,
@@ -96,6 +260,9 @@ class CRUDBase(Generic[ModelType]):
     ) -> ModelType:
         """Обновляет существующий объект.
 
+        Записываются только колонки модели, значения которых изменились;
+        если таких нет, запрос к базе данных не выполняется.
+
         Args:
             db_obj: Объект из базы данных для обновления.
             obj_in: Данные для обновления (Pydantic-модель).
@@ -104,17 +271,41 @@ class CRUDBase(Generic[ModelType]):
         Returns:
             Обновлённый объект.
         """
-        obj_data = jsonable_encoder(db_obj)
-        update_data = obj_in.dict(exclude_unset=True)
-
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
+        await self.update_many([(db_obj, obj_in)], session)
         return db_obj
 
+    async def update_many(
+        self,
+        updates: Sequence[Tuple[ModelType, Any]],
+        session: AsyncSession,
+    ) -> List[ModelType]:
+        """Обновляет объекты одной транзакцией.
+
+        Изменённые колонки записываются при коммите: строки с одинаковым
+        набором изменённых колонок отправляются одним executemany.
+
+        Args:
+            updates: Пары из объекта базы данных и данных для его
+                обновления (Pydantic-модели).
+            session: Асинхронная сессия для работы с базой данных.
+
+        Returns:
+            Обновлённые объекты.
+        """
+        deltas = Counter()
+        changed_ids = []
+        for db_obj, obj_in in updates:
+            obj_deltas = self.apply_changes(db_obj, obj_in)
+            if obj_deltas is not None:
+                changed_ids.append(db_obj.id)
+                deltas.update(obj_deltas)
+        if changed_ids:
+            await change_counters(session, deltas)
+            await self.mark_changed(session, changed_ids)
+            with keep_loaded_on_commit(session):
+                await session.commit()
+        return [db_obj for db_obj, _ in updates]
+
     async def remove(
         self,
         db_obj: ModelType,
@@ -129,10 +320,78 @@ class CRUDBase(Generic[ModelType]):
         Returns:
             Удалённый объект.
         """
+        deltas = Counter()
+        deltas.subtract(contribution(db_obj))
         await session.delete(db_obj)
+        await change_counters(session, deltas)
+        await self.mark_changed(session, [db_obj.id])
         await session.commit()
         return db_obj
 
+    async def remove_many(
+        self,
+        db_objs: Sequence[ModelType],
+        session: AsyncSession,
+    ) -> List[ModelType]:
+        """Удаляет объекты одной транзакцией.
+
+        Строки удаляются запросами `DELETE ... WHERE id IN (...)`
+        по `IDS_CHUNK_SIZE` идентификаторов, без загрузки объектов
+        в единицу работы сессии.
+
+        Args:
+            db_objs: Объекты из базы данных для удаления.
+            session: Асинхронная сессия для работы с базой данных.
+
+        Returns:
+            Удалённые объекты.
+        """
+        if not db_objs:
+            return []
+        deltas = Counter()
+        obj_ids = []
+        for db_obj in db_objs:
+            deltas.subtract(contribution(db_obj))
+            obj_ids.append(db_obj.id)
+        for start in range(0, len(obj_ids), IDS_CHUNK_SIZE):
+            await session.execute(
+                delete(self.model).where(
+                    self.model.id.in_(  # type: ignore
+                        obj_ids[start:start + IDS_CHUNK_SIZE]
+                    )
+                ).execution_options(synchronize_session=False)
+            )
+        for db_obj in db_objs:
+            session.expunge(db_obj)
+        await change_counters(session, deltas)
+        await self.mark_changed(session, obj_ids)
+        await session.commit()
+        return list(db_objs)
+
+    async def mark_changed(
+        self,
+        session: AsyncSession,
+        obj_ids: Optional[Iterable[int]] = None,
+    ) -> None:
+        """Отмечает изменение таблицы модели в текущей транзакции.
+
+        Увеличивает версию таблицы, а после коммита сбрасывает очередь
+        открытых объектов модели и удаляет изменённые объекты из кэша.
+
+        Args:
+            session: Асинхронная сессия для работы с базой данных.
+            obj_ids: Изменённые существующие объекты; None - любые
+                объекты таблицы.
+        """
+        versions = await bump_versions(session, [self.model])
+        invalidate_ledger(session, self.model)
+        invalidate_objects(
+            session,
+            self.model,
+            versions[self.model.__tablename__],  # type: ignore
+            obj_ids,
+        )
+
     async def get_by_attributes(
         self,
         session: AsyncSession,
@@ -175,23 +434,298 @@ class CRUDBase(Generic[ModelType]):
         db_obj = await session.execute(query)
         return db_obj.scalars().first()
 
+    def after_key(self, key: CursorKey):
+        """Условие `(create_date, id) > key` для keyset-пагинации.
+
+        Args:
+            key: Дата создания и ID последнего объекта предыдущей страницы.
+
+        Returns:
+            Условие для WHERE.
+        """
+        create_date, obj_id = key
+        return or_(
+            self.model.create_date > create_date,  # type: ignore
+            and_(
+                self.model.create_date == create_date,  # type: ignore
+                self.model.id > obj_id,  # type: ignore
+            ),
+        )
+
+    def ordered_query(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        after: Optional[CursorKey] = None,
+        **filters: Any,
+    ) -> Select:
+        """Строит запрос объектов в порядке `create_date` и `id`.
+
+        Args:
+            columns: Названия колонок для чтения строк без построения
+                ORM-объектов (опционально). `create_date` и `id`
+                читаются всегда: они нужны для курсора страницы.
+            after: Ключ объекта, после которого начинается выборка
+                (опционально).
+            **filters: Параметры фильтрации (поле=значение).
+
+        Returns:
+            Select: Запрос объектов или строк.
+        """
+        if columns is None:
+            query = select(self.model)
+        else:
+            query = select(*(
+                getattr(self.model, column)
+                for column in dict.fromkeys(('id', 'create_date', *columns))
+            ))
+        query = query.order_by(
+            self.model.create_date,  # type: ignore
+            self.model.id,  # type: ignore
+        )
+        for field, value in filters.items():
+            query = query.where(getattr(self.model, field) == value)
+        if after is not None:
+            query = query.where(self.after_key(after))
+        return query
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        after: Optional[CursorKey] = None,
+        limit: Optional[int] = 100,
+        columns: Optional[Sequence[str]] = None,
+        coalesce_version: Optional[str] = None,
+        **filters: Any,
+    ) -> Tuple[List, Optional[str]]:
+        """Получить страницу объектов в порядке `create_date` и `id`.
+
+        Порядок устойчив при совпадении `create_date`, поэтому страницы
+        не пропускают и не повторяют объекты. Читается на один объект
+        больше `limit`, чтобы узнать, есть ли следующая страница.
+
+        С `coalesce_version` одновременные чтения одной и той же страницы
+        строк через одну базу данных при одной версии данных выполняются
+        одним запросом: остальные вызовы ждут его результат
+        (`query_flights`). Версия, прочитанная вызывающим до чтения
+        строк, не даёт присоединиться к запросу, начатому до записи,
+        которую вызывающий уже видел. Объединять можно только чтения
+        вне транзакций записи.
+
+        Args:
+            session: Асинхронная сессия.
+            after: Ключ последнего объекта предыдущей страницы
+                (опционально).
+            limit: Размер страницы; None - все объекты после `after`.
+            columns: Названия колонок: с ними вместо ORM-объектов
+                возвращаются строки-словари (опционально).
+            coalesce_version: Версия данных (например, ETag), при которой
+                объединяются одновременные одинаковые чтения строк
+                (только вместе с `columns`).
+            **filters: Параметры фильтрации (поле=значение).
+
+        Returns:
+            Tuple[List, Optional[str]]: Объекты или строки страницы
+            и курсор следующей страницы (None на последней странице).
+        """
+        if (coalesce_version is None or columns is None or
+                not settings.read_coalescing):
+            return await self.read_page(
+                session, after, limit, columns, **filters
+            )
+        # Строки Core неизменяемы, поэтому один результат можно отдать
+        # всем ожидающим вызовам.
+        name = self.page_key(after, limit, columns, **filters)
+        return await query_flights.run(
+            (session.bind, coalesce_version, name),
+            lambda: self.read_page(session, after, limit, columns, **filters),
+            name,
+        )
+
+    def page_key(
+        self,
+        after: Optional[CursorKey],
+        limit: Optional[int],
+        columns: Sequence[str],
+        **filters: Any,
+    ) -> str:
+        """Имя запроса страницы для объединения чтений и статистики."""
+        parts = [f'columns={",".join(columns)}', f'limit={limit}']
+        if after is not None:
+            parts.append(f'after={after[0].isoformat()},{after[1]}')
+        parts.extend(
+            f'{field}={value}' for field, value in sorted(filters.items())
+        )
+        return f'{self.model.__tablename__}?' + '&'.join(parts)
+
+    async def read_page(
+        self,
+        session: AsyncSession,
+        after: Optional[CursorKey],
+        limit: Optional[int],
+        columns: Optional[Sequence[str]],
+        **filters: Any,
+    ) -> Tuple[List, Optional[str]]:
+        query = self.ordered_query(columns, after, **filters)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        result = await session.execute(query)
+        rows = (
+            result.scalars() if columns is None else result.mappings()
+        ).all()
+        if limit is None or len(rows) <= limit:
+            return rows, None
+        last_row = rows[limit - 1]
+        if columns is None:
+            key = last_row.create_date, last_row.id
+        else:
+            key = last_row['create_date'], last_row['id']
+        return rows[:limit], encode_cursor(*key)
+
+    async def stream(
+        self,
+        session: AsyncSession,
+        after: Optional[CursorKey] = None,
+        partition_size: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+        **filters: Any,
+    ) -> AsyncIterator[List]:
+        """Читает объекты потоком в порядке `create_date` и `id`.
+
+        Строки читаются серверным курсором частями по `partition_size`,
+        поэтому память не зависит от размера таблицы, а первая часть
+        доступна сразу после её чтения.
+
+        Args:
+            session: Асинхронная сессия.
+            after: Ключ объекта, после которого начинается поток
+                (опционально).
+            partition_size: Количество объектов в части.
+            columns: Названия колонок: с ними вместо ORM-объектов
+                читаются строки-словари (опционально).
+            **filters: Параметры фильтрации (поле=значение).
+
+        Yields:
+            Части объектов или строк.
+        """
+        query = self.ordered_query(
+            columns, after, **filters
+        ).execution_options(yield_per=partition_size)
+        if columns is None:
+            rows = await session.stream_scalars(query)
+        else:
+            rows = (await session.stream(query)).mappings()
+        try:
+            async for partition in rows.partitions(partition_size):
+                yield partition
+        finally:
+            await rows.close()
+
     async def get_open_objects(
         self,
         session: AsyncSession,
+        after: Optional[ModelType] = None,
+        limit: Optional[int] = None,
     ) -> List[ModelType]:
         """Получить незакрытые объекты (для инвестирования).
 
+        Объекты упорядочены по `create_date` и `id`, поэтому их можно
+        читать страницами: следующая страница начинается после
+        объекта `after` (keyset-пагинация).
+
         Args:
             session: Асинхронная сессия.
+            after: Последний объект предыдущей страницы (опционально).
+            limit: Максимальный размер страницы (опционально).
 
         Returns:
             List[ModelType]: Список незакрытых объектов.
         """
-        objects = await session.execute(
-            select(self.model).where(
-                self.model.fully_invested.is_(false())  # type: ignore
-            ).order_by(
-                self.model.create_date  # type: ignore
+        query = select(self.model).where(
+            self.model.fully_invested == false()  # type: ignore
+        ).order_by(
+            self.model.create_date,  # type: ignore
+            self.model.id,  # type: ignore
+        ).limit(limit)
+        if after is not None:
+            query = query.where(
+                self.after_key((after.create_date, after.id))
             )
-        )
+        objects = await session.execute(query)
         return objects.scalars().all()
+
+    async def create_and_invest(
+        self,
+        *,
+        session: AsyncSession,
+        obj_in,
+        user: Optional[User] = None,
+        opposite_crud=None,
+    ) -> ModelType:
+        """Создаёт объект и инвестирует его в открытые объекты.
+
+        Создание и распределение средств выполняются в критической секции
+        инвестирования (`run_investment`), поэтому параллельные запросы
+        не теряют обновления `invested_amount`.
+
+        Args:
+            obj_in: Данные для создания объекта (Pydantic-модель).
+            session: Асинхронная сессия для работы с базой данных.
+            user: Пользователь, от имени которого создаётся объект.
+            opposite_crud: CRUD-объект противоположной модели.
+
+        Returns:
+            Созданный объект.
+        """
+        new_objs = await self.create_and_invest_many(
+            session=session,
+            objs_in=[obj_in],
+            user_ids=[None if user is None else user.id],
+            opposite_crud=opposite_crud,
+        )
+        return new_objs[0]
+
+    async def create_and_invest_many(
+        self,
+        *,
+        session: AsyncSession,
+        objs_in: List,
+        user_ids: Optional[List[Optional[int]]] = None,
+        opposite_crud=None,
+    ) -> List[ModelType]:
+        """Создаёт пачку объектов и инвестирует их одним коммитом.
+
+        Объекты инвестируются в порядке `objs_in` против одного потока
+        открытых объектов противоположной модели (`invest_many`).
+
+        Args:
+            session: Асинхронная сессия для работы с базой данных.
+            objs_in: Данные для создания объектов (Pydantic-модели).
+            user_ids: Идентификаторы пользователей для каждого объекта
+                (опционально).
+            opposite_crud: CRUD-объект противоположной модели.
+
+        Returns:
+            Созданные объекты.
+        """
+        # Идентификаторы пользователей передаются числами: после отката
+        # при повторе объекты сессии истекают.
+        if user_ids is None:
+            user_ids = [None] * len(objs_in)
+
+        async def create_and_distribute() -> List[ModelType]:
+            new_objs = []
+            for obj_in, user_id in zip(objs_in, user_ids):
+                extra_fields = {} if user_id is None else {'user_id': user_id}
+                new_objs.append(await self.create(
+                    obj_in=obj_in,
+                    session=session,
+                    commit=False,
+                    **extra_fields
+                ))
+            await invest_many(session, new_objs, opposite_crud)
+            await session.flush()
+            for new_obj in new_objs:
+                load_inserted_nulls(new_obj)
+            return new_objs
+
+        return await run_investment(session, create_and_distribute)
@@ -1,51 +1,214 @@
-from typing import Optional
+from collections import Counter
+from typing import Any, Dict, Optional, Sequence, Tuple
 
-from sqlalchemy import extract, select
+from sqlalchemy import (
+    delete, false, func, select, true, tuple_, update
+)
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.core.constants import DAYS_IN_YEAR, DAYS_IN_MONTH
-from app.core.investing import distribute_funds
-from app.models import User
+from app.core.counters import (
+    CLOSED_PROJECTS, change_counters, contribution, get_counter
+)
+from app.core.db import keep_loaded_on_commit
 from app.models.charity_project import CharityProject
-from app.repositories.base import CRUDBase
-from app.schemas.charity_project import CharityProjectCreate
+from app.repositories.base import IDS_CHUNK_SIZE, CRUDBase
 
 
 class CRUDCharityProject(CRUDBase[CharityProject]):
     """CRUD операции для благотворительных проектов."""
 
-    async def get_project_id_by_name(
+    async def update_open(
         self,
-        project_name: str,
+        project: CharityProject,
+        obj_in,
         session: AsyncSession,
-    ) -> Optional[int]:
-        project = await self.get_one_by_attributes(session, name=project_name)
-        return project.id if project else None
+    ) -> bool:
+        """Обновляет открытый проект одним условным UPDATE.
+
+        Args:
+            project: Проект из базы данных.
+            obj_in: Данные для обновления (Pydantic-модель).
+            session: Асинхронная сессия для работы с базой данных.
+
+        Returns:
+            bool: False, если строка не подошла под условие; транзакция
+            при этом откатывается.
+        """
+        return await self.update_open_many([(project, obj_in)], session)
+
+    async def update_open_many(
+        self,
+        updates: Sequence[Tuple[CharityProject, Any]],
+        session: AsyncSession,
+    ) -> bool:
+        """Обновляет открытые проекты условными UPDATE одной транзакцией.
+
+        Каждая строка записывается своим запросом, только если проект
+        всё ещё открыт, новая требуемая сумма не меньше внесённой,
+        а требуемая сумма в базе данных не изменилась с чтения проекта:
+        по ней считается изменение показателей фонда. Так
+        инвестирование, выполненное после проверки проектов, не может
+        нарушить её условия. Где диалект поддерживает RETURNING, запрос
+        возвращает и текущую внесённую сумму; без него (SQLite)
+        внесённая сумма в базе данных также должна совпадать
+        с прочитанной.
+
+        Args:
+            updates: Пары из проекта базы данных и данных для его
+                обновления (Pydantic-модели).
+            session: Асинхронная сессия для работы с базой данных.
+
+        Returns:
+            bool: False, если под условие подошли не все строки;
+            транзакция при этом откатывается и ни один проект
+            не обновляется.
+        """
+        changed = []
+        for project, obj_in in updates:
+            changes = self.get_changes(project, obj_in)
+            if not changes:
+                continue
+            matched, row = await self.update_open_row(
+                project, changes, session
+            )
+            if not matched:
+                await session.rollback()
+                return False
+            changed.append((project, changes, row))
+        if not changed:
+            return True
+        deltas = Counter()
+        for project, changes, row in changed:
+            deltas.subtract(contribution(project))
+            for field, value in changes.items():
+                set_committed_value(project, field, value)
+            deltas.update(contribution(project))
+            if row is not None:
+                # Вклад инвестирования после чтения проекта уже учтён
+                # в показателях самим инвестированием.
+                set_committed_value(
+                    project, 'invested_amount', row.invested_amount
+                )
+        await change_counters(session, deltas)
+        await self.mark_changed(
+            session, [project.id for project, _, _ in changed]
+        )
+        with keep_loaded_on_commit(session):
+            await session.commit()
+        return True
+
+    async def update_open_row(
+        self,
+        project: CharityProject,
+        changes: Dict[str, Any],
+        session: AsyncSession,
+    ) -> Tuple[bool, Optional[Row]]:
+        """Выполняет условный UPDATE строки проекта.
+
+        Returns:
+            tuple: Подошла ли строка под условие и строка с текущей
+            внесённой суммой, если диалект поддерживает RETURNING.
+        """
+        conditions = [
+            CharityProject.id == project.id,
+            CharityProject.fully_invested == false(),
+        ]
+        if 'full_amount' in changes:
+            conditions += [
+                CharityProject.full_amount == project.full_amount,
+                CharityProject.invested_amount <= changes['full_amount'],
+            ]
+        returning = session.bind.dialect.full_returning
+        if not returning:
+            conditions.append(
+                CharityProject.invested_amount == project.invested_amount
+            )
+        statement = update(CharityProject).where(*conditions).values(changes)
+        if returning:
+            statement = statement.returning(CharityProject.invested_amount)
+        result = await session.execute(
+            statement.execution_options(synchronize_session=False)
+        )
+        if returning:
+            row = result.first()
+            return row is not None, row
+        return bool(result.rowcount), None
+
+    async def remove_uninvested(
+        self,
+        projects: Sequence[CharityProject],
+        session: AsyncSession,
+    ) -> bool:
+        """Удаляет проекты без внесённых средств одной транзакцией.
+
+        Строки удаляются условными запросами DELETE по `IDS_CHUNK_SIZE`
+        проектов: только если в проект так и не поступили средства,
+        а его требуемая сумма не изменилась с чтения проекта.
+
+        Args:
+            projects: Проекты из базы данных.
+            session: Асинхронная сессия для работы с базой данных.
+
+        Returns:
+            bool: False, если под условие подошли не все строки;
+            транзакция при этом откатывается и ни один проект
+            не удаляется.
+        """
+        deltas = Counter()
+        keys = []
+        for project in projects:
+            deltas.subtract(contribution(project))
+            keys.append((project.id, project.full_amount))
+        obj_ids = [obj_id for obj_id, _ in keys]
+        deleted = 0
+        for start in range(0, len(keys), IDS_CHUNK_SIZE):
+            chunk = slice(start, start + IDS_CHUNK_SIZE)
+            # Условие по `id` отдельно от пар: по сравнению пар SQLite
+            # не выбирает первичный ключ и просматривает всю таблицу.
+            result = await session.execute(
+                delete(CharityProject).where(
+                    CharityProject.id.in_(obj_ids[chunk]),
+                    tuple_(CharityProject.id, CharityProject.full_amount).in_(
+                        keys[chunk]
+                    ),
+                    CharityProject.invested_amount == 0,
+                ).execution_options(synchronize_session=False)
+            )
+            deleted += result.rowcount
+        if deleted < len(keys):
+            await session.rollback()
+            return False
+        for project in projects:
+            session.expunge(project)
+        await change_counters(session, deltas)
+        await self.mark_changed(session, obj_ids)
+        await session.commit()
+        return True
 
     async def get_projects_by_completion_rate(
         self,
         session: AsyncSession,
+        limit: Optional[int] = None,
     ) -> list[CharityProject]:
-        year_diff = (
-            extract('year', CharityProject.close_date) -
-            extract('year', CharityProject.create_date)
-        ) * DAYS_IN_YEAR
-        month_diff = (
-            extract('month', CharityProject.close_date) -
-            extract('month', CharityProject.create_date)
-        ) * DAYS_IN_MONTH
-        day_diff = (
-            extract('day', CharityProject.close_date) -
-            extract('day', CharityProject.create_date)
-        )
+        """Получает закрытые проекты от самых быстро собранных.
 
-        days_to_complete = year_diff + month_diff + day_diff
+        Проекты читаются в порядке частичного индекса
+        `ix_charityproject_closed_close_duration`, без сортировки.
 
+        Args:
+            session: Асинхронная сессия для работы с базой данных.
+            limit: Наибольшее количество проектов; None - все.
+
+        Returns:
+            list[CharityProject]: Проекты по возрастанию времени сбора.
+        """
         statement = select(CharityProject).where(
-            CharityProject.fully_invested.is_(True)
+            CharityProject.fully_invested == true()
         ).order_by(
-            days_to_complete
-        )
+            CharityProject.close_duration_seconds, CharityProject.id
+        ).limit(limit)
 
         result = await session.execute(statement)
         return result.scalars().all()
@@ -54,32 +217,13 @@ class CRUDCharityProject(CRUDBase[CharityProject]):
         self,
         session: AsyncSession,
     ) -> int:
-        statement = select(CharityProject).where(
-            CharityProject.fully_invested.is_(True)
-        )
-        result = await session.execute(statement)
-        return len(result.scalars().all())
-
-    async def create_and_invest(
-        self,
-        *,
-        session: AsyncSession,
-        obj_in: CharityProjectCreate,
-        user: Optional[User] = None,
-        opposite_crud=None,
-    ) -> CharityProject:
-        open_donations = await opposite_crud.get_open_objects(session)
-        new_project = await self.create(
-            obj_in=obj_in,
-            session=session,
-            user=user,
-            commit=False
+        closed_projects = await get_counter(session, CLOSED_PROJECTS)
+        if closed_projects is not None:
+            return closed_projects
+        statement = select(func.count()).select_from(CharityProject).where(
+            CharityProject.fully_invested == true()
         )
-
-        await distribute_funds(session, new_project, open_donations)
-        await session.commit()
-        await session.refresh(new_project)
-        return new_project
+        return await session.scalar(statement)
 
 
 charity_project_crud = CRUDCharityProject(CharityProject)
\ No newline at end of file
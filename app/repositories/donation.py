@@ -1,11 +1,9 @@
-from typing import List, Optional
+from typing import List
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.investing import distribute_funds
 from app.repositories.base import CRUDBase
 from app.models import Donation, User
-from app.schemas.donation import DonationCreate
 
 
 class CRUDDonation(CRUDBase[Donation]):
@@ -19,27 +17,5 @@ class CRUDDonation(CRUDBase[Donation]):
         """Получить пожертвования конкретного пользователя."""
         return await self.get_by_attributes(session, user_id=user.id)
 
-    async def create_and_invest(
-        self,
-        *,
-        session: AsyncSession,
-        obj_in: DonationCreate,
-        user: Optional[User] = None,
-        opposite_crud=None,
-    ) -> Donation:
-        open_projects = await opposite_crud.get_open_objects(session)
-        new_donation = await self.create(
-            obj_in=obj_in,
-            session=session,
-            user=user,
-            commit=False
-        )
-
-        await distribute_funds(session, new_donation, open_projects)
-        await session.commit()
-        await session.refresh(new_donation)
-
-        return new_donation
-
 
 donation_crud = CRUDDonation(Donation)
\ No newline at end of file
@@ -0,0 +1,69 @@
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import InvestmentAllocation
+from app.repositories.base import CRUDBase
+
+
+class CRUDInvestmentAllocation(CRUDBase[InvestmentAllocation]):
+    """Чтение распределений средств между пожертвованиями и проектами."""
+
+    async def get_page_by_attribute(
+        self,
+        session: AsyncSession,
+        field: str,
+        value: int,
+        after: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[InvestmentAllocation]:
+        """Получить страницу распределений с фильтром по полю.
+
+        Страницы упорядочены по `id`, следующая начинается после `after`
+        (keyset-пагинация по индексу `(field, id)`).
+
+        Args:
+            session: Асинхронная сессия.
+            field: Поле фильтрации (`donation_id` или `project_id`).
+            value: Значение поля.
+            after: ID последнего распределения предыдущей страницы.
+            limit: Размер страницы.
+
+        Returns:
+            List[InvestmentAllocation]: Страница распределений.
+        """
+        query = select(InvestmentAllocation).where(
+            getattr(InvestmentAllocation, field) == value
+        ).order_by(InvestmentAllocation.id).limit(limit)
+        if after is not None:
+            query = query.where(InvestmentAllocation.id > after)
+        allocations = await session.execute(query)
+        return allocations.scalars().all()
+
+    async def get_by_donation(
+        self,
+        session: AsyncSession,
+        donation_id: int,
+        after: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[InvestmentAllocation]:
+        """Получить распределения пожертвования по проектам."""
+        return await self.get_page_by_attribute(
+            session, 'donation_id', donation_id, after, limit
+        )
+
+    async def get_by_project(
+        self,
+        session: AsyncSession,
+        project_id: int,
+        after: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[InvestmentAllocation]:
+        """Получить пожертвования, профинансировавшие проект."""
+        return await self.get_page_by_attribute(
+            session, 'project_id', project_id, after, limit
+        )
+
+
+investment_allocation_crud = CRUDInvestmentAllocation(InvestmentAllocation)
@@ -90,6 +90,16 @@ class CharityProjectUpdate(BaseModel):
         extra = 'forbid'
 
 
+class CharityProjectBatchUpdate(CharityProjectUpdate):
+    """Схема для обновления проекта в пакетном запросе.
+
+    Attributes:
+        id: Идентификатор обновляемого проекта.
+    """
+
+    id: int
+
+
 class CharityProjectDB(CharityProjectBase):
     """Схема для отображения данных благотворительного проекта.
 
@@ -97,8 +107,9 @@ class CharityProjectDB(CharityProjectBase):
         id: Уникальный идентификатор проекта.
         invested_amount: Уже инвестированная сумма.
         fully_invested: Флаг полного инвестирования.
-        create_date: Дата создания проекта.
-        close_date: Дата закрытия проекта (если инвестирован полностью).
+        create_date: Дата создания проекта (UTC).
+        close_date: Дата закрытия проекта (UTC, если инвестирован
+            полностью).
     """
 
     id: int
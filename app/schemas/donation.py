@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, PositiveInt
 
@@ -27,7 +27,7 @@ class DonationDBUser(DonationBase):
 
     Attributes:
         id: Уникальный идентификатор пожертвования.
-        create_date: Дата создания пожертвования.
+        create_date: Дата создания пожертвования (UTC).
     """
 
     id: int
@@ -45,7 +45,7 @@ class DonationDBSuperuser(DonationDBUser):
     Attributes:
         invested_amount: Уже инвестированная сумма.
         fully_invested: Флаг полного инвестирования.
-        close_date: Дата закрытия инвестирования.
+        close_date: Дата закрытия инвестирования (UTC).
         user_id: Идентификатор пользователя, сделавшего пожертвование.
     """
 
@@ -56,3 +56,39 @@ class DonationDBSuperuser(DonationDBUser):
 
     class Config:
         orm_mode = True
+
+
+class DonationImportError(BaseModel):
+    """Схема ошибки в строке импорта пожертвований.
+
+    Attributes:
+        line: Номер строки во входных данных.
+        detail: Описание ошибки.
+    """
+
+    line: int
+    detail: str
+
+
+class DonationImportSummary(BaseModel):
+    """Схема итогов импорта пожертвований.
+
+    Attributes:
+        rows: Количество прочитанных строк с данными.
+        imported: Количество созданных пожертвований.
+        rejected: Количество отклонённых строк.
+        chunks: Количество зафиксированных пачек.
+        full_amount: Общая сумма созданных пожертвований.
+        invested_amount: Сумма, распределённая по проектам.
+        fully_invested: Количество полностью распределённых пожертвований.
+        errors: Ошибки в строках (не больше `IMPORT_ERRORS_LIMIT`).
+    """
+
+    rows: int = 0
+    imported: int = 0
+    rejected: int = 0
+    chunks: int = 0
+    full_amount: int = 0
+    invested_amount: int = 0
+    fully_invested: int = 0
+    errors: List[DonationImportError] = []
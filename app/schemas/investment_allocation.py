@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class InvestmentAllocationDB(BaseModel):
+    """Схема для отображения распределения средств.
+
+    Attributes:
+        id: Уникальный идентификатор распределения.
+        donation_id: Идентификатор пожертвования.
+        project_id: Идентификатор проекта.
+        amount: Внесённая в проект сумма.
+        created_at: Дата распределения (UTC).
+    """
+
+    id: int
+    donation_id: int
+    project_id: int
+    amount: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
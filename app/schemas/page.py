@@ -0,0 +1,18 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic.generics import GenericModel
+
+ItemType = TypeVar('ItemType')
+
+
+class Page(GenericModel, Generic[ItemType]):
+    """Схема страницы списка объектов.
+
+    Attributes:
+        items: Объекты страницы.
+        next_cursor: Курсор следующей страницы; отсутствует
+            на последней странице.
+    """
+
+    items: List[ItemType]
+    next_cursor: Optional[str] = None
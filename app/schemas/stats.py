@@ -0,0 +1,102 @@
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+
+class FundStats(BaseModel):
+    """Схема для отображения показателей фонда.
+
+    Attributes:
+        open_projects: Количество открытых проектов.
+        closed_projects: Количество закрытых проектов.
+        open_capacity: Сумма, которой не хватает открытым проектам.
+        total_raised: Общая сумма пожертвований.
+        unallocated_donations: Сумма пожертвований, ещё не
+            распределённая по проектам.
+    """
+
+    open_projects: int = 0
+    closed_projects: int = 0
+    open_capacity: int = 0
+    total_raised: int = 0
+    unallocated_donations: int = 0
+
+
+class PoolStats(BaseModel):
+    """Схема для отображения использования пула соединений.
+
+    Attributes:
+        pool: Класс пула соединений.
+        size: Размер пула.
+        checked_in: Открытые соединения, ожидающие в пуле.
+        checked_out: Соединения, выданные сессиям.
+        overflow: Соединения, открытые сверх размера пула.
+    """
+
+    pool: str
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+
+
+class ResponseCacheStats(BaseModel):
+    """Схема для отображения использования кэша ответов.
+
+    Attributes:
+        entries: Количество ответов в кэше.
+        bytes: Суммарный размер тел ответов.
+        hits: Ответы, отданные из кэша.
+        misses: Ответы, построенные по базе данных.
+        coalesced: Запросы, дождавшиеся ответа, который строил другой
+            запрос.
+        evictions: Ответы, вытесненные из кэша по размеру.
+    """
+
+    entries: int
+    bytes: int
+    hits: int
+    misses: int
+    coalesced: int
+    evictions: int
+
+
+class ObjectCacheStats(BaseModel):
+    """Схема для отображения использования кэша объектов модели.
+
+    Attributes:
+        size: Количество объектов в кэше.
+        hits: Объекты, полученные из кэша.
+        misses: Объекты, прочитанные из базы данных.
+    """
+
+    size: int
+    hits: int
+    misses: int
+
+
+class CacheStats(BaseModel):
+    """Схема для отображения использования кэшей процесса.
+
+    Attributes:
+        responses: Кэши ответов по именам.
+        objects: Кэши объектов по именам таблиц.
+    """
+
+    responses: Dict[str, ResponseCacheStats]
+    objects: Dict[str, ObjectCacheStats]
+
+
+class QueryFlightStats(BaseModel):
+    """Схема для отображения объединения одинаковых запросов чтения.
+
+    Attributes:
+        calls: Вызовы чтения.
+        executed: Запросы, выполненные в базе данных.
+        coalesced: Вызовы, получившие результат одновременного
+            одинакового запроса.
+    """
+
+    calls: int
+    executed: int
+    coalesced: int
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.models import Donation, User
+from app.repositories.charity_project import charity_project_crud
+from app.repositories.donation import donation_crud
+from app.schemas.donation import DonationCreate
+
+logger = logging.getLogger(__name__)
+
+QueueItem = Tuple[DonationCreate, int, asyncio.Future]
+
+
+class DonationBatcher:
+    """Групповая запись пожертвований одной фоновой задачей.
+
+    Эндпоинт кладёт пожертвование в очередь и ждёт результат. Фоновая
+    задача забирает до `max_batch_size` пожертвований, ожидая следующие
+    не дольше `max_delay` секунд, создаёт и инвестирует их одним
+    коммитом в порядке поступления и возвращает каждому вызывающему
+    его объект `Donation`.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        max_batch_size: int,
+        max_delay: float,
+    ):
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._batch: List[QueueItem] = []
+
+    async def start(self) -> None:
+        """Запускает фоновую задачу записи."""
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу и отклоняет ожидающие запросы."""
+        if self._writer is None:
+            return
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            self._batch.append(self._queue.get_nowait())
+        for *_, future in self._batch:
+            if not future.done():
+                future.cancel()
+        self._batch = []
+        self._writer = None
+        self._queue = None
+
+    async def submit(self, obj_in: DonationCreate, user: User) -> Donation:
+        """Ставит пожертвование в очередь и ждёт его инвестирования.
+
+        Args:
+            obj_in: Данные для создания пожертвования.
+            user: Пользователь, сделавший пожертвование.
+
+        Returns:
+            Donation: Созданное и проинвестированное пожертвование.
+        """
+        if self._writer is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((obj_in, user.id, future))
+        return await future
+
+    async def _collect(self) -> List[QueueItem]:
+        batch = self._batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(
+                    await asyncio.wait_for(self._queue.get(), timeout)
+                )
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            try:
+                donations = await self._create_and_invest(batch)
+            except Exception:
+                logger.exception(
+                    'Не удалось записать пачку из %s пожертвований, '
+                    'они будут записаны по одному.', len(batch)
+                )
+                for item in batch:
+                    await self._create_and_invest_one(item)
+                continue
+            for (*_, future), donation in zip(batch, donations):
+                if not future.done():
+                    future.set_result(donation)
+
+    async def _create_and_invest(
+        self, batch: List[QueueItem]
+    ) -> List[Donation]:
+        async with self.session_factory(expire_on_commit=False) as session:
+            return await donation_crud.create_and_invest_many(
+                session=session,
+                objs_in=[obj_in for obj_in, *_ in batch],
+                user_ids=[user_id for _, user_id, _ in batch],
+                opposite_crud=charity_project_crud,
+            )
+
+    async def _create_and_invest_one(self, item: QueueItem) -> None:
+        *_, future = item
+        try:
+            donation, = await self._create_and_invest([item])
+        except Exception as error:
+            if not future.done():
+                future.set_exception(error)
+        else:
+            if not future.done():
+                future.set_result(donation)
+
+
+donation_batcher = DonationBatcher(
+    AsyncSessionLocal,
+    max_batch_size=settings.donation_batch_size,
+    max_delay=settings.donation_batch_delay_ms / 1000,
+)
@@ -0,0 +1,335 @@
+"""Потоковый импорт пожертвований из CSV и NDJSON.
+
+Запуск::
+
+    python -m app.services.donation_import donations.csv \
+        --user-id 1 [--format csv|ndjson] [--chunk-size N]
+"""
+import argparse
+import asyncio
+import csv
+import json
+from codecs import getincrementaldecoder
+from typing import (
+    AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+)
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.models import User
+from app.repositories.charity_project import charity_project_crud
+from app.repositories.donation import donation_crud
+from app.schemas.donation import (
+    DonationCreate, DonationImportError, DonationImportSummary
+)
+
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+IMPORT_FORMAT_EXAMPLES: Dict[str, str] = {
+    'text/csv': 'full_amount,comment,user_id\n100,Для котиков,1\n',
+    'application/x-ndjson': '{"full_amount": 100, "comment": "Котикам"}\n',
+}
+IMPORT_READ_SIZE = 64 * 1024
+# Сколько ошибок в строках возвращается в итогах импорта.
+IMPORT_ERRORS_LIMIT = 100
+
+ImportRow = Tuple[int, DonationCreate, int]
+
+
+class DonationImportFormatError(ValueError):
+    """Входные данные нельзя разобрать как CSV или NDJSON."""
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, str]]:
+    """Разбивает поток байтов на строки в кодировке UTF-8.
+
+    Args:
+        chunks: Поток фрагментов входных данных.
+
+    Yields:
+        Номер строки (с единицы) и её текст без перевода строки.
+    """
+    decoder = getincrementaldecoder('utf-8-sig')()
+    tail = ''
+    line_number = 0
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split('\n')
+        tail = lines.pop()
+        for line in lines:
+            line_number += 1
+            yield line_number, line.rstrip('\r')
+    tail += decoder.decode(b'', final=True)
+    if tail:
+        yield line_number + 1, tail.rstrip('\r')
+
+
+async def iter_ndjson_records(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, object]]:
+    """Разбирает поток NDJSON: по одному объекту JSON в строке."""
+    async for line_number, line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as error:
+            yield line_number, error
+
+
+async def iter_csv_records(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, object]]:
+    """Разбирает поток CSV с заголовком в первой строке.
+
+    Поле в кавычках может занимать несколько строк.
+    """
+    header: Optional[List[str]] = None
+    record_line, record = 0, ''
+    async for line_number, line in iter_lines(chunks):
+        if not record:
+            record_line, record = line_number, line
+        else:
+            record += '\n' + line
+        # Кавычки внутри поля удваиваются, поэтому нечётное их количество
+        # означает, что поле продолжается на следующей строке.
+        if record.count('"') % 2 or not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        record = ''
+        if header is None:
+            header = [name.strip() for name in values]
+        elif len(values) != len(header):
+            yield record_line, DonationImportFormatError(
+                f'ожидалось полей: {len(header)}, получено: {len(values)}'
+            )
+        else:
+            yield record_line, dict(zip(header, values))
+    if record.strip():
+        yield record_line, DonationImportFormatError(
+            'незакрытые кавычки в последней записи'
+        )
+
+
+def iter_records(
+    chunks: AsyncIterator[bytes],
+    import_format: str,
+) -> AsyncIterator[Tuple[int, object]]:
+    """Разбирает поток CSV или NDJSON в записи.
+
+    Пустые строки пропускаются.
+
+    Args:
+        chunks: Поток фрагментов входных данных.
+        import_format: `csv` или `ndjson`.
+
+    Returns:
+        Поток пар из номера первой строки записи и словаря полей либо
+        исключения, если запись не удалось разобрать.
+    """
+    if import_format == 'csv':
+        return iter_csv_records(chunks)
+    return iter_ndjson_records(chunks)
+
+
+def parse_row(record: object, default_user_id: int) -> Tuple[
+    DonationCreate, int
+]:
+    """Проверяет запись схемой `DonationCreate`.
+
+    Пустые значения полей CSV считаются отсутствующими. Поле `user_id`
+    необязательно: по умолчанию пожертвование записывается
+    на `default_user_id`.
+
+    Raises:
+        ValueError: Если запись не является объектом или не проходит
+            проверку схемы.
+    """
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise DonationImportFormatError('запись должна быть объектом')
+    record = {
+        field: value for field, value in record.items()
+        if value not in ('', None)
+    }
+    user_id = record.pop('user_id', default_user_id)
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        raise DonationImportFormatError('user_id должен быть целым числом')
+    return DonationCreate(**record), user_id
+
+
+def format_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return '; '.join(
+            f'{".".join(map(str, item["loc"]))}: {item["msg"]}'
+            for item in error.errors()
+        )
+    return str(error)
+
+
+class DonationImporter:
+    """Создаёт и инвестирует пожертвования пачками.
+
+    Каждая пачка создаётся через `create_and_invest_many`: новые
+    пожертвования в порядке входных данных сливаются с очередью открытых
+    проектов за один проход и фиксируются одним коммитом.
+    """
+
+    def __init__(self, session: AsyncSession, chunk_size: int):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.summary = DonationImportSummary()
+
+    def reject(self, line: int, detail: str) -> None:
+        self.summary.rejected += 1
+        if len(self.summary.errors) < IMPORT_ERRORS_LIMIT:
+            self.summary.errors.append(
+                DonationImportError(line=line, detail=detail)
+            )
+
+    async def existing_user_ids(self, user_ids: Iterable[int]) -> set:
+        users = await self.session.execute(
+            select(User.id).where(User.id.in_(set(user_ids)))
+        )
+        return set(users.scalars())
+
+    async def import_chunk(self, rows: List[ImportRow]) -> None:
+        """Создаёт и инвестирует пачку пожертвований одним коммитом."""
+        user_ids = await self.existing_user_ids(
+            user_id for *_, user_id in rows
+        )
+        valid_rows = []
+        for line, obj_in, user_id in rows:
+            if user_id in user_ids:
+                valid_rows.append((obj_in, user_id))
+            else:
+                self.reject(line, f'пользователь {user_id} не найден')
+        if not valid_rows:
+            return
+        donations = await donation_crud.create_and_invest_many(
+            session=self.session,
+            objs_in=[obj_in for obj_in, _ in valid_rows],
+            user_ids=[user_id for _, user_id in valid_rows],
+            opposite_crud=charity_project_crud,
+        )
+        self.summary.chunks += 1
+        for donation in donations:
+            self.summary.imported += 1
+            self.summary.full_amount += donation.full_amount
+            self.summary.invested_amount += donation.invested_amount
+            self.summary.fully_invested += bool(donation.fully_invested)
+        # Созданные объекты больше не нужны: память ограничена пачкой.
+        self.session.expunge_all()
+
+    async def run(
+        self,
+        records: AsyncIterator[Tuple[int, object]],
+        default_user_id: int,
+    ) -> DonationImportSummary:
+        rows: List[ImportRow] = []
+        async for line, record in records:
+            self.summary.rows += 1
+            try:
+                obj_in, user_id = parse_row(record, default_user_id)
+            except (ValidationError, ValueError) as error:
+                self.reject(line, format_error(error))
+                continue
+            rows.append((line, obj_in, user_id))
+            if len(rows) == self.chunk_size:
+                await self.import_chunk(rows)
+                rows = []
+        if rows:
+            await self.import_chunk(rows)
+        return self.summary
+
+
+async def import_donations(
+    session: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    import_format: str,
+    user_id: int,
+    chunk_size: Optional[int] = None,
+) -> DonationImportSummary:
+    """Импортирует пожертвования из потока CSV или NDJSON.
+
+    Строки проверяются схемой `DonationCreate`; некорректные строки
+    пропускаются и попадают в итоги. Корректные создаются
+    и инвестируются пачками по `chunk_size` с коммитом на пачку, так что
+    при сбое уже зафиксированные пачки сохраняются.
+
+    Args:
+        session: Асинхронная сессия для работы с базой данных.
+        chunks: Поток фрагментов входных данных.
+        import_format: `csv` или `ndjson`.
+        user_id: Пользователь по умолчанию для строк без `user_id`.
+        chunk_size: Размер пачки (по умолчанию
+            `donation_import_chunk_size`).
+
+    Returns:
+        DonationImportSummary: Итоги импорта.
+    """
+    importer = DonationImporter(
+        session, chunk_size or settings.donation_import_chunk_size
+    )
+    return await importer.run(iter_records(chunks, import_format), user_id)
+
+
+async def read_file(path: str) -> AsyncIterator[bytes]:
+    with open(path, 'rb') as source:
+        while True:
+            chunk = source.read(IMPORT_READ_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def run(
+    path: str, import_format: str, user_id: int, chunk_size: int
+) -> DonationImportSummary:
+    async with AsyncSessionLocal() as session:
+        return await import_donations(
+            session, read_file(path), import_format, user_id, chunk_size
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Импорт пожертвований из CSV или NDJSON.'
+    )
+    parser.add_argument('path', help='файл с пожертвованиями')
+    parser.add_argument(
+        '--format', choices=sorted(set(IMPORT_FORMATS.values())),
+        help='формат файла (по умолчанию - по расширению)',
+    )
+    parser.add_argument(
+        '--user-id', type=int, required=True,
+        help='пользователь для строк без user_id',
+    )
+    parser.add_argument(
+        '--chunk-size', type=int,
+        default=settings.donation_import_chunk_size,
+    )
+    args = parser.parse_args(argv)
+    import_format = args.format or (
+        'csv' if args.path.endswith('.csv') else 'ndjson'
+    )
+    summary = asyncio.run(
+        run(args.path, import_format, args.user_id, args.chunk_size)
+    )
+    print(summary.json(ensure_ascii=False, indent=2))
+    return int(bool(summary.rejected))
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
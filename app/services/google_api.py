@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from aiogoogle import Aiogoogle
 
@@ -87,7 +87,11 @@ async def update_spreadsheets_value(
         ['Название проекта', 'Время сбора', 'Описание']
     ]
     for project in projects:
-        days_to_close = (project.close_date - project.create_date).days
+        # Время сбора берётся из того же поля, по которому отсортирован
+        # отчёт.
+        days_to_close = timedelta(
+            seconds=project.close_duration_seconds
+        ).days
         new_row = [
             project.name,
             str(days_to_close),
@@ -0,0 +1,7 @@
+"""Нагрузочные замеры инвестирования.
+
+Запуск::
+
+    python -m benchmarks.run --sizes 1000 100000 1000000 \
+        --output benchmark.json [--baseline previous.json]
+"""
@@ -0,0 +1,59 @@
+import math
+import resource
+import sys
+from typing import Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryCounter:
+    """Считает SQL-запросы, выполненные движком.
+
+    Используется как контекстный менеджер: слушатель
+    `before_cursor_execute` подключается на время блока.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine.sync_engine
+        self.count = 0
+
+    def _count(self, *args) -> None:
+        self.count += 1
+
+    def __enter__(self) -> 'QueryCounter':
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль `q` (0-100) методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def peak_rss_mb() -> float:
+    """Пиковый объём резидентной памяти процесса в мегабайтах."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает килобайты, macOS - байты.
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+def summarize(latencies: List[float], queries: List[int]) -> Dict:
+    """Сводка замера: перцентили задержки в мс и запросы на операцию."""
+    milliseconds = [latency * 1000 for latency in latencies]
+    return {
+        'iterations': len(latencies),
+        'p50_ms': round(percentile(milliseconds, 50), 3),
+        'p95_ms': round(percentile(milliseconds, 95), 3),
+        'p99_ms': round(percentile(milliseconds, 99), 3),
+        'mean_ms': round(sum(milliseconds) / len(milliseconds), 3),
+        'queries_per_op': round(sum(queries) / len(queries), 2),
+        'peak_rss_mb': peak_rss_mb(),
+    }
@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.db import (
+    create_database_engine, get_async_session, get_read_session
+)
+from app.core.investing import distribute_funds
+from app.core.ledger import ledgers
+from app.core.user import current_superuser, current_user
+from app.main import app
+from app.models import CharityProject, Donation, User
+from app.repositories.charity_project import charity_project_crud
+from app.repositories.donation import donation_crud
+from app.schemas.charity_project import CharityProjectCreate
+from app.schemas.donation import DonationCreate
+from benchmarks.metrics import QueryCounter, summarize
+from benchmarks.seed import (
+    BENCHMARK_USER_ID, MAX_AMOUNT, MIN_AMOUNT, seed_database
+)
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_ITERATIONS = 200
+DEFAULT_DATABASE_URL = 'sqlite+aiosqlite:///./benchmark.db'
+# Новый объект в среднем затрагивает несколько открытых объектов.
+NEW_OBJECT_MAX_AMOUNT = 3 * MAX_AMOUNT
+# Допустимый рост p95 и запросов на операцию относительно базового
+# прогона.
+DEFAULT_MAX_REGRESSION = 1.2
+ENGINES = ('orm', 'ledger', 'sql')
+# Сторона замера: модель новых объектов, CRUD новых объектов,
+# CRUD противоположной модели и URL эндпоинта создания.
+SIDES = {
+    'donation': (Donation, donation_crud, charity_project_crud, '/donation/'),
+    'charity_project': (
+        CharityProject, charity_project_crud, donation_crud,
+        '/charity_project/',
+    ),
+}
+
+benchmark_user = User(
+    id=BENCHMARK_USER_ID,
+    is_active=True,
+    is_verified=True,
+    is_superuser=True,
+)
+
+
+@contextmanager
+def investing_engine(engine: str) -> Iterator[None]:
+    """Временно переключает движок инвестирования приложения.
+
+    `ledger` - движок `orm` с очередью открытых объектов в памяти.
+    """
+    saved = settings.investing_engine, settings.investment_ledger
+    settings.investing_engine = 'sql' if engine == 'sql' else 'orm'
+    settings.investment_ledger = engine == 'ledger'
+    ledgers.clear()
+    try:
+        yield
+    finally:
+        settings.investing_engine, settings.investment_ledger = saved
+        ledgers.clear()
+
+
+def new_object_data(side: str, index: int, rnd: random.Random) -> Dict:
+    """Данные нового пожертвования или проекта для запроса."""
+    data = {'full_amount': rnd.randint(MIN_AMOUNT, NEW_OBJECT_MAX_AMOUNT)}
+    if side == 'charity_project':
+        data.update(name=f'benchmark-{index}', description='benchmark')
+    return data
+
+
+async def bench_distribute_funds(
+    size: int, iterations: int, rnd: random.Random
+) -> Dict:
+    """Замер `distribute_funds` без базы данных.
+
+    Очередь открытых проектов строится из несохранённых объектов.
+    Её длина ограничена тем, что могут затронуть `iterations`
+    пожертвований, так как `distribute_funds` перебирает очередь
+    только до исчерпания суммы.
+    """
+    pool_size = min(size, iterations * NEW_OBJECT_MAX_AMOUNT // MIN_AMOUNT)
+    open_objects = [
+        CharityProject(
+            full_amount=rnd.randint(MIN_AMOUNT, MAX_AMOUNT),
+            invested_amount=0,
+            fully_invested=False,
+        )
+        for _ in range(pool_size)
+    ]
+    head = 0
+    latencies = []
+    for _ in range(iterations):
+        donation = Donation(
+            full_amount=rnd.randint(MIN_AMOUNT, NEW_OBJECT_MAX_AMOUNT),
+            invested_amount=0,
+        )
+        started = time.perf_counter()
+        await distribute_funds(None, donation, open_objects[head:])
+        latencies.append(time.perf_counter() - started)
+        while head < pool_size and open_objects[head].fully_invested:
+            head += 1
+    return summarize(latencies, [0] * iterations)
+
+
+async def bench_create_and_invest(
+    session_factory: sessionmaker,
+    counter: QueryCounter,
+    side: str,
+    iterations: int,
+    rnd: random.Random,
+    offset: int,
+) -> Dict:
+    """Замер `create_and_invest` через CRUD-слой."""
+    _, crud, opposite_crud, _ = SIDES[side]
+    schema = DonationCreate if side == 'donation' else CharityProjectCreate
+    latencies, queries = [], []
+    for index in range(offset, offset + iterations):
+        obj_in = schema(**new_object_data(side, index, rnd))
+        queries_before = counter.count
+        started = time.perf_counter()
+        async with session_factory() as session:
+            await crud.create_and_invest(
+                session=session,
+                obj_in=obj_in,
+                user=benchmark_user if side == 'donation' else None,
+                opposite_crud=opposite_crud,
+            )
+        latencies.append(time.perf_counter() - started)
+        queries.append(counter.count - queries_before)
+    return summarize(latencies, queries)
+
+
+async def bench_http(
+    client: httpx.AsyncClient,
+    counter: QueryCounter,
+    side: str,
+    iterations: int,
+    rnd: random.Random,
+    offset: int,
+) -> Dict:
+    """Замер эндпоинта создания через ASGI-клиент в том же процессе."""
+    *_, url = SIDES[side]
+    latencies, queries = [], []
+    for index in range(offset, offset + iterations):
+        data = new_object_data(side, index, rnd)
+        queries_before = counter.count
+        started = time.perf_counter()
+        response = await client.post(url, json=data)
+        latencies.append(time.perf_counter() - started)
+        queries.append(counter.count - queries_before)
+        response.raise_for_status()
+    return summarize(latencies, queries)
+
+
+async def run_size(
+    database_url: str,
+    size: int,
+    engines: Sequence[str],
+    iterations: int,
+    seed: int,
+) -> List[Dict]:
+    """Выполняет все замеры для одного размера базы данных.
+
+    База заполняется заново для каждой стороны; движки инвестирования
+    замеряются на одной базе по очереди, каждый вызов расходует
+    лишь несколько открытых объектов из `size`.
+    """
+    engine = create_database_engine(database_url)
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+
+    async def override_session():
+        async with session_factory() as session:
+            yield session
+
+    saved_overrides = app.dependency_overrides
+    app.dependency_overrides = {
+        get_async_session: override_session,
+        get_read_session: override_session,
+        current_user: lambda: benchmark_user,
+        current_superuser: lambda: benchmark_user,
+    }
+    rnd = random.Random(seed)
+    results = [{
+        'size': size,
+        'side': None,
+        'scenario': 'distribute_funds',
+        'engine': None,
+        **await bench_distribute_funds(size, iterations, rnd),
+    }]
+    try:
+        for side, (new_model, *_) in SIDES.items():
+            open_model = (
+                CharityProject if new_model is Donation else Donation
+            )
+            seed_seconds = await seed_database(engine, size, open_model, seed)
+            offset = 0
+            for engine_name in engines:
+                with investing_engine(engine_name), \
+                        QueryCounter(engine) as counter:
+                    scenarios: List[Tuple[str, Dict]] = [(
+                        'create_and_invest',
+                        await bench_create_and_invest(
+                            session_factory, counter, side, iterations,
+                            rnd, offset,
+                        ),
+                    )]
+                    offset += iterations
+                    async with httpx.AsyncClient(
+                        app=app, base_url='http://benchmark'
+                    ) as client:
+                        scenarios.append(('http', await bench_http(
+                            client, counter, side, iterations, rnd, offset
+                        )))
+                    offset += iterations
+                for scenario, summary in scenarios:
+                    results.append({
+                        'size': size,
+                        'side': side,
+                        'scenario': scenario,
+                        'engine': engine_name,
+                        'seed_seconds': round(seed_seconds, 3),
+                        **summary,
+                    })
+    finally:
+        app.dependency_overrides = saved_overrides
+        await engine.dispose()
+    return results
+
+
+def result_key(result: Dict) -> Tuple:
+    return (
+        result['size'], result['side'], result['scenario'], result['engine']
+    )
+
+
+def compare(
+    results: List[Dict],
+    baseline: List[Dict],
+    max_regression: float = DEFAULT_MAX_REGRESSION,
+) -> List[str]:
+    """Сравнивает замеры с базовым прогоном.
+
+    Args:
+        results: Результаты текущего прогона.
+        baseline: Результаты базового прогона.
+        max_regression: Допустимый коэффициент роста p95 и количества
+            запросов на операцию.
+
+    Returns:
+        List[str]: Описания регрессий; пустой список, если их нет.
+    """
+    baseline_by_key = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_key.get(result_key(result))
+        if previous is None:
+            continue
+        name = '/'.join(str(part) for part in result_key(result))
+        if result['p95_ms'] > previous['p95_ms'] * max_regression:
+            regressions.append(
+                f'{name}: p95 {previous["p95_ms"]} -> {result["p95_ms"]} мс'
+            )
+        if (result['queries_per_op'] >
+                previous['queries_per_op'] * max_regression):
+            regressions.append(
+                f'{name}: запросов на операцию '
+                f'{previous["queries_per_op"]} -> {result["queries_per_op"]}'
+            )
+    return regressions
+
+
+async def run(
+    database_url: str,
+    sizes: Sequence[int],
+    engines: Sequence[str],
+    iterations: int,
+    seed: int,
+) -> Dict:
+    results = []
+    for size in sizes:
+        results.extend(
+            await run_size(database_url, size, engines, iterations, seed)
+        )
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'database': sqlalchemy.engine.make_url(database_url).drivername,
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'sizes': list(sizes),
+            'iterations': iterations,
+        },
+        'results': results,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Замеры инвестирования на заполненной базе данных.'
+    )
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES)
+    )
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES),
+                        choices=ENGINES)
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--database-url', default=DEFAULT_DATABASE_URL,
+        help='отдельная база данных: она пересоздаётся при каждом замере',
+    )
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline', help='JSON базового прогона')
+    parser.add_argument(
+        '--max-regression', type=float, default=DEFAULT_MAX_REGRESSION
+    )
+    args = parser.parse_args(argv)
+    report = asyncio.run(run(
+        args.database_url, args.sizes, args.engines, args.iterations,
+        args.seed,
+    ))
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+    for result in report['results']:
+        print(
+            '/'.join(str(part) for part in result_key(result)),
+            f'p50={result["p50_ms"]} p95={result["p95_ms"]} '
+            f'p99={result["p99_ms"]} мс, '
+            f'запросов {result["queries_per_op"]}, '
+            f'RSS {result["peak_rss_mb"]} МБ',
+        )
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, encoding='utf-8') as baseline:
+        regressions = compare(
+            report['results'], json.load(baseline)['results'],
+            args.max_regression,
+        )
+    for regression in regressions:
+        print('Регрессия:', regression)
+    return int(bool(regressions))
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
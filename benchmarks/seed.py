@@ -0,0 +1,109 @@
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Type
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.db import Base
+from app.models import CharityProject, Donation, User
+from app.models.base import InvestmentBase
+
+SEED_BATCH_SIZE = 10000
+BENCHMARK_USER_ID = 1
+MIN_AMOUNT = 100
+MAX_AMOUNT = 1000
+SEED_START_DATE = datetime(2020, 1, 1)
+
+
+def object_rows(
+    model: Type[InvestmentBase],
+    count: int,
+    is_open: bool,
+    start_date: datetime,
+    rnd: random.Random,
+) -> Iterator[dict]:
+    """Генерирует строки проектов или пожертвований для вставки.
+
+    Открытые объекты не проинвестированы, закрытые - полностью.
+    Строки идут по возрастанию `create_date` с шагом в одну секунду.
+    """
+    prefix = 'open' if is_open else 'closed'
+    for index in range(count):
+        full_amount = rnd.randint(MIN_AMOUNT, MAX_AMOUNT)
+        create_date = start_date + timedelta(seconds=index)
+        row = {
+            'full_amount': full_amount,
+            'invested_amount': 0 if is_open else full_amount,
+            'fully_invested': not is_open,
+            'create_date': create_date,
+            'close_date': None if is_open else create_date,
+            'close_duration_seconds': None if is_open else 0,
+        }
+        if model is CharityProject:
+            row['name'] = f'{prefix}-{index}'
+            row['description'] = 'benchmark'
+        else:
+            row['user_id'] = BENCHMARK_USER_ID
+        yield row
+
+
+async def insert_rows(
+    connection: AsyncConnection,
+    model: Type[Base],
+    rows: Iterator[dict],
+) -> None:
+    """Вставляет строки пакетами по `SEED_BATCH_SIZE` через Core."""
+    batch: List[dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == SEED_BATCH_SIZE:
+            await connection.execute(insert(model.__table__), batch)
+            batch = []
+    if batch:
+        await connection.execute(insert(model.__table__), batch)
+
+
+async def seed_database(
+    engine: AsyncEngine,
+    size: int,
+    open_model: Type[InvestmentBase],
+    seed: int = 0,
+) -> float:
+    """Пересоздаёт схему и заполняет базу данных для замера.
+
+    В каждой таблице создаётся `size` закрытых объектов (история),
+    а у модели `open_model` ещё `size` открытых объектов после них.
+
+    Args:
+        engine: Асинхронный движок базы данных замера.
+        size: Количество объектов каждого вида.
+        open_model: Модель, у которой есть открытые объекты.
+        seed: Начальное значение генератора сумм.
+
+    Returns:
+        float: Длительность заполнения в секундах.
+    """
+    rnd = random.Random(seed)
+    started = time.perf_counter()
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(User.__table__), [{
+            'id': BENCHMARK_USER_ID,
+            'email': 'benchmark@example.com',
+            'hashed_password': '',
+            'is_active': True,
+            'is_superuser': True,
+            'is_verified': True,
+        }])
+        for model in (CharityProject, Donation):
+            await insert_rows(connection, model, object_rows(
+                model, size, False, SEED_START_DATE, rnd
+            ))
+        await insert_rows(connection, open_model, object_rows(
+            open_model, size, True,
+            SEED_START_DATE + timedelta(seconds=size), rnd
+        ))
+    return time.perf_counter() - started
@@ -16,10 +16,10 @@ except (NameError, ImportError) as error:
     )
 
 try:
-    from app.core.db import Base, get_async_session  # noqa
+    from app.core.db import Base, get_async_session, get_read_session  # noqa
 except (NameError, ImportError) as error:
     raise AssertionError(
-        'При импорте объектов `Base, get_async_session` '
+        'При импорте объектов `Base, get_async_session, get_read_session` '
         'из модуля `app.core.db` возникло исключение:\n'
         f'{type(error).__name__}: {error}.'
     )
@@ -43,11 +43,21 @@ except (NameError, ImportError) as error:
     )
 
 
+from app.api.response_cache import response_caches  # noqa
+from app.core.config import settings  # noqa
+from app.core.counters import count_counters, get_counters  # noqa
+from app.models.user import User  # noqa
+from app.repositories.charity_project import charity_project_crud  # noqa
+from app.repositories.donation import donation_crud  # noqa
+from app.schemas.charity_project import CharityProjectCreate  # noqa
+from app.schemas.donation import DonationCreate  # noqa
+
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
 pytest_plugins = [
     'fixtures.user',
     'fixtures.data',
+    'fixtures.statements',
 ]
 
 TEST_DB = BASE_DIR / 'test.db'
@@ -70,6 +80,8 @@ async def override_db():
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Версии таблиц начинаются заново с каждой базой данных.
+    response_caches.clear()
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
@@ -80,3 +92,41 @@ def mixer():
     mixer_engine = create_engine(f'sqlite:///{str(TEST_DB)}')
     session = sessionmaker(bind=mixer_engine)
     return _mixer(session=session(), commit=True)
+
+
+@pytest.fixture
+def no_retry_delay(monkeypatch):
+    # Фикстуры данных замораживают время, а вместе с ним и часы цикла
+    # событий: задержка перед повтором не закончилась бы никогда.
+    monkeypatch.setattr(settings, 'investing_retry_delay', 0)
+
+
+async def create_project(name='Проект', full_amount=100):
+    async with TestingSessionLocal() as session:
+        return await charity_project_crud.create_and_invest(
+            session=session,
+            obj_in=CharityProjectCreate(
+                name=name, description='Описание', full_amount=full_amount
+            ),
+            opposite_crud=donation_crud,
+        )
+
+
+async def donate(full_amount):
+    async with TestingSessionLocal() as session:
+        return await donation_crud.create_and_invest(
+            session=session,
+            obj_in=DonationCreate(full_amount=full_amount),
+            user=User(id=2),
+            opposite_crud=charity_project_crud,
+        )
+
+
+async def get_project(project_id):
+    async with TestingSessionLocal() as session:
+        return await charity_project_crud.get(project_id, session)
+
+
+async def read_counters():
+    async with TestingSessionLocal() as session:
+        return await get_counters(session), await count_counters(session)
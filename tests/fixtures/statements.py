@@ -0,0 +1,28 @@
+import pytest
+from conftest import engine
+from sqlalchemy import event
+
+
+def listen_statements(match):
+    statements = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        if match(statement):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    yield statements
+    event.remove(engine.sync_engine, 'before_cursor_execute', collect)
+
+
+@pytest.fixture
+def executed_statements():
+    yield from listen_statements(lambda statement: True)
+
+
+@pytest.fixture
+def project_selects():
+    yield from listen_statements(
+        lambda statement: statement.startswith('SELECT')
+        and 'FROM charityproject' in statement
+    )
@@ -0,0 +1,48 @@
+from benchmarks.run import compare, run_size
+
+
+async def test_benchmark_reports_every_scenario(tmp_path):
+    results = await run_size(
+        f'sqlite+aiosqlite:///{tmp_path / "benchmark.db"}',
+        size=50, engines=['orm', 'sql'], iterations=3, seed=0,
+    )
+    scenarios = {
+        (result['side'], result['scenario'], result['engine'])
+        for result in results
+    }
+    assert scenarios == {
+        (None, 'distribute_funds', None),
+        *(
+            (side, scenario, engine)
+            for side in ('donation', 'charity_project')
+            for scenario in ('create_and_invest', 'http')
+            for engine in ('orm', 'sql')
+        ),
+    }, (
+        'Замер должен включать `distribute_funds`, оба пути '
+        '`create_and_invest` и HTTP-эндпоинты для каждого движка.'
+    )
+    for result in results:
+        assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms'], (
+            'Перцентили задержки должны быть упорядочены.'
+        )
+        if result['scenario'] != 'distribute_funds':
+            assert result['queries_per_op'] > 0, (
+                'Замер должен считать SQL-запросы на операцию.'
+            )
+
+
+def test_benchmark_compare_flags_regressions():
+    baseline = [{
+        'size': 1000, 'side': 'donation', 'scenario': 'http',
+        'engine': 'orm', 'p95_ms': 10.0, 'queries_per_op': 10.0,
+    }]
+    assert compare([{**baseline[0], 'p95_ms': 11.0}], baseline) == [], (
+        'Рост p95 в пределах допуска не должен считаться регрессией.'
+    )
+    assert len(compare(
+        [{**baseline[0], 'p95_ms': 20.0, 'queries_per_op': 20.0}], baseline
+    )) == 2, (
+        'Рост p95 и количества запросов сверх допуска должен '
+        'считаться регрессией.'
+    )
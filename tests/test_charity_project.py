@@ -2,6 +2,13 @@ import time
 from datetime import datetime
 
 import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.object_cache import object_caches
+from app.models import CharityProject
+from app.repositories.charity_project import charity_project_crud
 
 PROJECTS_URL = '/charity_project/'
 PROJECT_DETAILS_URL = PROJECTS_URL + '{project_id}'
@@ -728,3 +735,57 @@ def test_get_all_charity_project_not_auth_user(test_client):
         f'пользователя к эндпоинту `{PROJECTS_URL}` возвращается список '
         'существующих проектов.'
     )
+
+
+@pytest.mark.parametrize('url, json', [
+    (PROJECT_DETAILS_URL, {'full_amount': 100}),
+    (PROJECTS_URL + 'batch', [{'full_amount': 100}]),
+])
+async def test_update_with_unmatchable_condition_is_rejected(
+        superuser_client, no_retry_delay, charity_project, url, json
+):
+    async with TestingSessionLocal() as session:
+        # Условный UPDATE никогда не подходит под строку с NULL.
+        await session.execute(
+            update(CharityProject).where(
+                CharityProject.id == charity_project.id
+            ).values(fully_invested=None)
+        )
+        await session.commit()
+    if isinstance(json, list):
+        json = [{**obj, 'id': charity_project.id} for obj in json]
+    response = superuser_client.patch(
+        url.format(project_id=charity_project.id), json=json
+    )
+    assert response.status_code == 409, (
+        'Если условная запись проекта не удалась '
+        f'`investing_retry_attempts` раз, PATCH-запрос к `{url}` должен '
+        'вернуть ответ со статус-кодом 409.'
+    )
+
+
+async def test_update_rereads_project_past_object_cache(
+        superuser_client, monkeypatch, no_retry_delay, charity_project
+):
+    monkeypatch.setattr(settings, 'object_cache_size', 10)
+    object_caches.clear()
+    async with TestingSessionLocal() as session:
+        await charity_project_crud.get(charity_project.id, session)
+        # Строку меняют в обход приложения: версия таблицы та же,
+        # и кэш объектов возвращает устаревший проект.
+        await session.execute(
+            update(CharityProject).where(
+                CharityProject.id == charity_project.id
+            ).values(invested_amount=10)
+        )
+        await session.commit()
+    response = superuser_client.patch(
+        PROJECT_DETAILS_URL.format(project_id=charity_project.id),
+        json={'full_amount': 100},
+    )
+    object_caches.clear()
+    assert response.status_code == 200, (
+        'После несработавшего условного UPDATE проект должен '
+        'перечитываться из базы данных мимо кэша объектов.'
+    )
+    assert response.json()['invested_amount'] == 10
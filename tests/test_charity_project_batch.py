@@ -0,0 +1,225 @@
+import pytest
+from conftest import TestingSessionLocal, read_counters
+from sqlalchemy import update
+
+from app.api import validators
+from app.core.counters import rebuild_counters
+from app.models import CharityProject
+from app.repositories.charity_project import charity_project_crud
+
+BATCH_URL = '/charity_project/batch'
+
+
+def project_data(name, full_amount=100):
+    return {
+        'name': name, 'description': 'Описание', 'full_amount': full_amount
+    }
+
+
+async def test_create_projects_batch_invests_once(superuser_client, donation):
+    async with TestingSessionLocal() as session:
+        await rebuild_counters(session)
+        await session.commit()
+    response = superuser_client.post(BATCH_URL, json=[
+        project_data('Первый', 60),
+        project_data('Второй', 60),
+    ])
+    assert response.status_code == 200, (
+        f'POST-запрос суперпользователя к `{BATCH_URL}` должен вернуть '
+        'статус-код 200.'
+    )
+    assert [
+        (project['name'], project['invested_amount'])
+        for project in response.json()
+    ] == [('Первый', 60), ('Второй', 40)], (
+        'Открытые пожертвования должны распределяться по проектам '
+        'пакета в порядке запроса.'
+    )
+    counters, counted = await read_counters()
+    assert counters == counted, (
+        'Пакетное создание должно учитываться в показателях фонда.'
+    )
+
+
+@pytest.mark.parametrize('names', [
+    ['Повтор', 'Повтор'],
+    ['chimichangas4life', 'Новый'],
+])
+async def test_create_projects_batch_duplicate_names(
+        superuser_client, charity_project, names
+):
+    response = superuser_client.post(
+        BATCH_URL, json=[project_data(name) for name in names]
+    )
+    assert response.status_code == 400, (
+        'Пакет с повторяющимися или занятыми названиями должен '
+        'отклоняться со статус-кодом 400.'
+    )
+    async with TestingSessionLocal() as session:
+        projects = await charity_project_crud.get_multi(session)
+    assert len(projects) == 1, 'Из отклонённого пакета не создаётся проектов.'
+
+
+async def test_update_projects_batch(superuser_client, mixer):
+    projects = [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'Проект {index}', description='Описание',
+            full_amount=100, invested_amount=10, fully_invested=False,
+        )
+        for index in range(3)
+    ]
+    response = superuser_client.patch(BATCH_URL, json=[
+        {'id': projects[0].id, 'full_amount': 200},
+        {'id': projects[1].id, 'name': 'Переименованный'},
+        {'id': projects[2].id, 'full_amount': 100},
+    ])
+    assert response.status_code == 200, (
+        f'PATCH-запрос суперпользователя к `{BATCH_URL}` должен вернуть '
+        'статус-код 200.'
+    )
+    assert [
+        (project['full_amount'], project['name'])
+        for project in response.json()
+    ] == [
+        (200, projects[0].name),
+        (100, 'Переименованный'),
+        (100, projects[2].name),
+    ], 'Пакетное обновление должно менять только переданные поля.'
+
+
+@pytest.mark.parametrize('changes, status_code', [
+    ({'full_amount': 50}, 400),
+    ({'id': 0}, 404),
+])
+async def test_update_projects_batch_is_atomic(
+        superuser_client, charity_project_little_invested,
+        charity_project_nunchaku, changes, status_code
+):
+    response = superuser_client.patch(BATCH_URL, json=[
+        {'id': charity_project_nunchaku.id, 'full_amount': 100},
+        {'id': charity_project_little_invested.id, **changes},
+    ])
+    assert response.status_code == status_code, (
+        'Пакет с некорректным обновлением должен отклоняться целиком.'
+    )
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.get(
+            charity_project_nunchaku.id, session
+        )
+    assert project.full_amount == 5000000, (
+        'Из отклонённого пакета не обновляется ни один проект.'
+    )
+
+
+async def test_update_projects_batch_duplicate_name(
+        superuser_client, charity_project, charity_project_nunchaku
+):
+    response = superuser_client.patch(BATCH_URL, json=[
+        {'id': charity_project_nunchaku.id, 'full_amount': 100},
+        {'id': charity_project.id, 'name': charity_project_nunchaku.name},
+    ])
+    assert response.status_code == 400, (
+        'Пакет, переименовывающий проект в занятое название, должен '
+        'отклоняться со статус-кодом 400.'
+    )
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.get(
+            charity_project_nunchaku.id, session
+        )
+    assert project.full_amount == 5000000, (
+        'Из отклонённого пакета не обновляется ни один проект.'
+    )
+
+
+async def test_update_projects_batch_rechecks_changed_project(
+        superuser_client, monkeypatch, no_retry_delay, charity_project,
+        charity_project_nunchaku
+):
+    check_projects_exist = validators.check_charity_projects_exist
+    checks = []
+
+    async def close_after_check(project_ids, session):
+        projects = await check_projects_exist(project_ids, session)
+        if not checks:
+            # Проект закрывается после проверки, но до записи пакета.
+            async with TestingSessionLocal() as other_session:
+                await other_session.execute(
+                    update(CharityProject).where(
+                        CharityProject.id == charity_project.id
+                    ).values(fully_invested=True)
+                )
+                await other_session.commit()
+        checks.append(project_ids)
+        return projects
+
+    monkeypatch.setattr(
+        validators, 'check_charity_projects_exist', close_after_check
+    )
+    response = superuser_client.patch(BATCH_URL, json=[
+        {'id': charity_project_nunchaku.id, 'full_amount': 100},
+        {'id': charity_project.id, 'name': 'Переименованный'},
+    ])
+    assert response.status_code == 400, (
+        'Пакет, проект которого закрыли после проверки, должен '
+        'отклоняться со статус-кодом 400.'
+    )
+    assert len(checks) == 2, (
+        'После несработавшего условного UPDATE проекты должны '
+        'перечитываться.'
+    )
+    async with TestingSessionLocal() as session:
+        projects = await charity_project_crud.get_by_ids(
+            session, [charity_project_nunchaku.id, charity_project.id]
+        )
+    assert [
+        (project.full_amount, project.name) for project in projects
+    ] == [
+        (5000000, charity_project_nunchaku.name),
+        (charity_project.full_amount, charity_project.name),
+    ], 'Из отклонённого пакета не обновляется ни один проект.'
+
+
+async def test_delete_projects_batch(superuser_client, mixer):
+    project_ids = [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'Проект {index}', description='Описание',
+            full_amount=100, invested_amount=0, fully_invested=False,
+        ).id
+        for index in range(3)
+    ]
+    response = superuser_client.delete(BATCH_URL, json=project_ids[:2])
+    assert response.status_code == 200, (
+        f'DELETE-запрос суперпользователя к `{BATCH_URL}` должен вернуть '
+        'статус-код 200.'
+    )
+    assert [project['id'] for project in response.json()] == (
+        project_ids[:2]
+    ), 'Ответ должен содержать удалённые проекты.'
+    async with TestingSessionLocal() as session:
+        projects = await charity_project_crud.get_multi(session)
+    assert [project.id for project in projects] == project_ids[2:], (
+        'Пакетное удаление должно удалять только переданные проекты.'
+    )
+
+
+def test_delete_projects_batch_already_invested(
+        superuser_client, charity_project_nunchaku,
+        charity_project_little_invested
+):
+    response = superuser_client.delete(BATCH_URL, json=[
+        charity_project_nunchaku.id, charity_project_little_invested.id
+    ])
+    assert response.status_code == 400, (
+        'Пакет с проектом, в который внесены средства, должен '
+        'отклоняться со статус-кодом 400.'
+    )
+
+
+@pytest.mark.parametrize('method', ['post', 'patch', 'delete'])
+def test_projects_batch_usual_user(user_client, method):
+    response = getattr(user_client, method)(BATCH_URL, json=[])
+    assert response.status_code in (401, 403), (
+        f'Пакетные запросы к `{BATCH_URL}` доступны только суперпользователю.'
+    )
@@ -0,0 +1,120 @@
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from conftest import create_project, donate
+from freezegun import freeze_time
+
+from app.core.config import settings
+
+PROJECT = {'name': 'Проект', 'description': 'Описание', 'full_amount': 100}
+
+
+def test_projects_list_answers_not_modified(
+        superuser_client, executed_statements
+):
+    response = superuser_client.get('/charity_project/')
+    etag = response.headers.get('etag')
+    assert etag and etag.startswith('"'), (
+        'Список проектов должен содержать сильный ETag.'
+    )
+    assert response.headers['cache-control'] == (
+        settings.charity_project_cache_control
+    ), 'Cache-Control списка проектов должен браться из настроек.'
+
+    executed_statements.clear()
+    response = superuser_client.get(
+        '/charity_project/', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 304, (
+        'Запрос с актуальным If-None-Match должен вернуть статус-код 304.'
+    )
+    assert response.content == b'', 'Ответ 304 не должен содержать тела.'
+    assert response.headers['etag'] == etag, (
+        'Ответ 304 должен содержать ETag.'
+    )
+    assert not [
+        statement for statement, _ in executed_statements
+        if 'FROM charityproject' in statement
+    ], 'Ответ 304 должен возвращаться без чтения проектов.'
+
+    superuser_client.post('/charity_project/', json=PROJECT)
+    response = superuser_client.get(
+        '/charity_project/', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 200, (
+        'После изменения проектов старый ETag не должен давать 304.'
+    )
+    assert response.headers['etag'] != etag, (
+        'Изменение проектов должно менять ETag списка.'
+    )
+    assert response.json()[0]['name'] == PROJECT['name']
+
+
+def test_projects_list_ignores_if_modified_since(superuser_client, freezer):
+    superuser_client.post('/charity_project/', json=PROJECT)
+    last_modified = superuser_client.get(
+        '/charity_project/'
+    ).headers['last-modified']
+    assert parsedate_to_datetime(last_modified).replace(tzinfo=None) <= (
+        datetime.utcnow()
+    ), 'Last-Modified должен передаваться в UTC.'
+    # Запись в ту же секунду, что и чтение клиента.
+    superuser_client.post(
+        '/charity_project/', json={**PROJECT, 'name': 'Новый проект'}
+    )
+    response = superuser_client.get(
+        '/charity_project/', headers={'If-Modified-Since': last_modified}
+    )
+    assert response.status_code == 200, (
+        'Список, изменённый в ту же секунду, что и Last-Modified, '
+        'не должен давать ответ 304 по If-Modified-Since.'
+    )
+    assert len(response.json()) == 2
+    assert response.headers['last-modified'] == last_modified
+
+
+def test_stream_and_list_have_different_etags(user_client):
+    etag = user_client.get('/charity_project/').headers['etag']
+    response = user_client.get(
+        '/charity_project/',
+        headers={'Accept': 'application/x-ndjson', 'If-None-Match': etag},
+    )
+    assert response.status_code == 200, (
+        'ETag списка не должен подходить к потоку NDJSON.'
+    )
+
+
+async def test_donations_etag_changes_after_investing(user_client):
+    user_client.post('/donation/', json={'full_amount': 50})
+    response = user_client.get('/donation/my')
+    etag = response.headers['etag']
+    assert response.headers['cache-control'] == (
+        settings.donation_cache_control
+    ), 'Cache-Control пожертвований должен браться из настроек.'
+    assert user_client.get(
+        '/donation/my', headers={'If-None-Match': etag}
+    ).status_code == 304, (
+        'Запрос с актуальным If-None-Match должен вернуть статус-код 304.'
+    )
+    await create_project()
+    assert user_client.get(
+        '/donation/my', headers={'If-None-Match': etag}
+    ).status_code == 200, (
+        'Инвестирование пожертвований в новый проект должно менять ETag '
+        'списка пожертвований.'
+    )
+
+
+async def test_last_modified_and_close_date_use_one_clock(superuser_client):
+    # Местное время сервера на три часа впереди UTC.
+    with freeze_time('2010-10-10 12:00:00', tz_offset=3):
+        superuser_client.post('/charity_project/', json=PROJECT)
+        await donate(PROJECT['full_amount'])
+        response = superuser_client.get('/charity_project/')
+    [project] = response.json()
+    assert parsedate_to_datetime(
+        response.headers['last-modified']
+    ).replace(tzinfo=None) == datetime.fromisoformat(project['close_date']), (
+        'Last-Modified и дата закрытия проекта должны записываться '
+        'по одним часам (UTC).'
+    )
@@ -0,0 +1,145 @@
+import pytest
+from conftest import (
+    TestingSessionLocal, create_project, donate, read_counters
+)
+
+from app.core.config import settings
+from app.core.counters import rebuild_counters
+from app.repositories.charity_project import charity_project_crud
+from app.schemas.charity_project import CharityProjectUpdate
+
+STATS_URL = '/stats/'
+
+
+@pytest.mark.parametrize('investing_engine', ['orm', 'sql'])
+async def test_counters_follow_investments(monkeypatch, investing_engine):
+    monkeypatch.setattr(settings, 'investing_engine', investing_engine)
+    await create_project('Первый', 100)
+    await create_project('Второй', 200)
+    await donate(150)
+    await donate(400)
+    counters, counted = await read_counters()
+    assert counters == counted == {
+        'open_projects': 0,
+        'closed_projects': 2,
+        'open_capacity': 0,
+        'total_raised': 550,
+        'unallocated_donations': 250,
+    }, (
+        'Счётчики фонда должны меняться вместе с инвестированием '
+        'и совпадать с пересчётом по строкам.'
+    )
+
+    project = await create_project('Третий', 1000)
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.get(project.id, session)
+        await charity_project_crud.update(
+            project, CharityProjectUpdate(full_amount=500), session
+        )
+        assert await charity_project_crud.get_closed_projects_count(
+            session
+        ) == 2, 'Количество закрытых проектов должно браться из счётчиков.'
+    spare = await create_project('Четвёртый', 10)
+    async with TestingSessionLocal() as session:
+        spare = await charity_project_crud.get(spare.id, session)
+        await charity_project_crud.remove(spare, session)
+    counters, counted = await read_counters()
+    assert counters == counted, (
+        'Счётчики фонда должны учитывать изменение и удаление проектов.'
+    )
+    assert counters['open_capacity'] == 250
+
+
+async def test_conditional_writes_reject_stale_projects():
+    async with TestingSessionLocal() as session:
+        await rebuild_counters(session)
+        await session.commit()
+    project = await create_project('Первый', 100)
+    async with TestingSessionLocal() as session, \
+            TestingSessionLocal() as other_session:
+        stale = await charity_project_crud.get(project.id, session)
+        other_stale = await charity_project_crud.get(
+            project.id, other_session
+        )
+        await donate(60)
+        assert not await charity_project_crud.update_open(
+            stale, CharityProjectUpdate(full_amount=50), session
+        ), (
+            'Условный UPDATE не должен записывать проект, изменённый '
+            'после чтения.'
+        )
+        assert not await charity_project_crud.remove_uninvested(
+            [other_stale], other_session
+        ), (
+            'Условный DELETE не должен удалять проект, в который внесены '
+            'средства.'
+        )
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.get(project.id, session)
+        assert (project.full_amount, project.invested_amount) == (100, 60)
+        assert await charity_project_crud.update_open(
+            project, CharityProjectUpdate(full_amount=80), session
+        )
+    counters, counted = await read_counters()
+    assert counters == counted, (
+        'Счётчики фонда должны учитывать только выполненные условные записи.'
+    )
+
+
+async def test_rebuild_counters_repairs_drift(mixer):
+    await create_project('Первый', 100)
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='Вне счётчиков', full_amount=70, invested_amount=0,
+        fully_invested=False,
+    )
+    counters, counted = await read_counters()
+    assert counters != counted
+    async with TestingSessionLocal() as session:
+        await rebuild_counters(session)
+        await session.commit()
+    counters, counted = await read_counters()
+    assert counters == counted, (
+        'Пересчёт должен приводить счётчики в соответствие со строками.'
+    )
+
+
+async def test_stats_endpoint(test_client):
+    await create_project('Первый', 100)
+    await donate(30)
+    response = test_client.get(STATS_URL)
+    assert response.status_code == 200, (
+        f'GET-запрос к `{STATS_URL}` должен возвращать статус 200.'
+    )
+    assert response.json() == {
+        'open_projects': 1,
+        'closed_projects': 0,
+        'open_capacity': 70,
+        'total_raised': 30,
+        'unallocated_donations': 0,
+    }, 'Эндпоинт показателей должен возвращать значения счётчиков фонда.'
+
+
+@pytest.mark.parametrize('investing_engine', ['orm', 'sql'])
+async def test_project_without_remaining_amount_is_counted_closed(
+        monkeypatch, investing_engine
+):
+    monkeypatch.setattr(settings, 'investing_engine', investing_engine)
+    project = await create_project('Первый', 100)
+    await donate(50)
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.get(project.id, session)
+        assert await charity_project_crud.update_open(
+            project, CharityProjectUpdate(full_amount=50), session
+        )
+    await create_project('Второй', 100)
+    # Пожертвование закрывает первый проект, не внося в него средств.
+    await donate(30)
+    counters, counted = await read_counters()
+    # Показатели, которые ни разу не менялись, не записаны.
+    counters = {**dict.fromkeys(counted, 0), **counters}
+    assert counters == counted, (
+        'Проект, закрытый без распределения средств, должен учитываться '
+        'в счётчиках закрытых проектов.'
+    )
+    assert (counters['open_projects'], counters['closed_projects']) == (1, 1)
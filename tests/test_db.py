@@ -1,4 +1,11 @@
+import pytest
 from conftest import BASE_DIR
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 
 try:
@@ -10,6 +17,14 @@ except (NameError, ImportError) as error:
         f'{type(error).__name__}: {error}.'
     )
 
+from app.core.config import settings  # noqa
+from app.api.middleware import ReadYourWritesMiddleware  # noqa
+from app.core.constants import READ_YOUR_WRITES_COOKIE  # noqa
+from app.core.db import (  # noqa
+    AsyncReadSessionLocal, AsyncSessionLocal, create_database_engine,
+    create_read_engine, engine_options, get_read_session, pool_stats
+)
+
 
 def test_check_migration_file_exist():
     app_dirs = [d.name for d in BASE_DIR.iterdir()]
@@ -38,3 +53,137 @@ def test_check_db_url():
                 'Укажите значение по умолчанию для подключения базы данных '
                 'sqlite '
             )
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('postgresql+asyncpg://user@localhost/fund', {
+        'pool_size': 5,
+        'pool_pre_ping': True,
+        'connect_args': {
+            'prepared_statement_cache_size': 100,
+            'statement_cache_size': 100,
+        },
+    }),
+    ('sqlite+aiosqlite:///./fund.db', {
+        'pool_size': 5,
+        'poolclass': AsyncAdaptedQueuePool,
+        'connect_args': {'timeout': 5.0},
+    }),
+])
+def test_engine_options_follow_dialect(monkeypatch, url, expected):
+    monkeypatch.setattr(settings, 'engine_profile', 'tuned')
+    options = engine_options(make_url(url))
+    assert {name: options.get(name) for name in expected} == expected, (
+        'Профиль `tuned` должен задавать пул соединений и параметры '
+        'подключения своего диалекта.'
+    )
+
+
+def test_default_engine_profile_keeps_sqlalchemy_defaults(monkeypatch):
+    monkeypatch.setattr(settings, 'engine_profile', 'default')
+    assert engine_options(make_url('sqlite+aiosqlite:///./fund.db')) == {
+        'connect_args': {'timeout': settings.sqlite_busy_timeout},
+    }, 'Профиль `default` не должен менять параметры SQLAlchemy.'
+
+
+async def test_sqlite_pragmas_are_applied(tmp_path):
+    database_engine = create_database_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "fund.db"}'
+    )
+    try:
+        async with database_engine.connect() as connection:
+            pragmas = {
+                name: await connection.scalar(text(f'PRAGMA {name}'))
+                for name in ('journal_mode', 'synchronous', 'busy_timeout')
+            }
+            assert pool_stats(database_engine)['checked_out'] == 1
+    finally:
+        await database_engine.dispose()
+    assert pragmas == {
+        'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000
+    }, 'Соединения SQLite должны открываться с PRAGMA профиля `tuned`.'
+
+
+def test_pool_stats_endpoint(superuser_client):
+    response = superuser_client.get('/stats/pool')
+    assert response.status_code == 200, (
+        'GET-запрос суперпользователя к `/stats/pool` должен вернуть '
+        'статус-код 200.'
+    )
+    assert 'pool' in response.json()
+
+
+def test_pool_stats_endpoint_usual_user(user_client):
+    assert user_client.get('/stats/pool').status_code == 403, (
+        'Использование пула соединений доступно только суперпользователю.'
+    )
+
+
+async def test_sqlite_read_engine_is_read_only(tmp_path):
+    primary_engine = create_database_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "fund.db"}'
+    )
+    read_engine = create_read_engine(primary_engine)
+    try:
+        assert read_engine is not primary_engine, (
+            'Файловая SQLite в режиме WAL должна читаться отдельным пулом '
+            'соединений.'
+        )
+        async with primary_engine.begin() as connection:
+            await connection.execute(text('CREATE TABLE fund (id INTEGER)'))
+            await connection.execute(text('INSERT INTO fund VALUES (1)'))
+        async with read_engine.connect() as connection:
+            assert await connection.scalar(
+                text('SELECT count(*) FROM fund')
+            ) == 1, 'Движок чтения должен видеть записанные строки.'
+            with pytest.raises(OperationalError):
+                await connection.execute(text('INSERT INTO fund VALUES (2)'))
+    finally:
+        await read_engine.dispose()
+        await primary_engine.dispose()
+
+
+@pytest.mark.parametrize('cookies, session_factory', [
+    ({}, AsyncReadSessionLocal),
+    ({READ_YOUR_WRITES_COOKIE: '1'}, AsyncSessionLocal),
+])
+async def test_read_session_follows_read_your_writes_cookie(
+        cookies, session_factory
+):
+    request = Request({
+        'type': 'http',
+        'headers': [(
+            b'cookie',
+            '; '.join(f'{k}={v}' for k, v in cookies.items()).encode(),
+        )],
+    })
+    sessions = get_read_session(request)
+    session = await sessions.__anext__()
+    try:
+        assert session.bind is session_factory.kw['bind'], (
+            'Клиент, который недавно писал, должен читать с основной '
+            'базы данных, остальные - с движка чтения.'
+        )
+    finally:
+        await sessions.aclose()
+
+
+@pytest.mark.parametrize('method, status_code, has_cookie', [
+    ('post', 201, True),
+    ('post', 400, False),
+    ('get', 200, False),
+])
+def test_read_your_writes_middleware(method, status_code, has_cookie):
+    application = FastAPI()
+    application.add_middleware(ReadYourWritesMiddleware)
+
+    @application.api_route('/', methods=['GET', 'POST'])
+    def endpoint():
+        return Response(status_code=status_code)
+
+    with TestClient(application) as client:
+        response = getattr(client, method)('/')
+    assert (READ_YOUR_WRITES_COOKIE in response.cookies) == has_cookie, (
+        'Cookie чтения с основной базы данных должна ставиться только '
+        'после успешного изменяющего запроса.'
+    )
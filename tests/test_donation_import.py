@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+IMPORT_URL = '/donation/import'
+
+
+@pytest.fixture
+def import_users(mixer):
+    return [
+        mixer.blend(
+            'app.models.user.User', id=user_id, email=f'{user_id}@a.ru'
+        )
+        for user_id in (1, 2)
+    ]
+
+
+@pytest.fixture
+def small_project(mixer):
+    return mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='import', description='import',
+        full_amount=150, invested_amount=0, fully_invested=False,
+    )
+
+
+@pytest.mark.usefixtures('import_users')
+def test_import_donations_csv(superuser_client, small_project):
+    body = (
+        'full_amount,comment,user_id\n'
+        '100,"Первая строка\nвторая строка",2\n'
+        '-5,Отрицательная сумма,\n'
+        '200,,\n'
+    )
+    response = superuser_client.post(
+        IMPORT_URL, params={'chunk_size': 1}, data=body.encode(),
+        headers={'Content-Type': 'text/csv'},
+    )
+    assert response.status_code == 200, (
+        f'POST-запрос суперпользователя к `{IMPORT_URL}` с телом CSV '
+        'должен вернуть статус 200.'
+    )
+    summary = response.json()
+    errors = summary.pop('errors')
+    assert summary == {
+        'rows': 3,
+        'imported': 2,
+        'rejected': 1,
+        'chunks': 2,
+        'full_amount': 300,
+        'invested_amount': 150,
+        'fully_invested': 1,
+    }, 'Итоги импорта CSV отличаются от ожидаемых.'
+    assert [error['line'] for error in errors] == [4], (
+        'Ошибка должна указывать номер строки с некорректной записью.'
+    )
+    assert small_project.fully_invested, (
+        'Импортированные пожертвования должны инвестироваться '
+        'в открытые проекты.'
+    )
+
+    donations = superuser_client.get('/donation/').json()
+    assert [
+        (donation['full_amount'], donation['user_id'], donation.get('comment'))
+        for donation in donations
+    ] == [
+        (100, 2, 'Первая строка\nвторая строка'),
+        (200, 1, None),
+    ], (
+        'Пожертвования должны создаваться в порядке строк; без `user_id` - '
+        'на пользователя, выполнившего импорт.'
+    )
+
+
+@pytest.mark.usefixtures('import_users')
+def test_import_donations_ndjson_rejects_bad_rows(superuser_client):
+    body = '\n'.join([
+        json.dumps({'full_amount': 10}),
+        'not json',
+        json.dumps({'full_amount': 10, 'user_id': 42}),
+        json.dumps([10]),
+        '',
+    ])
+    summary = superuser_client.post(
+        IMPORT_URL, data=body.encode(),
+        headers={'Content-Type': 'application/x-ndjson'},
+    ).json()
+    assert (summary['imported'], summary['rejected']) == (1, 3), (
+        'Строки с некорректным JSON, неизвестным пользователем или не '
+        'объектом должны отклоняться, остальные - импортироваться.'
+    )
+    assert sorted(error['line'] for error in summary['errors']) == [2, 3, 4]
+
+
+def test_import_donations_unsupported_format(superuser_client):
+    response = superuser_client.post(
+        IMPORT_URL, data=b'{}', headers={'Content-Type': 'text/plain'}
+    )
+    assert response.status_code == 415, (
+        'Импорт в неподдерживаемом формате должен возвращать статус 415.'
+    )
+
+
+def test_import_donations_forbidden_for_user(user_client):
+    response = user_client.post(
+        IMPORT_URL, data=b'full_amount\n10\n',
+        headers={'Content-Type': 'text/csv'},
+    )
+    assert response.status_code == 403, (
+        'Импорт пожертвований должен быть доступен только суперпользователю.'
+    )
@@ -1,4 +1,9 @@
+import asyncio
+from datetime import datetime
+
 import pytest
+from conftest import TestingSessionLocal, donate
+from freezegun import freeze_time
 
 DONATION_URL = '/donation/'
 PROJECTS_URL = '/charity_project/'
@@ -60,3 +65,338 @@ def test_donation_to_little_invest_project(
     )
     assert not charity_project_nunchaku.fully_invested, common_asser_msg
     assert charity_project_nunchaku.invested_amount == 0, common_asser_msg
+
+
+@pytest.mark.parametrize('investing_engine', ['orm', 'sql'])
+def test_investing_engines_fill_projects_in_fifo_order(
+        monkeypatch, investing_engine, user_client,
+        charity_project_little_invested, charity_project_nunchaku,
+        small_fully_charity_project
+):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, 'investing_engine', investing_engine)
+    common_asser_msg = (
+        'Пожертвование должно закрыть первый открытый проект и частично '
+        'инвестироваться во второй независимо от движка инвестирования.'
+    )
+    response = user_client.post(DONATION_URL, json={'full_amount': 1000900})
+    assert response.status_code == 200, common_asser_msg
+    assert charity_project_little_invested.fully_invested, common_asser_msg
+    assert charity_project_little_invested.close_date, common_asser_msg
+    assert charity_project_little_invested.invested_amount == 1000000, (
+        common_asser_msg
+    )
+    assert not charity_project_nunchaku.fully_invested, common_asser_msg
+    assert charity_project_nunchaku.invested_amount == 1000, common_asser_msg
+    assert small_fully_charity_project.invested_amount == 0, common_asser_msg
+
+
+@pytest.mark.parametrize('investing_engine', ['orm', 'sql'])
+def test_investing_engines_close_new_project(
+        monkeypatch, investing_engine, superuser_client,
+        donation, another_donation
+):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, 'investing_engine', investing_engine)
+    common_asser_msg = (
+        'Новый проект должен собрать средства из открытых пожертвований '
+        'в порядке их создания и закрыться, если средств достаточно.'
+    )
+    response = superuser_client.post(PROJECTS_URL, json={
+        'name': 'Корм для котиков',
+        'description': 'Хватит всем',
+        'full_amount': 1100,
+    })
+    data = response.json()
+    assert data['invested_amount'] == 1100, common_asser_msg
+    assert data['fully_invested'], common_asser_msg
+    assert 'close_date' in data, common_asser_msg
+    assert donation.fully_invested, common_asser_msg
+    assert not another_donation.fully_invested, common_asser_msg
+    assert another_donation.invested_amount == 1000, common_asser_msg
+
+
+def test_open_projects_are_read_until_donation_is_covered(
+        monkeypatch, mixer, user_client, charity_project_little_invested,
+        charity_project_nunchaku
+):
+    from app.core.config import settings
+    from app.repositories.charity_project import charity_project_crud
+
+    last_project = mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='last',
+        description='Opened last',
+        full_amount=100,
+        create_date=datetime.now(),
+    )
+    monkeypatch.setattr(settings, 'open_objects_page_size', 1)
+    loaded_pages = []
+    get_open_objects = charity_project_crud.get_open_objects
+
+    async def spy_get_open_objects(*args, **kwargs):
+        page = await get_open_objects(*args, **kwargs)
+        loaded_pages.append(page)
+        return page
+
+    monkeypatch.setattr(
+        charity_project_crud, 'get_open_objects', spy_get_open_objects
+    )
+    user_client.post(DONATION_URL, json={'full_amount': 1000000})
+    assert len(loaded_pages) == 2, (
+        'Открытые проекты должны читаться страницами до тех пор, '
+        'пока пожертвование не будет полностью распределено.'
+    )
+    assert charity_project_little_invested.fully_invested
+    assert charity_project_nunchaku.invested_amount == 100
+    assert last_project.invested_amount == 0
+
+
+async def test_parallel_donations_do_not_lose_updates(mixer):
+    project = mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='parallel',
+        description='Parallel donations',
+        full_amount=1000,
+        invested_amount=0,
+        fully_invested=False,
+        create_date=datetime.now(),
+    )
+
+    donations = await asyncio.gather(*(donate(300) for _ in range(5)))
+    common_asser_msg = (
+        'Параллельные пожертвования должны распределяться по очереди: '
+        'сумма, внесённая в проект, должна совпадать с суммой, '
+        'распределённой из пожертвований.'
+    )
+    assert project.invested_amount == 1000, common_asser_msg
+    assert project.fully_invested, common_asser_msg
+    assert sum(
+        donation.invested_amount for donation in donations
+    ) == 1000, common_asser_msg
+
+
+async def test_batched_donations_are_invested_in_one_commit(
+        mixer, monkeypatch
+):
+    from app.models.user import User
+    from app.repositories.donation import donation_crud
+    from app.schemas.donation import DonationCreate
+    from app.services.donation_batcher import DonationBatcher
+
+    project = mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='batched',
+        description='Batched donations',
+        full_amount=1000,
+        invested_amount=0,
+        fully_invested=False,
+        create_date=datetime.now(),
+    )
+    batch_sizes = []
+    create_and_invest_many = donation_crud.create_and_invest_many
+
+    async def spy_create_and_invest_many(**kwargs):
+        batch_sizes.append(len(kwargs['objs_in']))
+        return await create_and_invest_many(**kwargs)
+
+    monkeypatch.setattr(
+        donation_crud, 'create_and_invest_many', spy_create_and_invest_many
+    )
+    batcher = DonationBatcher(
+        TestingSessionLocal, max_batch_size=10, max_delay=0.05
+    )
+    try:
+        donations = await asyncio.gather(*(
+            batcher.submit(DonationCreate(full_amount=300), User(id=2))
+            for _ in range(5)
+        ))
+    finally:
+        await batcher.stop()
+    assert batch_sizes == [5], (
+        'Одновременные пожертвования должны записываться одной пачкой.'
+    )
+    assert [donation.invested_amount for donation in donations] == [
+        300, 300, 300, 100, 0
+    ], 'Пачка пожертвований должна распределяться в порядке поступления.'
+    assert all(donation.id for donation in donations)
+    assert project.invested_amount == 1000
+    assert project.fully_invested
+
+
+@pytest.mark.parametrize('investing_engine', ['orm', 'sql'])
+def test_donation_allocations_are_recorded(
+        monkeypatch, investing_engine, user_client,
+        charity_project_little_invested, charity_project_nunchaku
+):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, 'investing_engine', investing_engine)
+    remaining = (
+        charity_project_little_invested.full_amount -
+        charity_project_little_invested.invested_amount
+    )
+    donation = user_client.post(
+        DONATION_URL, json={'full_amount': remaining + 900}
+    ).json()
+    response = user_client.get(f'{DONATION_URL}{donation["id"]}/allocations')
+    assert response.status_code == 200, (
+        'GET-запрос владельца пожертвования к эндпоинту '
+        '`/donation/{donation_id}/allocations` должен вернуть статус 200.'
+    )
+    allocations = [
+        (allocation['project_id'], allocation['amount'])
+        for allocation in response.json()
+    ]
+    assert allocations == [
+        (charity_project_little_invested.id, remaining),
+        (charity_project_nunchaku.id, 900),
+    ], (
+        'Распределение пожертвования должно перечислять проекты в порядке '
+        'инвестирования с внесёнными в них суммами.'
+    )
+
+
+@pytest.mark.usefixtures('another_donation')
+def test_donation_allocations_of_another_user(user_client):
+    response = user_client.get(f'{DONATION_URL}1/allocations')
+    assert response.status_code == 404, (
+        'Распределение чужого пожертвования должно быть недоступно '
+        'обычному пользователю.'
+    )
+
+
+@pytest.mark.parametrize('investing_engine', ['orm', 'sql'])
+def test_project_allocations_are_paginated(
+        monkeypatch, investing_engine, superuser_client,
+        donation, another_donation
+):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, 'investing_engine', investing_engine)
+    project = superuser_client.post(PROJECTS_URL, json={
+        'name': 'Allocations',
+        'description': 'Allocations',
+        'full_amount': 1500,
+    }).json()
+    url = f'{PROJECTS_URL}{project["id"]}/allocations'
+    first_page = superuser_client.get(url, params={'limit': 1}).json()
+    second_page = superuser_client.get(
+        url, params={'limit': 1, 'after': first_page[0]['id']}
+    ).json()
+    last_page = superuser_client.get(
+        url, params={'limit': 1, 'after': second_page[0]['id']}
+    ).json()
+    assert [
+        (allocation['donation_id'], allocation['amount'])
+        for allocation in first_page + second_page
+    ] == [(donation.id, 100), (another_donation.id, 1400)], (
+        'Распределения проекта должны возвращаться страницами по `limit` '
+        'начиная после записи `after`.'
+    )
+    assert last_page == [], (
+        'После последнего распределения должна возвращаться пустая страница.'
+    )
+
+
+@pytest.mark.parametrize('investing_engine', ['orm', 'sql'])
+async def test_report_orders_projects_by_close_duration(
+        monkeypatch, investing_engine, freezer, mixer
+):
+    from app.core.config import settings
+    from app.repositories.charity_project import charity_project_crud
+
+    monkeypatch.setattr(settings, 'investing_engine', investing_engine)
+    projects = [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=name, description='Описание', full_amount=100,
+            invested_amount=0, fully_invested=False,
+            create_date=datetime(2010, 10, 10, hour),
+        )
+        for name, hour in (('Долгий', 0), ('Средний', 1), ('Быстрый', 2))
+    ]
+
+    freezer.move_to('2010-10-10 03:00:00')
+    await donate(150)
+    freezer.move_to('2010-10-10 03:30:00')
+    await donate(150)
+    async with TestingSessionLocal() as session:
+        report = await charity_project_crud.get_projects_by_completion_rate(
+            session
+        )
+        top = await charity_project_crud.get_projects_by_completion_rate(
+            session, limit=1
+        )
+    assert [
+        (project.name, project.close_duration_seconds) for project in report
+    ] == [('Быстрый', 5400), ('Средний', 9000), ('Долгий', 10800)], (
+        'Закрытые проекты должны получать время сбора при закрытии, '
+        'а отчёт - выводить их от самых быстро собранных.'
+    )
+    assert [project.id for project in top] == [projects[2].id], (
+        'Отчёт должен возвращать не больше `limit` проектов.'
+    )
+
+
+@pytest.mark.parametrize('investing_engine', ['orm', 'sql'])
+async def test_close_duration_uses_utc_dates(
+        monkeypatch, investing_engine, mixer
+):
+    from app.core.config import settings
+    from app.models.user import User
+    from app.repositories.charity_project import charity_project_crud
+    from app.repositories.donation import donation_crud
+    from app.schemas.donation import DonationCreate
+
+    monkeypatch.setattr(settings, 'investing_engine', investing_engine)
+    # Местное время сервера на три часа впереди UTC.
+    with freeze_time('2010-10-10 00:00:00', tz_offset=3) as frozen:
+        project = mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name='Проект', description='Описание', full_amount=100,
+            invested_amount=0, fully_invested=False,
+            create_date=datetime.utcnow(),
+        )
+        frozen.move_to('2010-10-10 00:01:00')
+        async with TestingSessionLocal() as session:
+            await donation_crud.create_and_invest(
+                session=session,
+                obj_in=DonationCreate(full_amount=100),
+                user=User(id=2),
+                opposite_crud=charity_project_crud,
+            )
+            project = await charity_project_crud.get(project.id, session)
+    assert project.close_date == datetime(2010, 10, 10, 0, 1)
+    assert project.close_duration_seconds == 60, (
+        'Даты создания и закрытия должны записываться по UTC, а время '
+        'сбора - не зависеть от часового пояса сервера.'
+    )
+
+
+async def test_reconcile_close_duration_uses_utc_dates(mixer):
+    from app.core.reconcile import reconcile
+    from app.models.charity_project import CharityProject
+
+    with freeze_time('2010-10-10 00:00:00', tz_offset=3) as frozen:
+        project = mixer.blend(
+            CharityProject, name='Проект', description='Описание',
+            full_amount=100, invested_amount=0, fully_invested=False,
+            create_date=datetime.utcnow(),
+        )
+        mixer.blend(
+            'app.models.donation.Donation', user_id=1, full_amount=100,
+            invested_amount=100, fully_invested=True,
+            create_date=datetime.utcnow(), close_date=datetime.utcnow(),
+            close_duration_seconds=0,
+        )
+        frozen.move_to('2010-10-10 00:01:00')
+        async with TestingSessionLocal() as session:
+            await reconcile(session, fix=True)
+        async with TestingSessionLocal() as session:
+            project = await session.get(CharityProject, project.id)
+    assert (project.fully_invested, project.close_duration_seconds) == (
+        True, 60
+    ), 'Сверка должна закрывать объект по UTC.'
@@ -0,0 +1,90 @@
+import pytest
+from conftest import (
+    TestingSessionLocal, create_project, donate, get_project
+)
+
+from app.core.config import settings
+from app.core.ledger import OpenPoolLedger, get_ledger, ledgers
+from app.models.charity_project import CharityProject
+from app.repositories.charity_project import charity_project_crud
+from app.schemas.charity_project import CharityProjectUpdate
+
+
+@pytest.fixture
+def investment_ledger(monkeypatch):
+    monkeypatch.setattr(settings, 'investment_ledger', True)
+    ledgers.clear()
+    yield
+    ledgers.clear()
+
+
+@pytest.fixture
+def open_pages(monkeypatch):
+    pages = []
+    get_open_objects = charity_project_crud.get_open_objects
+
+    async def spy_get_open_objects(*args, **kwargs):
+        page = await get_open_objects(*args, **kwargs)
+        pages.append(page)
+        return page
+
+    monkeypatch.setattr(
+        charity_project_crud, 'get_open_objects', spy_get_open_objects
+    )
+    return pages
+
+
+def test_ledger_plans_and_consumes_from_head():
+    ledger = OpenPoolLedger(CharityProject)
+    ledger.extend([(1, 100), (2, 0), (3, 50), (4, 70)])
+    assert ledger.plan(100) == [1], (
+        'Сумма, полностью покрывающая первый объект, не должна '
+        'затрагивать следующие.'
+    )
+    assert ledger.plan(120) == [1, 2, 3]
+    ledger.consume(120)
+    assert ledger.entries() == [(3, 30), (4, 70)], (
+        'Закрытые объекты должны уходить из головы очереди, '
+        'а граничный объект - уменьшать остаток.'
+    )
+
+
+@pytest.mark.usefixtures('investment_ledger')
+async def test_ledger_loads_only_touched_projects(open_pages):
+    first = await create_project('Первый', 100)
+    second = await create_project('Второй', 100)
+    third = await create_project('Третий', 100)
+
+    donation = await donate(150)
+    assert donation.fully_invested
+    assert not open_pages, (
+        'С очередью в памяти инвестирование не должно читать все '
+        'открытые проекты.'
+    )
+    assert get_ledger(CharityProject).entries() == [
+        (second.id, 50), (third.id, 100)
+    ]
+    assert (await get_project(first.id)).fully_invested
+    assert (await get_project(second.id)).invested_amount == 50
+    assert (await get_project(third.id)).invested_amount == 0
+
+
+@pytest.mark.usefixtures('investment_ledger')
+async def test_ledger_reloads_after_project_update(open_pages):
+    first = await create_project('Первый', 100)
+    second = await create_project('Второй', 100)
+    await donate(10)
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.get(first.id, session)
+        await charity_project_crud.update(
+            project, CharityProjectUpdate(full_amount=20), session
+        )
+    assert get_ledger(CharityProject).version is None, (
+        'После изменения проекта очередь открытых проектов должна '
+        'быть сброшена.'
+    )
+
+    await donate(30)
+    assert (await get_project(first.id)).fully_invested
+    assert (await get_project(second.id)).invested_amount == 20
+    assert get_ledger(CharityProject).entries() == [(second.id, 80)]
@@ -0,0 +1,135 @@
+import pytest
+from conftest import (
+    TestingSessionLocal, create_project, donate, get_project
+)
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.object_cache import cache_stats, object_caches
+from app.core.versions import bump_versions
+from app.models import CharityProject
+from app.repositories.charity_project import charity_project_crud
+from app.schemas.charity_project import CharityProjectUpdate
+
+
+@pytest.fixture(autouse=True)
+def object_cache(monkeypatch):
+    monkeypatch.setattr(settings, 'object_cache_size', 2)
+    object_caches.clear()
+    yield
+    object_caches.clear()
+
+
+async def test_repeated_get_reads_cache(project_selects):
+    project_id = (await create_project()).id
+    first = await get_project(project_id)
+    second = await get_project(project_id)
+    assert len(project_selects) == 1, (
+        'Повторное чтение объекта должно обслуживаться из кэша.'
+    )
+    assert (second.id, second.name, second.full_amount) == (
+        first.id, first.name, first.full_amount
+    ), 'Объект из кэша должен совпадать с прочитанным из базы данных.'
+    assert cache_stats()['charityproject'] == {
+        'size': 1, 'hits': 1, 'misses': 1,
+    }
+
+
+async def test_cached_object_can_be_updated():
+    project_id = (await create_project()).id
+    await get_project(project_id)
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.get(project_id, session)
+        await charity_project_crud.update(
+            project, CharityProjectUpdate(full_amount=300), session
+        )
+    project = await get_project(project_id)
+    assert project.full_amount == 300, (
+        'Обновление объекта должно удалять его из кэша.'
+    )
+
+
+async def test_investing_invalidates_cached_objects():
+    project_id = (await create_project()).id
+    await get_project(project_id)
+    await donate(40)
+    project = await get_project(project_id)
+    assert project.invested_amount == 40, (
+        'Инвестирование должно удалять изменённые объекты из кэша.'
+    )
+
+
+async def test_version_change_by_other_worker_clears_cache():
+    project_id = (await create_project()).id
+    await get_project(project_id)
+    async with TestingSessionLocal() as session:
+        # Другой процесс меняет строку и версию таблицы.
+        await session.execute(
+            update(CharityProject).where(
+                CharityProject.id == project_id
+            ).values(full_amount=500)
+        )
+        await bump_versions(session, [CharityProject])
+        await session.commit()
+    project = await get_project(project_id)
+    assert project.full_amount == 500, (
+        'Изменение версии таблицы другим процессом должно сбрасывать кэш.'
+    )
+
+
+async def test_cache_size_and_ttl(monkeypatch, project_selects):
+    project_ids = [
+        (await create_project(f'Проект {index}')).id for index in range(3)
+    ]
+    for project_id in project_ids:
+        await get_project(project_id)
+    assert cache_stats()['charityproject']['size'] == 2, (
+        'Размер кэша должен ограничиваться `object_cache_size`.'
+    )
+    await get_project(project_ids[0])
+    assert len(project_selects) == 4, (
+        'Давно не читавшийся объект должен вытесняться из кэша.'
+    )
+    object_caches[CharityProject].ttl = -1
+    await get_project(project_ids[1])
+    await get_project(project_ids[1])
+    assert len(project_selects) == 6, (
+        'Запись кэша с истёкшим временем жизни не должна использоваться.'
+    )
+
+
+async def test_cache_disabled_by_default(monkeypatch, project_selects):
+    monkeypatch.setattr(settings, 'object_cache_size', 0)
+    project_id = (await create_project()).id
+    await get_project(project_id)
+    await get_project(project_id)
+    assert len(project_selects) == 2 and not object_caches, (
+        'Без `object_cache_size` объекты не кэшируются.'
+    )
+
+
+async def test_project_closed_without_allocation_is_invalidated():
+    project_id = (await create_project()).id
+    await donate(50)
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.get(project_id, session)
+        assert await charity_project_crud.update_open(
+            project, CharityProjectUpdate(full_amount=50), session
+        )
+    assert not (await get_project(project_id)).fully_invested
+    await create_project('Второй проект')
+    # Пожертвование закрывает первый проект, не внося в него средств.
+    await donate(30)
+    project = await get_project(project_id)
+    assert project.fully_invested and project.close_date is not None, (
+        'Проект, закрытый без распределения средств, должен удаляться '
+        'из кэша.'
+    )
+
+
+def test_object_cache_stats_for_superuser(superuser_client):
+    response = superuser_client.get('/stats/cache')
+    assert response.status_code == 200
+    assert 'objects' in response.json(), (
+        'Статистика кэша должна содержать статистику кэша объектов.'
+    )
@@ -0,0 +1,251 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.schemas.charity_project import CharityProjectDB
+
+CREATE_DATE = datetime(2010, 10, 10)
+
+
+@pytest.fixture
+def projects(mixer):
+    # Одинаковая `create_date`: порядок страниц задаёт `id`.
+    return [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project-{index}',
+            description='Описание',
+            full_amount=100,
+            invested_amount=0,
+            fully_invested=False,
+            create_date=CREATE_DATE,
+        )
+        for index in range(5)
+    ]
+
+
+def read_pages(client, url, limit):
+    ids, after = [], None
+    while True:
+        params = {'limit': limit}
+        if after is not None:
+            params['after'] = after
+        response = client.get(url, params=params)
+        assert response.status_code == 200, (
+            f'GET-запрос к эндпоинту `{url}` со страницей должен вернуть '
+            'статус-код 200.'
+        )
+        page = response.json()
+        assert len(page['items']) <= limit, (
+            'Страница не должна содержать больше `limit` объектов.'
+        )
+        ids.extend(item['id'] for item in page['items'])
+        after = page.get('next_cursor')
+        if after is None:
+            return ids
+
+
+def test_cursor_roundtrip():
+    key = (datetime(2010, 10, 10, 12, 30, 15, 123456), 42)
+    assert decode_cursor(encode_cursor(*key)) == key, (
+        'Курсор должен раскодироваться в исходный ключ страницы.'
+    )
+
+
+def test_projects_pages_with_equal_create_date(user_client, projects):
+    ids = read_pages(user_client, '/charity_project/', limit=2)
+    assert ids == sorted(project.id for project in projects), (
+        'Страницы проектов должны вернуть каждый проект ровно один раз '
+        'в порядке `create_date` и `id`.'
+    )
+
+
+def test_last_page_without_next_cursor(user_client, projects):
+    response = user_client.get('/charity_project/', params={'limit': 5})
+    assert 'next_cursor' not in response.json(), (
+        'На последней странице не должно быть `next_cursor`.'
+    )
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'W10', '!!'])
+def test_invalid_cursor(user_client, cursor):
+    response = user_client.get(
+        '/charity_project/', params={'after': cursor}
+    )
+    assert response.status_code == 400, (
+        'Некорректный курсор страницы должен возвращать статус-код 400.'
+    )
+
+
+def test_legacy_list_response(user_client, projects):
+    response = user_client.get('/charity_project/')
+    assert isinstance(response.json(), list), (
+        'Без `limit` и `after` эндпоинт должен возвращать список '
+        'при включённом `legacy_list_responses`.'
+    )
+
+
+def test_page_response_without_legacy_flag(
+        monkeypatch, user_client, projects
+):
+    monkeypatch.setattr(settings, 'legacy_list_responses', False)
+    monkeypatch.setattr(settings, 'default_page_size', 3)
+    page = user_client.get('/charity_project/').json()
+    assert len(page['items']) == 3 and page['next_cursor'], (
+        'При выключенном `legacy_list_responses` эндпоинт должен '
+        'возвращать страницу размера `default_page_size`.'
+    )
+
+
+def test_my_donations_pages(user_client, mixer):
+    users = {
+        user_id: mixer.blend('app.models.user.User', id=user_id)
+        for user_id in (1, 2)
+    }
+    donations = {
+        user_id: [
+            mixer.blend(
+                'app.models.donation.Donation',
+                user=user,
+                full_amount=100,
+                invested_amount=0,
+                fully_invested=False,
+                create_date=CREATE_DATE,
+            ).id
+            for _ in range(3)
+        ]
+        for user_id, user in users.items()
+    }
+    ids = read_pages(user_client, '/donation/my', limit=2)
+    assert ids == donations[2], (
+        'Страницы `/donation/my` должны содержать только пожертвования '
+        'текущего пользователя.'
+    )
+
+
+def test_all_donations_pages(superuser_client, mixer):
+    mixer.blend('app.models.user.User', id=2)
+    donation_ids = [
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=2,
+            full_amount=100,
+            invested_amount=0,
+            fully_invested=False,
+        ).id
+        for _ in range(3)
+    ]
+    assert read_pages(superuser_client, '/donation/', limit=1) == (
+        donation_ids
+    ), 'Страницы всех пожертвований должны вернуть каждое ровно один раз.'
+
+
+def read_ndjson(client, url, **params):
+    response = client.get(
+        url, params=params, headers={'Accept': 'application/x-ndjson'}
+    )
+    assert response.status_code == 200, (
+        f'GET-запрос к эндпоинту `{url}` с `Accept: application/x-ndjson` '
+        'должен вернуть статус-код 200.'
+    )
+    assert response.headers['content-type'].startswith(
+        'application/x-ndjson'
+    ), 'Поток должен отдаваться с типом `application/x-ndjson`.'
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_projects_ndjson_stream(monkeypatch, user_client, projects):
+    monkeypatch.setattr(settings, 'list_stream_partition_size', 2)
+    rows = read_ndjson(user_client, '/charity_project/')
+    assert [row['id'] for row in rows] == [
+        project.id for project in projects
+    ], (
+        'Поток NDJSON должен содержать все проекты в порядке '
+        '`create_date` и `id`.'
+    )
+    assert rows[0]['name'] == projects[0].name, (
+        'Строки потока должны сериализоваться схемой ответа эндпоинта.'
+    )
+
+
+def test_ndjson_stream_resumes_after_cursor(user_client, projects):
+    cursor = encode_cursor(CREATE_DATE, projects[2].id)
+    rows = read_ndjson(user_client, '/charity_project/', after=cursor)
+    assert [row['id'] for row in rows] == [
+        project.id for project in projects[3:]
+    ], 'Поток с `after` должен начинаться после объекта курсора.'
+
+
+def test_my_donations_ndjson_stream(user_client, mixer):
+    user = mixer.blend('app.models.user.User', id=2)
+    mixer.blend('app.models.user.User', id=1)
+    donation = mixer.blend(
+        'app.models.donation.Donation',
+        user=user,
+        full_amount=100,
+        invested_amount=0,
+        fully_invested=False,
+    )
+    rows = read_ndjson(user_client, '/donation/my')
+    assert [row['id'] for row in rows] == [donation.id], (
+        'Поток `/donation/my` должен содержать только пожертвования '
+        'текущего пользователя.'
+    )
+    assert 'user_id' not in rows[0], (
+        'Поток `/donation/my` не должен раскрывать служебные поля.'
+    )
+
+
+@pytest.mark.parametrize('params', [{}, {'limit': 10}])
+def test_rows_match_schema_serialization(
+        user_client, projects, mixer, params
+):
+    projects.append(mixer.blend(
+        'app.models.charity_project.CharityProject',
+        description='Описание',
+        full_amount=100,
+        invested_amount=100,
+        fully_invested=True,
+        create_date=CREATE_DATE,
+        close_date=datetime(2010, 10, 11, 12, 30, 15, 123456),
+    ))
+    response = user_client.get('/charity_project/', params=params).json()
+    items = response if isinstance(response, list) else response['items']
+    expected = [
+        json.loads(CharityProjectDB.from_orm(project).json(exclude_none=True))
+        for project in projects
+    ]
+    assert items == expected, (
+        'Объекты, собранные из строк, должны совпадать с сериализацией '
+        'схемой `CharityProjectDB`.'
+    )
+
+
+@pytest.mark.parametrize('headers', [{}, {'Accept': 'application/x-ndjson'}])
+def test_sparse_fieldset(user_client, projects, headers):
+    response = user_client.get(
+        '/charity_project/',
+        params={'fields': 'id,name', 'limit': 2},
+        headers=headers,
+    )
+    rows = (
+        response.json()['items'] if not headers
+        else [json.loads(line) for line in response.text.splitlines()]
+    )
+    assert rows and all(set(row) == {'id', 'name'} for row in rows), (
+        'Параметр `fields` должен оставлять в объектах только '
+        'перечисленные поля.'
+    )
+
+
+def test_unknown_field(user_client):
+    response = user_client.get(
+        '/donation/my', params={'fields': 'id,user_id'}
+    )
+    assert response.status_code == 400, (
+        'Поле, которого нет в схеме ответа, в `fields` должно '
+        'возвращать статус-код 400.'
+    )
@@ -0,0 +1,196 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+from conftest import TEST_DB, TestingSessionLocal
+
+from app.models.user import User
+from app.repositories.charity_project import charity_project_crud
+from app.repositories.donation import donation_crud
+from app.schemas.charity_project import (
+    CharityProjectCreate, CharityProjectUpdate
+)
+
+
+def explain(statement, parameters):
+    with sqlite3.connect(TEST_DB) as connection:
+        plan = connection.execute(
+            f'EXPLAIN QUERY PLAN {statement}', parameters
+        ).fetchall()
+    return ' '.join(row[-1] for row in plan)
+
+
+@pytest.mark.parametrize('crud, index_name', [
+    (charity_project_crud, 'ix_charityproject_open_create_date_id'),
+    (donation_crud, 'ix_donation_open_create_date_id'),
+])
+async def test_open_objects_query_uses_partial_index(
+        executed_statements, crud, index_name
+):
+    async with TestingSessionLocal() as session:
+        await crud.get_open_objects(session, limit=10)
+    plan = explain(*executed_statements[-1])
+    assert index_name in plan, (
+        'Запрос открытых объектов должен использовать частичный индекс '
+        f'`{index_name}`, план запроса: {plan}'
+    )
+    assert 'TEMP B-TREE' not in plan, (
+        'Открытые объекты должны читаться в порядке индекса без '
+        f'дополнительной сортировки, план запроса: {plan}'
+    )
+
+
+async def test_donations_by_user_query_uses_index(executed_statements):
+    async with TestingSessionLocal() as session:
+        await donation_crud.get_by_user(session, User(id=1))
+    plan = explain(*executed_statements[-1])
+    assert 'ix_donation_user_id' in plan, (
+        'Запрос пожертвований пользователя должен использовать индекс '
+        f'`ix_donation_user_id`, план запроса: {plan}'
+    )
+
+
+async def test_project_by_name_query_uses_unique_index(executed_statements):
+    async with TestingSessionLocal() as session:
+        await charity_project_crud.get_one_by_attributes(
+            session, name='name'
+        )
+    plan = explain(*executed_statements[-1])
+    assert 'sqlite_autoindex_charityproject' in plan, (
+        'Поиск проекта по имени должен использовать уникальный индекс, '
+        f'план запроса: {plan}'
+    )
+
+
+async def test_closed_projects_query_uses_partial_index(
+        executed_statements
+):
+    async with TestingSessionLocal() as session:
+        await charity_project_crud.get_closed_projects_count(session)
+    plan = explain(*executed_statements[-1])
+    assert 'ix_charityproject_closed_close_duration' in plan, (
+        'Запрос закрытых проектов должен использовать частичный индекс '
+        f'`ix_charityproject_closed_close_duration`, план запроса: {plan}'
+    )
+
+
+@pytest.mark.parametrize('limit', [None, 10])
+async def test_completion_rate_query_uses_index(executed_statements, limit):
+    async with TestingSessionLocal() as session:
+        await charity_project_crud.get_projects_by_completion_rate(
+            session, limit
+        )
+    plan = explain(*executed_statements[-1])
+    assert 'ix_charityproject_closed_close_duration' in plan, (
+        'Отчёт должен читать закрытые проекты по частичному индексу '
+        f'`ix_charityproject_closed_close_duration`, план запроса: {plan}'
+    )
+    assert 'TEMP B-TREE' not in plan, (
+        'Проекты отчёта должны читаться в порядке индекса без '
+        f'дополнительной сортировки, план запроса: {plan}'
+    )
+
+
+@pytest.mark.parametrize('crud, filters, index_name', [
+    (charity_project_crud, {}, 'ix_charityproject_create_date_id'),
+    (donation_crud, {}, 'ix_donation_create_date_id'),
+    (
+        donation_crud, {'user_id': 1},
+        'ix_donation_user_id_create_date_id',
+    ),
+])
+async def test_page_query_uses_index(
+        executed_statements, crud, filters, index_name
+):
+    async with TestingSessionLocal() as session:
+        await crud.get_page(session, after=(datetime.now(), 1), **filters)
+    plan = explain(*executed_statements[-1])
+    assert index_name in plan, (
+        f'Запрос страницы должен использовать индекс `{index_name}`, '
+        f'план запроса: {plan}'
+    )
+    assert 'TEMP B-TREE' not in plan, (
+        'Страница должна читаться в порядке индекса без дополнительной '
+        f'сортировки, план запроса: {plan}'
+    )
+
+
+async def test_writes_do_not_reread_objects(executed_statements):
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.create_and_invest(
+            session=session,
+            obj_in=CharityProjectCreate(
+                name='Проект', description='Описание', full_amount=100
+            ),
+            opposite_crud=donation_crud,
+        )
+        await charity_project_crud.update(
+            project, CharityProjectUpdate(full_amount=200), session
+        )
+        statements_count = len(executed_statements)
+        await charity_project_crud.update(
+            project, CharityProjectUpdate(full_amount=200), session
+        )
+        assert (project.full_amount, project.close_date) == (200, None)
+    assert len(executed_statements) == statements_count, (
+        'Обновление без изменённых полей не должно обращаться к базе '
+        'данных.'
+    )
+    rereads = [
+        statement for statement, _ in executed_statements
+        if statement.startswith('SELECT charityproject.')
+    ]
+    assert not rereads, (
+        'После создания и обновления проект не должен перечитываться '
+        f'из базы данных: {rereads}'
+    )
+    updates = [
+        statement for statement, _ in executed_statements
+        if statement.startswith('UPDATE charityproject')
+    ]
+    assert updates == [
+        'UPDATE charityproject SET full_amount=? '
+        'WHERE charityproject.id = ?'
+    ], 'Обновление должно записывать только изменённые колонки.'
+
+
+async def test_project_name_is_not_looked_up_before_write(
+        superuser_client, executed_statements
+):
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'Проект', 'description': 'Описание', 'full_amount': 100,
+    })
+    superuser_client.patch(
+        f'/charity_project/{response.json()["id"]}', json={'name': 'Новый'}
+    )
+    lookups = [
+        statement for statement, _ in executed_statements
+        if statement.startswith('SELECT') and
+        'charityproject.name =' in statement
+    ]
+    assert not lookups, (
+        'Уникальность названия проекта должна проверяться индексом при '
+        f'записи, а не отдельным запросом: {lookups}'
+    )
+
+
+async def test_conditional_delete_uses_primary_key(executed_statements):
+    async with TestingSessionLocal() as session:
+        project = await charity_project_crud.create_and_invest(
+            session=session,
+            obj_in=CharityProjectCreate(
+                name='Проект', description='Описание', full_amount=100
+            ),
+            opposite_crud=donation_crud,
+        )
+        await charity_project_crud.remove_uninvested([project], session)
+    statement, parameters = next(
+        (statement, parameters)
+        for statement, parameters in executed_statements
+        if statement.startswith('DELETE FROM charityproject')
+    )
+    plan = explain(statement, parameters)
+    assert 'INTEGER PRIMARY KEY' in plan, (
+        'Условное удаление проектов должно искать строки по первичному '
+        f'ключу, план запроса: {plan}'
+    )
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import update
+
+from app.core.reconcile import reconcile, replay_chunk
+from app.models.donation import Donation
+
+PROJECTS_URL = '/charity_project/'
+
+
+def test_replay_chunk_fills_queue_prefix():
+    full_amount = np.array([30, 40, 50, 60])
+    assert replay_chunk(full_amount, 0, 100).tolist() == [30, 40, 30, 0], (
+        'Повтор распределения должен заполнять очередь с начала: '
+        'объекты до границы целиком, граничный - частично.'
+    )
+    assert replay_chunk(full_amount, 100, 150).tolist() == [30, 20, 0, 0], (
+        'Повтор распределения должен учитывать сумму предыдущих '
+        'фрагментов очереди.'
+    )
+    assert replay_chunk(full_amount, 500, 150).tolist() == [0, 0, 0, 0], (
+        'Объекты после распределённой суммы не должны получать средств.'
+    )
+
+
+@pytest.mark.parametrize('chunk_size', [1, 1000])
+async def test_reconcile_finds_and_fixes_divergent_rows(
+        chunk_size, superuser_client, donation, another_donation
+):
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'Reconcile',
+        'description': 'Reconcile',
+        'full_amount': 1500,
+    })
+    async with TestingSessionLocal() as session:
+        reports = await reconcile(session, chunk_size=chunk_size)
+    assert [len(report.ids) for report in reports] == [0, 0], (
+        'После инвестирования через API сверка не должна находить '
+        'расхождений.'
+    )
+
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            update(Donation).where(
+                Donation.id == another_donation.id
+            ).values(invested_amount=1000)
+        )
+        await session.commit()
+    async with TestingSessionLocal() as session:
+        _, donation_report = await reconcile(
+            session, fix=True, chunk_size=chunk_size
+        )
+    assert donation_report.ids.tolist() == [another_donation.id], (
+        'Сверка должна найти пожертвование с неверной суммой '
+        '`invested_amount`.'
+    )
+    assert donation_report.expected_amount.tolist() == [1400], (
+        'Сверка должна вычислить сумму, внесённую при распределении по FIFO.'
+    )
+
+    async with TestingSessionLocal() as session:
+        reports = await reconcile(session, chunk_size=chunk_size)
+        fixed_donation = await session.get(Donation, another_donation.id)
+    assert [len(report.ids) for report in reports] == [0, 0], (
+        'После исправления сверка не должна находить расхождений.'
+    )
+    assert fixed_donation.invested_amount == 1400, (
+        'Исправление должно записать ожидаемую сумму `invested_amount`.'
+    )
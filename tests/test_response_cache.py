@@ -0,0 +1,170 @@
+import asyncio
+
+import httpx
+from conftest import TestingSessionLocal, app
+
+from app.api.response_cache import ResponseCache, response_caches
+from app.core.versions import bump_versions
+from app.models import CharityProject
+from app.repositories.charity_project import charity_project_crud
+
+PROJECT = {'name': 'Проект', 'description': 'Описание', 'full_amount': 100}
+
+
+def test_projects_list_is_served_from_cache(superuser_client, project_selects):
+    superuser_client.post('/charity_project/', json=PROJECT)
+    first = superuser_client.get('/charity_project/')
+    project_selects.clear()
+    second = superuser_client.get('/charity_project/')
+    assert second.content == first.content, (
+        'Ответ из кэша должен совпадать с построенным ответом.'
+    )
+    assert second.headers['etag'] == first.headers['etag']
+    assert not project_selects, (
+        'Ответ из кэша должен возвращаться без чтения проектов.'
+    )
+    stats = superuser_client.get('/stats/cache').json()
+    assert stats['responses']['charity_project_list']['hits'] == 1, (
+        'Попадание в кэш ответов должно учитываться в статистике.'
+    )
+
+    superuser_client.post(
+        '/charity_project/', json={**PROJECT, 'name': 'Второй проект'}
+    )
+    response = superuser_client.get('/charity_project/')
+    assert len(response.json()) == 2, (
+        'Запись в таблицу проектов должна сбрасывать кэш ответов.'
+    )
+
+
+def test_query_parameters_are_part_of_cache_key(superuser_client):
+    for name in ('Первый', 'Второй'):
+        superuser_client.post(
+            '/charity_project/', json={**PROJECT, 'name': name}
+        )
+    page = superuser_client.get('/charity_project/', params={'limit': 1})
+    full_list = superuser_client.get('/charity_project/')
+    assert len(page.json()['items']) == 1
+    assert len(full_list.json()) == 2, (
+        'Ответы с разными параметрами запроса должны кэшироваться '
+        'отдельно.'
+    )
+
+
+async def test_version_bump_by_other_process_drops_cache(
+        superuser_client, mixer
+):
+    superuser_client.post('/charity_project/', json=PROJECT)
+    superuser_client.get('/charity_project/')
+    # Другой процесс пишет в таблицу и увеличивает её версию.
+    mixer.blend(
+        CharityProject, name='Чужой проект', description='Описание',
+        full_amount=100, invested_amount=0, fully_invested=False,
+    )
+    async with TestingSessionLocal() as session:
+        await bump_versions(session, [CharityProject])
+        await session.commit()
+    response = superuser_client.get('/charity_project/')
+    assert len(response.json()) == 2, (
+        'Изменение версии таблицы другим процессом должно сбрасывать '
+        'кэш ответов.'
+    )
+
+
+async def test_concurrent_misses_build_once():
+    cache = ResponseCache(max_entries=10, max_bytes=1024)
+    builds = []
+
+    async def build():
+        builds.append(1)
+        await asyncio.sleep(0.01)
+        return b'[]'
+
+    bodies = await asyncio.gather(*(
+        cache.get_or_build('/', '"v1"', build) for _ in range(10)
+    ))
+    assert bodies == [b'[]'] * 10
+    assert len(builds) == 1, (
+        'Одновременные промахи по одному ключу должны строить ответ '
+        'один раз.'
+    )
+    assert (cache.misses, cache.coalesced) == (1, 9)
+
+
+async def test_cache_size_limits():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+
+    async def build_body(body):
+        return body
+
+    for key in ('a', 'b', 'c'):
+        await cache.get_or_build(key, '"v1"', lambda: build_body(b'1234'))
+    assert len(cache) == 2 and cache.evictions == 1, (
+        'Кэш не должен хранить больше `max_entries` ответов.'
+    )
+    await cache.get_or_build('d', '"v1"', lambda: build_body(b'12345678'))
+    assert cache.size <= 10, (
+        'Суммарный размер ответов не должен превышать `max_bytes`.'
+    )
+    await cache.get_or_build('e', '"v1"', lambda: build_body(b'x' * 11))
+    assert 'e' not in cache._entries, (
+        'Ответ больше `max_bytes` не должен попадать в кэш.'
+    )
+    await cache.get_or_build('d', '"v2"', lambda: build_body(b'[]'))
+    assert cache.size == 2 and len(cache) == 1, (
+        'Новая версия данных должна сбрасывать кэш.'
+    )
+
+
+def test_cache_stats_for_superuser_only(user_client):
+    assert user_client.get('/stats/cache').status_code == 403, (
+        'Статистика кэша ответов должна быть доступна только '
+        'суперпользователю.'
+    )
+
+
+async def test_body_built_across_version_change_is_not_stored():
+    cache = ResponseCache(max_entries=10, max_bytes=1024)
+
+    async def build():
+        return b'[]'
+
+    async def current_etag():
+        return '"v2"'
+
+    await cache.get_or_build('/', '"v1"', build, current_etag)
+    assert not len(cache), (
+        'Ответ, во время построения которого изменилась версия данных, '
+        'не должен попадать в кэш.'
+    )
+
+
+async def test_write_during_build_is_not_cached(
+        superuser_client, monkeypatch
+):
+    started, release = asyncio.Event(), asyncio.Event()
+    read_page = charity_project_crud.read_page
+
+    async def paused_read_page(*args, **kwargs):
+        rows = await read_page(*args, **kwargs)
+        if not started.is_set():
+            started.set()
+            await release.wait()
+        return rows
+
+    monkeypatch.setattr(charity_project_crud, 'read_page', paused_read_page)
+    async with httpx.AsyncClient(app=app, base_url='http://test') as client:
+        await client.post('/charity_project/', json=PROJECT)
+        first = asyncio.create_task(client.get('/charity_project/'))
+        await started.wait()
+        await client.post(
+            '/charity_project/', json={**PROJECT, 'name': 'Новый проект'}
+        )
+        release.set()
+        await first
+        assert not len(response_caches['charity_project_list']), (
+            'Ответ, во время построения которого записали проект, '
+            'не должен попадать в кэш.'
+        )
+        response = await client.get('/charity_project/')
+    assert len(response.json()) == 2
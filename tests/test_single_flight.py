@@ -0,0 +1,156 @@
+import asyncio
+
+import httpx
+import pytest
+from conftest import TestingSessionLocal, app
+
+from app.core.single_flight import SingleFlight, query_flights
+from app.repositories.charity_project import charity_project_crud
+
+COLUMNS = ['id', 'name', 'full_amount']
+PROJECT = {'name': 'Проект', 'description': 'Описание', 'full_amount': 100}
+
+
+@pytest.fixture(autouse=True)
+def clear_query_flights():
+    query_flights.clear()
+
+
+async def read_page(coalesce_version='"v1"', **filters):
+    async with TestingSessionLocal() as session:
+        return await charity_project_crud.get_page(
+            session, limit=2, columns=COLUMNS,
+            coalesce_version=coalesce_version, **filters
+        )
+
+
+@pytest.mark.usefixtures('charity_project', 'charity_project_nunchaku')
+async def test_concurrent_page_reads_run_one_query(project_selects):
+    pages = await asyncio.gather(*(read_page() for _ in range(5)))
+    assert len(project_selects) == 1, (
+        'Одновременные одинаковые чтения страницы должны выполняться '
+        'одним запросом.'
+    )
+    assert all(page == pages[0] for page in pages), (
+        'Все объединённые вызовы должны получить один результат.'
+    )
+    assert len(pages[0][0]) == 2
+    [stats] = query_flights.stats().values()
+    assert stats == {'calls': 5, 'executed': 1, 'coalesced': 4}, (
+        'Статистика должна учитывать объединённые вызовы.'
+    )
+
+
+async def test_different_or_uncoalesced_reads_are_not_shared(
+        project_selects
+):
+    await asyncio.gather(
+        read_page(),
+        read_page(fully_invested=False),
+        read_page(coalesce_version='"v2"'),
+        read_page(coalesce_version=None),
+        read_page(coalesce_version=None),
+    )
+    assert len(project_selects) == 5, (
+        'Разные запросы, чтения при разных версиях и чтения без '
+        '`coalesce_version` не должны объединяться.'
+    )
+
+
+async def test_sequential_reads_are_not_cached(project_selects):
+    await read_page()
+    await read_page()
+    assert len(project_selects) == 2, (
+        'Завершённый запрос не должен отдаваться следующим вызовам.'
+    )
+
+
+async def test_single_flight_shares_errors_and_retries_cancelled():
+    flights = SingleFlight()
+    started = asyncio.Event()
+
+    async def fail():
+        started.set()
+        await asyncio.sleep(0.01)
+        raise ValueError('сбой')
+
+    leader = asyncio.create_task(flights.run('key', fail))
+    await started.wait()
+    with pytest.raises(ValueError):
+        await flights.run('key', fail)
+    with pytest.raises(ValueError):
+        await leader
+
+    calls = []
+    started.clear()
+
+    async def slow():
+        calls.append(1)
+        started.set()
+        await asyncio.sleep(1)
+
+    async def fast():
+        calls.append(1)
+        return 'результат'
+
+    leader = asyncio.create_task(flights.run('key', slow))
+    await started.wait()
+    follower = asyncio.create_task(flights.run('key', fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == 'результат', (
+        'После отмены первого вызова ожидающий должен выполнить '
+        'вызов сам.'
+    )
+    assert len(calls) == 2
+
+
+def test_query_stats_for_superuser(superuser_client):
+    superuser_client.get('/charity_project/', params={'limit': 1})
+    response = superuser_client.get('/stats/queries')
+    assert response.status_code == 200
+    assert any(
+        name.startswith('charityproject?') for name in response.json()
+    ), 'Статистика должна содержать запрос страницы проектов.'
+
+
+@pytest.fixture
+def paused_first_read(monkeypatch):
+    """Задерживает первое чтение страницы проектов после чтения строк."""
+    started, release = asyncio.Event(), asyncio.Event()
+    read_page = charity_project_crud.read_page
+
+    async def paused_read_page(*args, **kwargs):
+        rows = await read_page(*args, **kwargs)
+        if not started.is_set():
+            started.set()
+            await release.wait()
+        return rows
+
+    monkeypatch.setattr(charity_project_crud, 'read_page', paused_read_page)
+    return started, release
+
+
+async def test_read_after_write_does_not_join_older_read(
+        superuser_client, paused_first_read
+):
+    started, release = paused_first_read
+    async with httpx.AsyncClient(app=app, base_url='http://test') as client:
+        await client.post('/charity_project/', json=PROJECT)
+        first = asyncio.create_task(client.get('/charity_project/'))
+        await started.wait()
+        # Запись фиксируется, пока первое чтение ещё выполняется.
+        await client.post(
+            '/charity_project/', json={**PROJECT, 'name': 'Новый проект'}
+        )
+        second = asyncio.create_task(client.get('/charity_project/'))
+        await asyncio.sleep(0.05)
+        release.set()
+        first, second = await asyncio.gather(first, second)
+    assert [project['name'] for project in second.json()] == [
+        PROJECT['name'], 'Новый проект'
+    ], (
+        'Чтение после записи не должно получать результат запроса, '
+        'начатого до неё.'
+    )
+    assert second.headers['etag'] != first.headers['etag']